@@ -0,0 +1,113 @@
+""" Measures the overhead and the throughput of cptt, and stores the results
+as JSON, so regressions in the hot paths are visible over time.
+
+    python -m benchmarks [--quick] [--output PATH] [--compare PATH] [NAME...]
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Callable
+
+import cptt
+from benchmarks import overhead
+from benchmarks import throughput
+from benchmarks import validators
+
+BENCHMARKS: dict[str, Callable[[bool], dict]] = {
+    'overhead': overhead.run,
+    'throughput': throughput.run,
+    'validators': validators.run,
+}
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+# where the results are written by default (ignored by git).
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata() -> dict:
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'cptt': cptt.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def _flatten(results: dict, prefix: str = '') -> dict[str, float]:
+    flat = dict()
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _compare(previous: dict, current: dict) -> None:
+    old, new = _flatten(previous['results']), _flatten(current['results'])
+    for key, value in new.items():
+        if key not in old or not old[key]:
+            continue
+        change = (value - old[key]) / abs(old[key]) * 100
+        print(f'{key}: {old[key]:.6g} -> {value:.6g} ({change:+.1f}%)')
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog='benchmarks')
+    parser.add_argument(
+        'names', nargs='*', metavar='NAME',
+        help=f'benchmarks to run (from {", ".join(BENCHMARKS)})',
+    )
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--output', help='path of the JSON results file')
+    parser.add_argument('--compare', help='previous JSON results file')
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    results = dict()
+    for name in args.names or BENCHMARKS:
+        print(f'running {name}...', file=sys.stderr)
+        results[name] = BENCHMARKS[name](args.quick)
+    current = {'metadata': _metadata(), 'results': results}
+
+    output = args.output
+    if output is None:
+        stamp = current['metadata']['timestamp'].replace(':', '-')
+        output = os.path.join(RESULTS_DIR, f'{stamp}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf8') as f:
+        json.dump(current, f, indent=2)
+        f.write('\n')
+    print(f'results written to {output}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf8') as f:
+            _compare(json.load(f), current)
+    else:
+        for key, value in _flatten(results).items():
+            print(f'{key}: {value:.6g}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import shutil
+import statistics
+import sys
+import time
+from typing import Callable
+
+from cptt.stats import percentile
+
+
+def trivial_program() -> list[str]:
+    """ Returns a program that exits immediately, so measuring it measures
+    mostly the overhead of executing and monitoring it. """
+
+    if shutil.which('true'):
+        return [shutil.which('true')]
+    return [sys.executable, '-c', 'pass']
+
+
+def measure(func: Callable[[], object], runs: int) -> dict[str, float]:
+    """ Calls the given function `runs` times, and summarizes its latency and
+    the CPU time that the benchmarking process (all of its threads) spent on
+    each call. """
+
+    latencies = list()
+    cpu_start = time.process_time()
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    cpu = time.process_time() - cpu_start
+
+    return {
+        'median_latency': statistics.median(latencies),
+        'p95_latency': percentile(latencies, 95),
+        'cpu_per_call': cpu / runs,
+    }
@@ -0,0 +1,47 @@
+""" The latency and the CPU time that cptt adds on top of `subprocess.run` for
+a program that exits immediately. """
+from __future__ import annotations
+
+import subprocess
+from subprocess import DEVNULL
+from subprocess import PIPE
+
+from benchmarks.common import measure
+from benchmarks.common import trivial_program
+from cptt.process import MonitoredProcess
+from cptt.run import Runner
+from cptt.run.process import ProcessJob
+
+
+def run(quick: bool = False) -> dict:
+    runs = 20 if quick else 200
+    program = trivial_program()
+
+    def bare() -> None:
+        subprocess.run(program, stdin=DEVNULL, stdout=PIPE, stderr=PIPE)
+
+    def monitored() -> None:
+        process = MonitoredProcess(
+            program, stdin=DEVNULL, stdout=PIPE, stderr=PIPE,
+        )
+        process.communicate()
+
+    def job() -> None:
+        runner = Runner()
+        runner.collect(ProcessJob(program))
+        runner.execute()
+
+    results = {
+        'subprocess': measure(bare, runs),
+        'monitored_process': measure(monitored, runs),
+        'process_job': measure(job, runs),
+    }
+
+    baseline = results['subprocess']
+    for name in ('monitored_process', 'process_job'):
+        results[name]['extra_latency'] = \
+            results[name]['median_latency'] - baseline['median_latency']
+        results[name]['extra_cpu_per_call'] = \
+            results[name]['cpu_per_call'] - baseline['cpu_per_call']
+
+    return results
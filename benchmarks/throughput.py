@@ -0,0 +1,34 @@
+""" The number of jobs per second that a `Runner` completes, for a growing
+number of threads. """
+from __future__ import annotations
+
+import time
+
+from benchmarks.common import trivial_program
+from cptt.run import Runner
+from cptt.run.process import ProcessJob
+
+THREADS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def run(quick: bool = False) -> dict:
+    jobs = 64 if quick else 512
+    program = trivial_program()
+    results = dict()
+
+    for threads in THREADS:
+        runner = Runner(threads=threads)
+        for _ in range(jobs):
+            runner.collect(ProcessJob(program))
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        runner.execute()
+        took = time.perf_counter() - start
+
+        results[f'threads_{threads}'] = {
+            'jobs_per_second': jobs / took,
+            'cpu_per_job': (time.process_time() - cpu_start) / jobs,
+        }
+
+    return results
@@ -0,0 +1,58 @@
+""" The throughput of the validators, on synthetic outputs that consist of
+numbers. Both the buffered (`validate`) and the streaming interfaces are
+measured. """
+from __future__ import annotations
+
+import random
+import time
+
+from cptt.validate import StrictValidator
+from cptt.validate import TokenValidator
+from cptt.validate import Validator
+
+STREAM_CHUNK_SIZE = 64 * 1024
+MEGABYTE = 1024 * 1024
+
+
+def _numbers(count: int, fmt: str) -> bytes:
+    rng = random.Random(count)
+    return ''.join(
+        fmt.format(rng.random() * 1000) + ('\n' if i % 10 == 9 else ' ')
+        for i in range(count)
+    ).encode()
+
+
+def _throughput(validator: Validator, output: bytes) -> dict[str, float]:
+    start = time.perf_counter()
+    validator.validate(stdout=output, stderr=b'', returncode=0)
+    buffered = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stream = validator.stream()
+    view = memoryview(output)
+    for offset in range(0, len(output), STREAM_CHUNK_SIZE):
+        stream.feed(view[offset:offset + STREAM_CHUNK_SIZE])
+    stream.finish()
+    streaming = time.perf_counter() - start
+
+    size = len(output) / MEGABYTE
+    return {
+        'size_mb': size,
+        'buffered_mb_per_second': size / buffered,
+        'streaming_mb_per_second': size / streaming,
+    }
+
+
+def run(quick: bool = False) -> dict:
+    count = 200_000 if quick else 4_000_000
+    expected = _numbers(count, '{:.6f}')
+
+    return {
+        'strict': _throughput(StrictValidator(expected), expected),
+        'token_identical': _throughput(TokenValidator(expected), expected),
+        # every token differs textually, so all of them are compared as
+        # numbers.
+        'token_numeric': _throughput(
+            TokenValidator(expected), _numbers(count, '{:.7f}'),
+        ),
+    }
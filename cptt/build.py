@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import enum
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from subprocess import DEVNULL
+from subprocess import PIPE
+from typing import Sequence
+
+from cptt.cache import VerdictCache
+from cptt.process import MonitoredProcess
+from cptt.process import TimeLimitExceeded
+from cptt.run.base import Job
+from cptt.run.events import JobEvent
+
+
+@dataclass(frozen=True)
+class LanguageProfile:
+    """ Describes how sources of a language are compiled and executed.
+
+    The commands are templates, which may refer to the path of the `source`,
+    the build `directory`, the path of the compiled `artifact` in it, and the
+    `name` of the source (without its extension). Languages that are not
+    compiled have no compile command, and run the source directly. """
+
+    name: str
+    extensions: tuple[str, ...]
+    run: tuple[str, ...]
+    compile: tuple[str, ...] | None = None
+
+    def _format(self, command: Sequence[str], **paths: str) -> list[str]:
+        return [arg.format(**paths) for arg in command]
+
+    def compile_command(self, source: str, directory: str) -> list[str]:
+        return self._format(self.compile, **_paths(source, directory))
+
+    def run_command(self, source: str, directory: str | None) -> list[str]:
+        return self._format(self.run, **_paths(source, directory or ''))
+
+
+def _paths(source: str, directory: str) -> dict[str, str]:
+    return {
+        'source': source,
+        'directory': directory,
+        'artifact': os.path.join(directory, 'program'),
+        'name': os.path.splitext(os.path.basename(source))[0],
+    }
+
+
+PROFILES = {
+    profile.name: profile for profile in (
+        LanguageProfile(
+            'c++', ('.cpp', '.cc', '.cxx'),
+            run=('{artifact}',),
+            compile=('g++', '-O2', '-std=c++17', '{source}', '-o', '{artifact}'),
+        ),
+        LanguageProfile(
+            'c', ('.c',),
+            run=('{artifact}',),
+            compile=('gcc', '-O2', '{source}', '-o', '{artifact}', '-lm'),
+        ),
+        LanguageProfile(
+            'rust', ('.rs',),
+            run=('{artifact}',),
+            compile=('rustc', '-O', '{source}', '-o', '{artifact}'),
+        ),
+        LanguageProfile(
+            'java', ('.java',),
+            run=('java', '-cp', '{directory}', '{name}'),
+            compile=('javac', '-d', '{directory}', '{source}'),
+        ),
+        LanguageProfile(
+            'python', ('.py',),
+            run=(sys.executable, '{source}'),
+        ),
+    )
+}
+
+
+def profile_for(source: str | os.PathLike) -> LanguageProfile:
+    """ Returns the profile of the language of the given source, according
+    to its extension. Raises a `ValueError` if the language is unknown. """
+
+    extension = os.path.splitext(os.fspath(source))[1].lower()
+    for profile in PROFILES.values():
+        if extension in profile.extensions:
+            return profile
+    raise ValueError(f'unknown language of source {os.fspath(source)!r}')
+
+
+class ArtifactCache:
+    """ An on-disk cache of compiled programs. Each artifact is stored in its
+    own directory, keyed by a hash of the source, the compile command and
+    the compiler itself (its path, size and modification time), so an
+    upgraded compiler never reuses old artifacts. """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, source: str, command: Sequence[str]) -> str:
+        with open(source, 'rb') as f:
+            parts = [hashlib.sha256(f.read()).digest()]
+
+        compiler = shutil.which(command[0])
+        if compiler is not None:
+            stat = os.stat(compiler)
+            parts.append(
+                f'{os.path.realpath(compiler)}:{stat.st_size}:'
+                f'{stat.st_mtime_ns}'.encode(),
+            )
+        parts.extend(os.fsencode(arg) for arg in command)
+        return VerdictCache.key(parts)
+
+    def directory(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def get(self, key: str) -> str | None:
+        """ Returns the directory of the artifact, if it has been built. """
+
+        directory = self.directory(key)
+        return directory if os.path.isdir(directory) else None
+
+    def build_directory(self) -> str:
+        """ Returns a new directory that an artifact can be built in, before
+        it is stored in the cache using `put`. """
+        return tempfile.mkdtemp(dir=self.path, prefix='.build-')
+
+    def put(self, key: str, build_directory: str) -> str:
+        """ Moves a built artifact into the cache, and returns its directory.
+        If the same artifact has been stored concurrently, that one is kept.
+        """
+
+        directory = self.directory(key)
+        try:
+            os.rename(build_directory, directory)
+        except OSError:
+            shutil.rmtree(build_directory, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+        return directory
+
+
+class CompileStatus(enum.Enum):
+    COMPILED = enum.auto()
+    CACHED = enum.auto()
+    COMPILE_ERROR = enum.auto()
+    TIME_LIMIT = enum.auto()
+
+
+@dataclass
+class CompileEvent(JobEvent):
+    """ Reports the result of a compilation. `program` is the command that
+    executes the compiled program, and `message` holds the diagnostics of
+    the compiler (the end of its standard error). """
+
+    status: CompileStatus
+    time: float
+    program: list[str] | None = None
+    message: str = ''
+
+    @property
+    def failed(self) -> bool:
+        return self.program is None
+
+
+@dataclass
+class CompileJob(Job):
+    """ Compiles a source using the profile of its language (which is
+    detected by its extension by default). If a cache is provided, the
+    compiler is not executed at all for sources that have already been
+    compiled. Otherwise, the program is built in a new temporary directory.
+    Once the job has finished, the command that executes the compiled
+    program is also avaliable as `program`. """
+
+    source: str | os.PathLike
+    profile: LanguageProfile = None
+    cache: ArtifactCache = None
+    time_limit: float = None
+
+    program: list[str] = field(init=False, default=None)
+
+    def _push(
+        self,
+        status: CompileStatus,
+        time: float,
+        directory: str | None = None,
+        message: str = '',
+    ) -> None:
+        if directory is not None:
+            self.program = self.profile.run_command(
+                os.fspath(self.source), directory,
+            )
+        self.manager.push_event(
+            CompileEvent(self, status, time, self.program, message),
+        )
+
+    def _compile(self, directory: str) -> tuple[CompileStatus, str]:
+        command = self.profile.compile_command(
+            os.path.abspath(self.source), directory,
+        )
+        try:
+            process = MonitoredProcess(
+                command,
+                stdin=DEVNULL, stdout=DEVNULL, stderr=PIPE,
+            )
+        except OSError as exc:  # for example, the compiler is not installed
+            return CompileStatus.COMPILE_ERROR, str(exc)
+
+        try:
+            _, err = process.communicate(time_limit=self.time_limit)
+        except TimeLimitExceeded as exc:
+            return CompileStatus.TIME_LIMIT, str(exc)
+
+        message = err.decode('utf8', errors='replace')
+        if process.returncode != 0:
+            return CompileStatus.COMPILE_ERROR, message
+        return CompileStatus.COMPILED, message
+
+    def execute(self) -> None:
+        if self.profile is None:
+            self.profile = profile_for(self.source)
+
+        if self.profile.compile is None:
+            self._push(CompileStatus.COMPILED, 0, '')
+            return
+
+        start = time.monotonic()
+        if self.cache is None:
+            directory = tempfile.mkdtemp(prefix='cptt-build-')
+        else:
+            source = os.path.abspath(self.source)
+            key = self.cache.key(
+                source, self.profile.compile_command(source, '{directory}'),
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._push(CompileStatus.CACHED, 0, cached)
+                return
+            directory = self.cache.build_directory()
+
+        status, message = self._compile(directory)
+        duration = time.monotonic() - start
+
+        if status is not CompileStatus.COMPILED:
+            shutil.rmtree(directory, ignore_errors=True)
+            self._push(status, duration, message=message)
+            return
+
+        if self.cache is not None:
+            directory = self.cache.put(key, directory)
+        self._push(status, duration, directory, message)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Iterable
+
+import cptt
+
+ENTRY_SUFFIX = '.json'
+
+
+class VerdictCache:
+    """ An on-disk cache of the results of jobs, keyed by a hash of
+    everything that determines the result (see `ProcessJob.cache`).
+
+    Each entry is a small JSON file. Once the total size of the entries grows
+    above `max_size`, the least recently used entries are removed. If `bypass`
+    is set, the cache is never read from (but it is still updated with the
+    new results). The cache can be shared between jobs, threads and (after it
+    is pickled) processes. """
+
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        max_size: int = DEFAULT_MAX_SIZE,
+        bypass: bool = False,
+    ) -> None:
+        self.path = os.fspath(path)
+        self.max_size = max_size
+        self.bypass = bypass
+        os.makedirs(self.path, exist_ok=True)
+        self._init_state()
+
+    def _init_state(self) -> None:
+        self._lock = threading.Lock()
+        self._digests: dict[tuple, bytes] = dict()
+        self._size: int | None = None
+        # the total size of the entries, which is counted when the first
+        # entry is stored.
+
+    def __getstate__(self) -> dict:
+        return {
+            'path': self.path,
+            'max_size': self.max_size,
+            'bypass': self.bypass,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_state()
+
+    def file_digest(self, path: str) -> bytes:
+        """ Returns the SHA-256 digest of the content of the given file. The
+        digest is memorized until the file is modified. """
+
+        stat = os.stat(path)
+        memo = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(memo)
+        if digest is not None:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.digest()
+
+        with self._lock:
+            self._digests[memo] = digest
+        return digest
+
+    @staticmethod
+    def key(parts: Iterable[bytes]) -> str:
+        """ Hashes the given parts (and the version of cptt) into a key. """
+
+        sha = hashlib.sha256(cptt.__version__.encode())
+        for part in parts:
+            sha.update(len(part).to_bytes(8, 'little'))
+            sha.update(part)
+        return sha.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> dict | None:
+        """ Returns the entry that is stored under the given key, or `None` if
+        there isn't one (or the cache is bypassed). """
+
+        if self.bypass:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding='utf8') as f:
+                entry = json.load(f)
+            os.utime(path)  # marks the entry as recently used
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """ Stores the given (JSON serializable) entry under the given key,
+        and evicts the least recently used entries if needed. """
+
+        fd, temporary = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf8') as f:
+            json.dump(entry, f)
+        size = os.path.getsize(temporary)
+        os.replace(temporary, self._entry_path(key))
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = list()
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        """ Removes the least recently used entries, until the total size of
+        the cache is below three quarters of the maximum. This way, the cache
+        directory is not scanned after every new entry. """
+
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if self._size <= self.max_size * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
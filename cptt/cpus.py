@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+
+CPU_SYSFS = '/sys/devices/system/cpu'
+
+
+def parse_cpu_list(text: str) -> set[int]:
+    """ Parses a list of CPUs in the format that is used by the kernel (for
+    example, `0-3,8,10-11`). """
+
+    cpus = set()
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def _read_cpu_list(path: str) -> set[int]:
+    try:
+        with open(path, encoding='utf8') as f:
+            return parse_cpu_list(f.read())
+    except (OSError, ValueError):
+        return set()
+
+
+def available_cpus() -> set[int]:
+    """ Returns the CPUs that the running process is allowed to run on. """
+
+    if hasattr(os, 'sched_getaffinity'):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+
+def isolated_cpus() -> set[int]:
+    """ Returns the CPUs that are isolated from the scheduler of the kernel
+    (using the `isolcpus` boot parameter). Nothing else is scheduled on them,
+    which makes them perfect for measuring time. """
+    return _read_cpu_list(os.path.join(CPU_SYSFS, 'isolated'))
+
+
+def smt_siblings(cpu: int) -> set[int]:
+    """ Returns the CPUs that share a physical core with the given one
+    (including itself). """
+
+    siblings = _read_cpu_list(
+        os.path.join(CPU_SYSFS, f'cpu{cpu}', 'topology', 'thread_siblings_list'),
+    )
+    return siblings or {cpu}
+
+
+def allocate_cpu_sets(
+    count: int = None,
+    avoid_smt: bool = False,
+) -> list[frozenset[int]]:
+    """ Divides the CPUs into sets, one for each of `count` concurrent slots.
+    The isolated CPUs that the running process is allowed to run on are used
+    if there are any, and all avaliable CPUs otherwise. If `count` is not
+    provided, a slot is created for each of the CPUs.
+
+    Each slot gets a single CPU. If `avoid_smt` is set, each slot gets a
+    whole physical core instead: the process is pinned to one of its CPUs,
+    and the SMT siblings of that CPU are left idle. If there are more slots
+    than CPUs (or cores), some slots will share them. """
+
+    # isolated CPUs may be outside of the affinity mask (or the cpuset) of
+    # the running process, for example inside a container.
+    cpus = (isolated_cpus() & available_cpus()) or available_cpus()
+
+    if avoid_smt:
+        cores = list()
+        while cpus:
+            cpu = min(cpus)
+            cores.append(cpu)
+            cpus -= smt_siblings(cpu)
+        cpus = cores
+    else:
+        cpus = sorted(cpus)
+
+    if count is None:
+        count = len(cpus)
+    return [frozenset({cpus[slot % len(cpus)]}) for slot in range(count)]
@@ -0,0 +1,549 @@
+""" A fork server for Python solutions.
+
+Starting a new Python interpreter for each test takes tens of milliseconds,
+which can be more than the time spent on the test itself. A fork server is a
+Python interpreter that is started once (optionally with some modules already
+imported), and forks a fresh child that runs the solution script for each
+test. The child is monitored by the judge like any other process, and its
+running time is measured from the moment it has been forked. """
+from __future__ import annotations
+
+import array
+import gc
+import importlib
+import os
+import pickle
+import runpy
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from contextlib import suppress
+from subprocess import DEVNULL
+from subprocess import PIPE
+from typing import IO
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from cptt.process import _reset_peak_rss
+from cptt.process import MonitoredProcess
+from cptt.process import RUSAGE_MAXRSS_UNIT
+
+if TYPE_CHECKING:
+    from cptt.limits import KernelLimit
+
+MAX_MESSAGE_SIZE = 1024 * 1024
+# requests (and replies) are pickled into a single packet, which contains the
+# arguments and the environment of the forked process.
+
+_BOOTSTRAP = ';'.join((
+    'import sys',
+    'sys.path.insert(1, {root!r})',
+    'from cptt.forkserver import serve',
+    'serve(int(sys.argv[1]), sys.argv[2:])',
+))
+
+
+class ForkServerError(RuntimeError):
+    pass
+
+
+def _send(sock: socket.socket, message, fds: Sequence[int] = ()) -> None:
+    ancillary = [(
+        socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds),
+    )] if fds else []
+    sock.sendmsg([pickle.dumps(message)], ancillary)
+
+
+def _recv(sock: socket.socket) -> tuple[object, list[int]]:
+    """ Returns the next message and the file descriptors that were sent
+    with it, or `None` if the other side has closed the connection. """
+
+    fds = array.array('i')
+    data, ancillary, _, _ = sock.recvmsg(
+        MAX_MESSAGE_SIZE, socket.CMSG_SPACE(3 * fds.itemsize),
+    )
+
+    for level, kind, fd_data in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(fd_data[:len(fd_data) - len(fd_data) % fds.itemsize])
+
+    return (pickle.loads(data) if data else None), list(fds)
+
+
+def _exit_code(code) -> int:
+    """ Converts the argument of `sys.exit` into an exit code, the same way
+    the interpreter does. """
+
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_script(args: list[str]) -> int:
+    """ Runs the given script as the `__main__` module, as if it has been
+    executed using `python script [args...]`. Returns the exit code. """
+
+    sys.argv = list(args)
+    sys.path[0] = os.path.dirname(os.path.abspath(args[0]))
+
+    # the standard streams are opened again on top of the new file
+    # descriptors, so no data that is buffered by the server is inherited.
+    sys.stdin = open(0, closefd=False, encoding=sys.stdin.encoding)
+    sys.stdout = open(1, 'w', closefd=False, encoding=sys.stdout.encoding)
+    sys.stderr = open(
+        2, 'w', closefd=False, encoding=sys.stderr.encoding,
+        errors='backslashreplace', buffering=1,
+    )
+
+    try:
+        runpy.run_path(args[0], run_name='__main__')
+        code = 0
+    except SystemExit as exc:
+        code = _exit_code(exc.code)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except OSError:
+            pass  # the output has been closed by the reader
+
+    return code
+
+
+def _run_child(request: tuple, fds: list[int], private: list[int]) -> None:
+    """ Runs in the forked child. Moves the received file descriptors into
+    the standard streams, applies the kernel limits and runs the script.
+    Never returns. """
+
+    _, args, streams, cwd, env, limits = request
+    code = 1
+    try:
+        # the child starts with the peak memory of the server, which is
+        # lowered to the memory that the child actually has at its fork point.
+        _reset_peak_rss()
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in private:
+            os.close(fd)
+
+        for target, fd in zip(streams, fds):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd not in streams:
+                os.close(fd)
+
+        if cwd is not None:
+            os.chdir(cwd)
+        if env is not None:
+            os.environ.clear()
+            os.environ.update(env)
+        for limit in limits:
+            limit.preexec()
+
+        code = _run_script(args)
+
+    except BaseException:
+        traceback.print_exc()
+
+    finally:
+        os._exit(code)
+
+
+def _returncode(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _reap_children(sock: socket.socket, children: set[int]) -> None:
+    while children:
+        try:
+            # each child leads its own process group, which is killed before
+            # the child is reaped (while the ID of the group can't be reused).
+            exited = os.waitid(
+                os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT,
+            )
+            if exited is None:
+                return
+            pid = exited.si_pid
+            with suppress(OSError):
+                os.killpg(pid, signal.SIGKILL)
+            _, status, rusage = os.wait4(pid, 0)
+        except ChildProcessError:
+            return
+
+        children.discard(pid)
+        _send(
+            sock, (
+                'exited', pid, _returncode(status), time.monotonic(),
+                rusage.ru_utime, rusage.ru_stime,
+                rusage.ru_maxrss * RUSAGE_MAXRSS_UNIT,
+            ),
+        )
+
+
+def _drain(fd: int) -> None:
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def _fork(sock: socket.socket, children: set[int], private: list[int]) -> bool:
+    """ Receives a single request and forks a child for it. Returns `False`
+    if the judge has closed the connection. """
+
+    request, fds = _recv(sock)
+    if request is None:
+        return False
+
+    start_time = time.monotonic()
+    try:
+        pid = os.fork()
+    except OSError as err:
+        pid = None
+        _send(sock, ('failed', request[0], str(err)))
+
+    if pid == 0:
+        _run_child(request, fds, private)
+
+    for fd in fds:
+        os.close(fd)
+
+    if pid is not None:
+        children.add(pid)
+        _send(sock, ('started', request[0], pid, start_time))
+    return True
+
+
+def serve(fd: int, preload: Sequence[str] = ()) -> None:
+    """ The main loop of the fork server process. Receives requests on the
+    given socket, and forks a child for each one of them. The server reports
+    the pid of each child and the moment it has been forked, and its exit
+    status and resource usage once it has been reaped. """
+
+    sock = socket.socket(fileno=fd)
+    for name in preload:
+        importlib.import_module(name)
+
+    # objects that exist before forking are never collected by the children,
+    # so the pages that hold them are not copied on write.
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    selector.register(wakeup_read, selectors.EVENT_READ)
+    private = [sock.fileno(), wakeup_read, wakeup_write, selector.fileno()]
+
+    children: set[int] = set()
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fd == wakeup_read:
+                    _drain(wakeup_read)
+                    _reap_children(sock, children)
+                elif not _fork(sock, children, private):
+                    return
+
+    finally:
+        for pid in children:
+            with suppress(OSError):
+                os.killpg(pid, signal.SIGKILL)
+
+
+class _Spawn:
+    """ A request that is waiting for the server to fork its child. """
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.child: ForkedChild | None = None
+        self.error = 'the fork server is not running'
+
+
+class ForkedChild:
+    """ A process that has been forked by the fork server. Its exit status
+    and resource usage are reported by the server once it has been reaped. """
+
+    def __init__(
+        self,
+        pid: int,
+        start_time: float,
+    ) -> None:
+        self.pid = pid
+        self.start_time = start_time
+        # the moment the child has been forked.
+
+        self.returncode: int | None = None
+        self.usage: tuple[float, float, float, int] | None = None
+        self.exited = threading.Event()
+        self._notify = os.pipe()
+
+    def exit(self, returncode: int, *usage) -> None:
+        self.returncode = returncode
+        self.usage = usage
+        os.write(self._notify[1], b'\0')
+        self.exited.set()
+
+    def exit_fd(self) -> int:
+        """ Returns a new file descriptor that becomes readable once the exit
+        status of the child has been reported. """
+        return os.dup(self._notify[0])
+
+    def close(self) -> None:
+        for fd in self._notify:
+            os.close(fd)
+        self._notify = ()
+
+
+class ForkServer:
+    """ A warm Python interpreter that forks a fresh child for each executed
+    solution. The given modules are imported by the server once, before any
+    child is forked. Only Python scripts can be executed by the server.
+
+    The server can be shared between multiple jobs (and threads), and should
+    be closed once it is no longer needed. Avaliable only on POSIX systems.
+    """
+
+    def __init__(self, preload: Sequence[str] = ()) -> None:
+        self.preload = tuple(preload)
+        self._socket, remote = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_SEQPACKET,
+        )
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        try:
+            self._server = subprocess.Popen(
+                [
+                    sys.executable, '-c', _BOOTSTRAP.format(root=root),
+                    str(remote.fileno()), *self.preload,
+                ],
+                stdin=DEVNULL,
+                pass_fds=(remote.fileno(),),
+            )
+        finally:
+            remote.close()
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._next_request = 0
+        self._requests: dict[int, _Spawn] = dict()
+        self._children: dict[int, ForkedChild] = dict()
+
+        self._reader = threading.Thread(target=self._read_replies)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read_replies(self) -> None:
+        while True:
+            try:
+                reply, _ = _recv(self._socket)
+            except OSError:
+                reply = None
+            if reply is None:
+                break
+
+            kind, *values = reply
+            with self._lock:
+                if kind == 'exited':
+                    pid, *status = values
+                    self._children.pop(pid).exit(*status)
+                    continue
+
+                spawn = self._requests.pop(values[0])
+                if kind == 'started':
+                    pid, start_time = values[1:]
+                    spawn.child = ForkedChild(pid, start_time)
+                    self._children[pid] = spawn.child
+                else:
+                    spawn.error = values[1]
+                spawn.done.set()
+
+        # the server has exited, and it killed all of its children. Their
+        # exit status will never be reported.
+        with self._lock:
+            self._closed = True
+            for spawn in self._requests.values():
+                spawn.done.set()
+            for child in self._children.values():
+                child.exit(-signal.SIGKILL, time.monotonic(), 0, 0, 0)
+            self._requests.clear()
+            self._children.clear()
+
+    def spawn(
+        self,
+        args: Sequence[str],
+        streams: dict[int, int],
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        limits: Sequence[KernelLimit] = (),
+    ) -> ForkedChild:
+        """ Forks a new child that runs the given script (`args[0]`) with
+        the given arguments. `streams` maps standard stream numbers of the
+        child to file descriptors in this process, which are duplicated into
+        the child. """
+
+        spawn = _Spawn()
+        request = (
+            None, list(args), tuple(streams), cwd,
+            None if env is None else dict(env), tuple(limits),
+        )
+
+        with self._lock:
+            if self._closed:
+                raise ForkServerError(spawn.error)
+            request = (self._next_request, *request[1:])
+            self._requests[self._next_request] = spawn
+            self._next_request += 1
+            _send(self._socket, request, list(streams.values()))
+
+        spawn.done.wait()
+        if spawn.child is None:
+            raise ForkServerError(spawn.error)
+        return spawn.child
+
+    def close(self) -> None:
+        """ Stops the server. Children that are still running are killed. """
+
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.wait()
+        self._reader.join()
+        self._socket.close()
+
+    def __enter__(self) -> ForkServer:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def _script_args(program: Sequence[str]) -> list[str]:
+    """ Returns the script and its arguments from the given command line,
+    which can start with the path of a Python interpreter (that is ignored,
+    as the script runs inside the interpreter of the server). """
+
+    args = list(program)
+    if args and os.path.basename(args[0]).lower().startswith('python'):
+        args = args[1:]
+
+    if not args or args[0].startswith('-'):
+        raise ValueError(
+            f'{program!r} is not a Python script, and can not be executed '
+            'by a fork server',
+        )
+    return args
+
+
+class ForkServerProcess(MonitoredProcess):
+    """ A monitored process that is forked by a `ForkServer`, instead of
+    being created using fork and exec. Supports the same monitoring as
+    `MonitoredProcess`: the time is measured from the moment the process has
+    been forked, and the resource usage is collected by the server when the
+    process is reaped. """
+
+    def __init__(
+        self,
+        server: ForkServer,
+        args: Sequence[str],
+        stdin: int | IO | None = None,
+        stdout: int | IO | None = None,
+        stderr: int | IO | None = None,
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        limits: Sequence[KernelLimit] = (),
+    ) -> None:
+        self._init_monitoring(limits)
+        self._Popen__subproc = None
+        # there is no underlying `subprocess.Popen` object, which psutil
+        # looks up missing attributes in.
+
+        self.returncode = None
+        self.stdin = self.stdout = self.stderr = None
+        streams: dict[int, int] = dict()
+        opened: list[int] = list()
+
+        for number, spec in enumerate((stdin, stdout, stderr)):
+            if spec is None:
+                continue
+
+            if spec == PIPE:
+                read, write = os.pipe()
+                if number == 0:
+                    self.stdin = open(write, 'wb')
+                    spec = read
+                else:
+                    setattr(
+                        self, ('stdout', 'stderr')[number - 1],
+                        open(read, 'rb'),
+                    )
+                    spec = write
+                opened.append(spec)
+
+            elif spec == DEVNULL:
+                spec = os.open(os.devnull, os.O_RDWR)
+                opened.append(spec)
+
+            elif not isinstance(spec, int):
+                spec = spec.fileno()
+
+            streams[number] = spec
+
+        try:
+            self._child = server.spawn(
+                _script_args(args), streams,
+                cwd=cwd, env=env, limits=self.limits,
+            )
+        except BaseException:
+            for stream in (self.stdin, self.stdout, self.stderr):
+                if stream is not None:
+                    stream.close()
+            raise
+        finally:
+            for fd in opened:
+                os.close(fd)
+
+        # similarly to `psutil.Popen`, don't raise if the child has already
+        # exited.
+        self._init(self._child.pid, _ignore_nsp=True)
+        self._start_time = self._child.start_time
+        self._session = True
+        # the child leads its own process group, which the server kills
+        # before reaping the child.
+
+    def _reap(self, block: bool = False) -> int | None:
+        if self.returncode is not None:
+            return self.returncode
+
+        if not self._child.exited.wait(None if block else 0):
+            return None
+
+        self._tree_killed = True
+        self._record_usage(*self._child.usage)
+        self.returncode = self._child.returncode
+        self._child.close()
+        return self.returncode
+
+    def _exit_fd(self) -> int:
+        return self._child.exit_fd()
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import errno
+import math
+import os
+import uuid
+from abc import ABC
+from abc import abstractmethod
+from typing import Iterable
+from typing import TYPE_CHECKING
+
+import psutil
+
+from cptt.process import MemoryLimitExceeded
+from cptt.process import TimeLimitExceeded
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # not avaliable on Windows
+
+if TYPE_CHECKING:
+    from cptt.process import MonitoredProcess
+
+
+CGROUP_ENV = 'CPTT_CGROUP'
+# a path to a (delegated) cgroup v2 directory, in which cptt will create a
+# child cgroup for each monitored process. If not provided, cptt tries to use
+# the cgroup of the running Python process (see `_enable_memory_controller`).
+# Otherwise, kernel memory limits fall back to `RlimitMemoryLimit`.
+
+JUDGE_CGROUP = 'cptt-judge'
+# the leaf cgroup that the running Python process moves itself into, inside
+# its own cgroup, so the memory controller can be enabled for the cgroups of
+# the monitored processes.
+
+
+class KernelLimit(ABC):
+    """ A resource limit that is enforced by the operating system kernel on
+    the monitored process, instead of by sampling the process from the parent.
+    """
+
+    measures_memory: bool = False
+    # if true, the limit reports the exact peak memory usage of the process
+    # once it is released, and the kernel is trusted with enforcing the
+    # memory limit. Thus, the memory usage will not be sampled while the
+    # process runs.
+
+    def preexec(self) -> None:
+        """ Called in the child process, after it has been forked and before
+        the program is executed. """
+
+    def guard(self, process: MonitoredProcess) -> float | None:
+        """ Called in the parent each time the limits of the running process
+        are checked. Raises the matching `RuntimeError` subclass if the process
+        is caught violating the limit, and returns the number of seconds until
+        it should be checked again (or `None`, if there is no need to). """
+
+        return None
+
+    def release(self, process: MonitoredProcess) -> None:
+        """ Called once, after the process has been reaped. Updates the
+        measured resource usage of the process and frees any resources that
+        are held by the limit. """
+
+    @abstractmethod
+    def check(self, process: MonitoredProcess) -> None:
+        """ Raises the matching `RuntimeError` subclass if the process
+        violated the limit. Called after the limit has been released. """
+
+
+class CgroupMemoryLimit(KernelLimit):
+    """ Runs the process inside its own cgroup v2, with the memory limit
+    written to `memory.max`. The kernel kills the process as soon as it goes
+    above the limit, and the exact high-water mark is read from `memory.peak`
+    (avaliable since Linux 5.19). """
+
+    def __init__(self, limit: float, parent: str) -> None:
+        self.limit = int(limit)
+        self.path = os.path.join(parent, f'cptt-{uuid.uuid4().hex}')
+        self._peak = None
+        self._oom_kills = 0
+
+        os.mkdir(self.path)
+        try:
+            self._write('memory.max', str(self.limit))
+            if self._exists('memory.swap.max'):
+                self._write('memory.swap.max', '0')
+        except OSError:
+            os.rmdir(self.path)
+            raise
+
+        self.measures_memory = self._exists('memory.peak')
+
+    def _exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, name))
+
+    def _write(self, name: str, value: str) -> None:
+        with open(os.path.join(self.path, name), 'w') as f:
+            f.write(value)
+
+    def _read(self, name: str) -> str:
+        with open(os.path.join(self.path, name)) as f:
+            return f.read()
+
+    def preexec(self) -> None:
+        # writing zero moves the writing process into the cgroup.
+        self._write('cgroup.procs', '0')
+
+    def release(self, process: MonitoredProcess) -> None:
+        try:
+            self._peak = int(self._read('memory.peak'))
+        except OSError:
+            pass
+
+        try:
+            for line in self._read('memory.events').splitlines():
+                key, value = line.split()
+                if key == 'oom_kill':
+                    self._oom_kills = int(value)
+        except OSError:
+            pass
+
+        if self._peak is not None:
+            process.memory_used = max(process.memory_used, self._peak)
+
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+
+    def check(self, process: MonitoredProcess) -> None:
+        if self._oom_kills:
+            raise MemoryLimitExceeded(
+                f'process killed by the kernel at {process.memory_used} bytes '
+                f'(limited to {self.limit})',
+            )
+
+
+class RlimitMemoryLimit(KernelLimit):
+    """ Limits the size of the data segment (or the address space, where the
+    former is not avaliable) of the process using `setrlimit`.
+
+    This is only a backstop: the kernel limit is `HEADROOM` times the
+    requested one, so a process can allocate up to that much before its
+    allocations fail. The requested limit is enforced on the resident memory
+    instead, which is sampled while the process runs (the limit does not
+    measure memory, so sampling stays on), and checked against the peak that
+    is collected when the process is reaped. """
+
+    HEADROOM = 2
+    # the data segment includes memory that is reserved but never touched, so
+    # the kernel limit is set a few times above the requested one. This
+    # way, a process that crosses the requested limit is caught by the
+    # samples (or by its measured peak), instead of crashing on an allocation
+    # failure.
+
+    def __init__(self, limit: float) -> None:
+        self.limit = int(limit)
+        self.resource = getattr(resource, 'RLIMIT_DATA', resource.RLIMIT_AS)
+
+    def preexec(self) -> None:
+        value = self.limit * self.HEADROOM
+        resource.setrlimit(self.resource, (value, value))
+
+    def check(self, process: MonitoredProcess) -> None:
+        if process.memory_used > self.limit:
+            raise MemoryLimitExceeded(
+                f'process peaked at {process.memory_used} bytes '
+                f'(limited to {self.limit})',
+            )
+
+
+class CpuTimeLimit(KernelLimit):
+    """ Limits the CPU time (user and system) of the process.
+
+    The limit is enforced by the parent, which reads the CPU time of the
+    process whenever it might have reached the limit, and kills it once it
+    did. `RLIMIT_CPU` is only a backstop, since it accepts whole seconds: the
+    kernel sends `SIGXCPU` to the process once it reaches the limit rounded
+    up, and kills it a second later. Either way, the verdict is decided using
+    the exact CPU time that is collected when the process is reaped. """
+
+    MIN_GUARD_INTERVAL = 0.01
+    # the process is not checked more often than this, even when it is about
+    # to reach its limit.
+
+    def __init__(self, limit: float) -> None:
+        self.limit = limit
+
+    def preexec(self) -> None:
+        soft = max(math.ceil(self.limit), 1)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+
+    def guard(self, process: MonitoredProcess) -> float | None:
+        try:
+            with process.oneshot():
+                times = process.cpu_times()
+                threads = process.num_threads()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+
+        used = times.user + times.system + \
+            times.children_user + times.children_system
+        if used > self.limit:
+            raise TimeLimitExceeded(
+                f'process caught using {used} CPU seconds '
+                f'(limited to {self.limit})',
+            )
+
+        # each thread of the process uses at most a CPU second per second.
+        remaining = (self.limit - used) / max(threads, 1)
+        return max(remaining, self.MIN_GUARD_INTERVAL)
+
+    def check(self, process: MonitoredProcess) -> None:
+        if process.cpu_time > self.limit:
+            raise TimeLimitExceeded(
+                f'process used {process.cpu_time} CPU seconds '
+                f'(limited to {self.limit})',
+            )
+
+
+class CpuAffinity(KernelLimit):
+    """ Pins the process to the given set of CPUs using `sched_setaffinity`,
+    so it does not migrate between them (or compete with other monitored
+    processes) while it runs. """
+
+    def __init__(self, cpus: Iterable[int]) -> None:
+        self.cpus = frozenset(cpus)
+
+    def preexec(self) -> None:
+        os.sched_setaffinity(0, self.cpus)
+
+    def check(self, process: MonitoredProcess) -> None:
+        pass
+
+
+def _cgroup2_mountpoint() -> str | None:
+    try:
+        with open('/proc/self/mounts', encoding='utf8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == 'cgroup2':
+                    return fields[1]
+    except OSError:
+        pass
+    return None
+
+
+def _cgroup2_parent() -> str | None:
+    """ Returns the path of the cgroup v2 directory in which child cgroups for
+    monitored processes should be created, or `None` if there isn't one. """
+
+    parent = os.environ.get(CGROUP_ENV)
+    if parent:
+        return parent
+
+    mountpoint = _cgroup2_mountpoint()
+    relative = _own_cgroup()
+    if mountpoint is None or relative is None:
+        return None
+
+    path = os.path.join(mountpoint, relative)
+    if os.path.basename(path) == JUDGE_CGROUP:
+        path = os.path.dirname(path)  # we have already moved there
+    return path
+
+
+def _own_cgroup() -> str | None:
+    """ Returns the path of the cgroup v2 of the running Python process,
+    relative to the mountpoint of the hierarchy. """
+
+    try:
+        with open('/proc/self/cgroup', encoding='utf8') as f:
+            for line in f:
+                if line.startswith('0::'):
+                    return line[3:].strip().lstrip('/')
+    except OSError:
+        pass
+    return None
+
+
+def _write_cgroup(path: str, value: str) -> None:
+    with open(path, 'w', encoding='utf8') as f:
+        f.write(value)
+
+
+def _enable_memory_controller(parent: str) -> bool:
+    """ Enables the memory controller for the children of the given cgroup.
+    Returns `False` if it can't be enabled.
+
+    cgroup v2 refuses to enable controllers for the children of a (non-root)
+    cgroup that has processes of its own. Thus, if the running Python process
+    is in that cgroup, it moves itself into a leaf cgroup first. This works
+    only if no other processes are there, so `CGROUP_ENV` should be preferred
+    (for example, a cgroup that is delegated by systemd). """
+
+    path = os.path.join(parent, 'cgroup.subtree_control')
+    try:
+        with open(path, encoding='utf8') as f:
+            if 'memory' in f.read().split():
+                return True
+        _write_cgroup(path, '+memory')
+        return True
+    except OSError as err:
+        if err.errno != errno.EBUSY:
+            return False
+
+    leaf = os.path.join(parent, JUDGE_CGROUP)
+    try:
+        if not os.path.isdir(leaf):
+            os.mkdir(leaf)
+        _write_cgroup(os.path.join(leaf, 'cgroup.procs'), str(os.getpid()))
+        _write_cgroup(path, '+memory')
+    except OSError:
+        return False
+    return True
+
+
+def create_memory_limit(limit: float) -> KernelLimit | None:
+    """ Returns the best kernel enforced memory limit that is avaliable on the
+    running system: a cgroup v2 if one is writable, `setrlimit` otherwise.
+    Returns `None` if the platform supports none of them. """
+
+    parent = _cgroup2_parent()
+    if parent is not None and _enable_memory_controller(parent):
+        try:
+            return CgroupMemoryLimit(limit, parent)
+        except OSError:
+            pass
+
+    if resource is not None:
+        return RlimitMemoryLimit(limit)
+
+    return None
+
+
+def create_cpu_time_limit(limit: float) -> KernelLimit | None:
+    """ Returns a kernel enforced CPU time limit, or `None` if the running
+    platform does not support one. """
+
+    if resource is None or not hasattr(os, 'wait4'):
+        return None
+    return CpuTimeLimit(limit)
+
+
+def create_cpu_affinity(cpus: Iterable[int]) -> KernelLimit | None:
+    """ Returns a limit that pins the process to the given CPUs, or `None` if
+    the running platform does not support it. """
+
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    return CpuAffinity(cpus)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+import weakref
+from collections import deque
+from typing import AnyStr
+from typing import Generic
+
+SPOOL_THRESHOLD = 8 * 1024 * 1024
+# outputs that are larger than this number of bytes (or characters) are moved
+# from memory to a temporary file on the disk.
+
+
+class MappedOutput(mmap.mmap):
+    """ Binary output that is memory-mapped from the file it has been captured
+    into, instead of being read into the Python heap. It can be used as any
+    other bytes-like object. The mapping keeps its own descriptor of the file
+    (`fd`) open while it is referenced, so the file can also be passed to
+    other processes. """
+
+    def __new__(cls, fd: int) -> MappedOutput:
+        fd = os.dup(fd)
+        try:
+            self = super().__new__(cls, fd, 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.fd = fd
+        weakref.finalize(self, os.close, fd)
+        return self
+
+
+class OutputCapture(Generic[AnyStr]):
+    """ Collects the output of a process. Small outputs are kept in memory,
+    and once the output grows above the given threshold, it spills into a
+    temporary file on the disk instead of living in the Python heap. """
+
+    def __init__(self, text: bool = True, threshold: int = SPOOL_THRESHOLD):
+        self.size = 0
+        self._text = text
+        self._threshold = threshold
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=threshold,
+            mode='w+' if text else 'w+b',
+            **({'encoding': 'utf8', 'newline': ''} if text else {}),
+        )
+
+    def write(self, chunk: AnyStr) -> None:
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def read(self) -> AnyStr | MappedOutput:
+        """ Returns all of the captured output. Binary output that has spilled
+        to the disk is memory-mapped instead of being read back, and the
+        mapping remains valid after the capture is closed. """
+
+        # the file is rolled over to the disk once it grows above the
+        # threshold.
+        if not self._text and self.size > self._threshold:
+            self._file.flush()
+            return MappedOutput(self._file.fileno())
+
+        self._file.seek(0)
+        return self._file.read()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class TailBuffer(Generic[AnyStr]):
+    """ A ring buffer that keeps only the last `size` bytes (or characters)
+    that are written to it, which are usually enough for diagnostics. """
+
+    def __init__(self, size: int, text: bool = True) -> None:
+        self._size = size
+        self._empty = '' if text else b''
+        self._chunks: deque[AnyStr] = deque()
+        self._length = 0
+
+    def write(self, chunk: AnyStr) -> None:
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+
+        # drop the oldest chunks, as long as the rest are enough to fill the
+        # buffer.
+        while self._chunks and \
+                self._length - len(self._chunks[0]) >= self._size:
+            self._length -= len(self._chunks.popleft())
+
+    def read(self) -> AnyStr:
+        """ Returns the last `size` bytes (or characters) of the stream. """
+
+        data = self._empty.join(self._chunks)
+        return data[-self._size:] if self._size else self._empty
@@ -38,6 +38,14 @@ parser.add_argument(
     metavar='FILE',
 )
 
+parser.add_argument(
+    '-d', '--tests',
+    help='a directory of tests, in which each input file (such as "1.in") is '
+    'paired with the output file that has the same name (such as "1.out" or '
+    '"1.ans"). the tests are loaded one at a time, as they are executed.',
+    metavar='DIR',
+)
+
 parser.add_argument(
     '-m', '--memory',
     help='an upper bound for the memory that the program is allowed to '
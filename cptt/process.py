@@ -1,13 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import errno
+import functools
+import io
+import os
+import select
+import signal
+import sys
 import threading
 import time
+from contextlib import suppress
 from typing import AnyStr
+from typing import Callable
 from typing import IO
 from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
 
 import psutil  # pip install psutil
 
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # not avaliable on Windows
+
+from cptt.output import OutputCapture
+from cptt.output import TailBuffer
+
+if TYPE_CHECKING:
+    from cptt.limits import KernelLimit
+
+RUSAGE_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+# the units of `ru_maxrss` are bytes on macOS, and kilobytes elsewhere.
+
 
 class TimeLimitExceeded(RuntimeError):
     pass
@@ -17,38 +44,385 @@ class MemoryLimitExceeded(RuntimeError):
     pass
 
 
+class OutputLimitExceeded(RuntimeError):
+    pass
+
+
+def _is_text(stream: IO) -> bool:
+    return isinstance(stream, io.TextIOBase)
+
+
+CLEAR_REFS = '/proc/self/clear_refs'
+
+
+def _peak_rss() -> int:
+    """ Returns the peak resident memory of the running Python process.
+
+    The kernel carries the peak memory of the copy of the parent that a child
+    starts from into the `ru_maxrss` of the child, even after it executes a
+    new program. Thus, the `ru_maxrss` of a child is the exact peak of the
+    child program only if it is above the peak of the parent at the moment
+    the child has been spawned (see `_reset_peak_rss`). """
+
+    if os.path.exists(CLEAR_REFS):
+        return _peak_rss_of(os.getpid())  # since the last reset
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_maxrss * RUSAGE_MAXRSS_UNIT
+
+
+def _reset_peak_rss() -> None:
+    """ Lowers the peak resident memory of the running process to its current
+    resident memory, where supported (Linux 4.0+). This way, children that
+    are spawned afterwards don't inherit a peak that the judge has reached
+    long before (for example, while it has been loading a large test). """
+
+    with suppress(OSError):
+        with open(CLEAR_REFS, 'w') as f:
+            f.write('5')
+
+
+_spawn_lock = threading.Lock()
+# serializes the resets of the peak memory with the spawns that rely on them.
+
+
+PROC_TASKS = '/proc/{pid}/task'
+
+_sessions: set[int] = set()
+# the sessions (and process groups) of the processes that are running.
+
+
+@atexit.register
+def _kill_sessions() -> None:
+    """ The processes run in their own sessions, and won't get the signals
+    that are sent to the foreground process group (such as the interrupt of
+    Ctrl-C). They are killed when the interpreter exits instead, so they are
+    never left running without monitoring. """
+
+    for session in list(_sessions):
+        with suppress(OSError):
+            os.killpg(session, signal.SIGKILL)
+
+
+def _child_pids(pid: int) -> list[int]:
+    """ Returns the direct children of the given process. Uses the
+    `children` files of procfs where avaliable, which are much cheaper than
+    scanning all processes of the system. """
+
+    tasks = PROC_TASKS.format(pid=pid)
+    try:
+        threads = os.listdir(tasks)
+    except FileNotFoundError:
+        if os.path.isdir(PROC_TASKS.format(pid=os.getpid())):
+            return []  # the process has exited
+        return [child.pid for child in psutil.Process(pid).children()]
+
+    children = list()
+    for thread in threads:
+        try:
+            with open(os.path.join(tasks, thread, 'children'), 'rb') as f:
+                children.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue  # the thread has exited
+    return children
+
+
+def _peak_rss_of(pid: int) -> int:
+    """ Returns the peak resident memory of the given process since it has
+    started executing its program (`VmHWM`) where avaliable, so spikes between
+    samples are not missed. Otherwise, returns its current resident memory.
+    """
+
+    try:
+        with open(f'/proc/{pid}/status', 'rb') as f:
+            for line in f:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return psutil.Process(pid).memory_info().rss
+
+
+def _shared_rss_of(pid: int) -> int:
+    """ Returns the proportional resident memory of the given process (`Pss`),
+    where each page that is shared with other processes is divided between
+    them, so the memory of processes that share pages (for example, after a
+    fork) can be summed. Returns its resident memory where not avaliable. """
+
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'rb') as f:
+            for line in f:
+                if line.startswith(b'Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return psutil.Process(pid).memory_info().rss
+
+
+def _send_file(source: int, dest: int, chunk_size: int) -> None:
+    """ Copies everything from the current position of the source file
+    descriptor to the destination file descriptor. On Linux, the data is
+    moved inside the kernel using `sendfile`, without copying it into Python.
+    """
+
+    if sys.platform.startswith('linux'):
+        try:
+            while os.sendfile(dest, source, None, chunk_size):
+                pass
+            return
+        except OSError as err:
+            if err.errno not in (errno.EINVAL, errno.ENOSYS):
+                raise
+            # the source is not a regular file (for example, a pipe).
+
+    while True:
+        data = memoryview(os.read(source, chunk_size))
+        if not data:
+            return
+        while data:
+            data = data[os.write(dest, data):]
+
+
+def _open_pidfd(pid: int) -> int | None:
+    """ Returns a file descriptor that refers to the process with the given
+    pid, or `None` if pidfds are not supported by the running platform. """
+
+    pidfd_open = getattr(os, 'pidfd_open', None)
+    if pidfd_open is None or not hasattr(select, 'poll'):
+        return None
+
+    try:
+        return pidfd_open(pid)
+    except OSError:
+        # the kernel is older than Linux 5.3, or the process is already gone
+        # (in that case, the polling loop will pick up the exit status).
+        return None
+
+
 class MonitoredProcess(psutil.Popen):
 
-    def __init__(self, *args, **kwargs) -> None:
+    POLLING_DELAY = 0.001
+    # similar delay constant is used in the subprocess implementation
+    # https://tinyurl.com/ydc9kjy4
+    # using a delay (even a small one) significantly improves performance,
+    # because the operating system doesn't think that we are busy, but
+    # actually just waiting for an event and doing some checks now and then.
+
+    MIN_SAMPLE_INTERVAL = 0.001
+    MAX_SAMPLE_INTERVAL = 0.05
+    SAMPLE_INTERVAL_RATIO = 0.1
+    # when the exit of the process is detected using a pidfd, we still have
+    # to wake up to sample the memory usage of the process. Most processes
+    # are short lived, so the interval between samples grows with the age of
+    # the process: young processes are sampled frequently, and we back off
+    # for long running ones.
+
+    CHUNK_SIZE = 64 * 1024
+    # the size of the chunks in which the output of the process is read.
+
+    STDERR_TAIL_SIZE = 64 * 1024
+    # the number of bytes at the end of the standard error that are kept.
+
+    def __init__(
+        self,
+        *args,
+        limits: Sequence[KernelLimit] = (),
+        **kwargs,
+    ) -> None:
+        self._init_monitoring(limits)
+
+        if self.limits:
+            kwargs['preexec_fn'] = self._preexec_wrapper(
+                kwargs.get('preexec_fn'),
+            )
+
+        if hasattr(os, 'killpg'):
+            kwargs.setdefault('start_new_session', True)
+            self._session = kwargs['start_new_session']
+
+        # the peak of the judge only grows between resets, so once the child
+        # has been spawned, it bounds the peak that the child has inherited.
+        with _spawn_lock:
+            _reset_peak_rss()
+            super().__init__(*args, **kwargs)
+            self._rss_baseline = _peak_rss()
+
+        if self._session:
+            _sessions.add(self.pid)
+
+        self._start_time = time.monotonic()
+        # The clock starts only after the program has been executed (Popen
+        # returns after the exec call succeeds), so the time spent on forking
+        # the child is not included. We do not use psutils 'create_time'
+        # method because it is inaccurate, and uses the time of the operating
+        # system instead of a monotonic clock.
+
+    def _init_monitoring(self, limits: Sequence[KernelLimit]) -> None:
         self.duration = 0
         self.memory_used = 0
-        self._start_time = time.time()
-        # We do not use psutils 'create_time' method because it is inaccurate,
-        # and uses the time of the operatin system instead of Python's time,
-        # which is consistant for our usage.
+        self.user_time = 0
+        self.system_time = 0
+        self.max_rss: int | None = None
+        # the resource usage of the process, as reported by the kernel when
+        # it is reaped. `max_rss` is the `ru_maxrss` value (in bytes), which
+        # is left unset if it may include memory that the process has
+        # inherited from the judge (see `_peak_rss`). `memory_used` is the
+        # best known peak of the program itself.
+        self.limits = tuple(limits)
+        self._guard_deadline: float | None = None
+        # the earliest moment that one of the kernel limits asked to check
+        # the running process again (see `KernelLimit.guard`).
+        self._rss_baseline = 0
+        # the `ru_maxrss` of the process is attributed to its program only if
+        # it is above this (see `_peak_rss`).
+        self._session = False
+        self._tree_killed = False
+        # if the process leads its own session (and process group), all of
+        # its descendants are killed with it, unless they have left the group.
+
+    @property
+    def cpu_time(self) -> float:
+        """ The total CPU time (user and system) consumed by the process.
+        Avaliable only after the process has been reaped. """
+        return self.user_time + self.system_time
+
+    def _preexec_wrapper(self, preexec_fn):
+        limits = self.limits
+
+        def preexec() -> None:
+            for limit in limits:
+                limit.preexec()
+            if preexec_fn is not None:
+                preexec_fn()
+
+        return preexec
+
+    def _samples_memory(self) -> bool:
+        """ If the exact peak memory usage of the process is reported by one
+        of its kernel limits, there is no need to sample the memory usage while
+        the process is running. """
+
+        return not any(limit.measures_memory for limit in self.limits)
+
+    def _reap(self, block: bool = False) -> int | None:
+        """ Collects the exit status of the process if it has exited, along
+        with its resource usage (where supported by the platform). Returns the
+        exit code, or `None` if the process is still running. """
+
+        if self.returncode is not None:
+            return self.returncode
+
+        if not hasattr(os, 'wait4'):
+            if block:
+                psutil.Popen.wait(self)
+            if self._Popen__subproc.poll() is not None:
+                self.duration = time.monotonic() - self._start_time
+            return self.returncode
+
+        try:
+            if self._session and hasattr(os, 'waitid'):
+                # the process group is killed before its leader is reaped,
+                # while the ID of the group can't be reused by the system.
+                exited = os.waitid(
+                    os.P_PID, self.pid,
+                    os.WEXITED | os.WNOWAIT | (0 if block else os.WNOHANG),
+                )
+                if exited is None:
+                    return None
+                self._kill_tree()
+
+            pid, status, rusage = os.wait4(
+                self.pid, 0 if block else os.WNOHANG,
+            )
+        except ChildProcessError:
+            # the process has already been reaped by someone else.
+            return self._Popen__subproc.poll()
+
+        if pid:
+            self._record_usage(
+                time.monotonic(),
+                rusage.ru_utime,
+                rusage.ru_stime,
+                rusage.ru_maxrss * RUSAGE_MAXRSS_UNIT,
+            )
+            self._handle_exitstatus(status)
+
+        return self.returncode
+
+    def poll(self) -> int | None:
+        """ Reaps the process if it has exited (see `_reap`), and returns its
+        exit code. Returns `None` if the process is still running. """
+        return self._reap()
 
-        return super().__init__(*args, **kwargs)
+    def _record_usage(
+        self,
+        end_time: float,
+        user_time: float,
+        system_time: float,
+        max_rss: int,
+    ) -> None:
+        """ Stores the resource usage of the reaped process. """
+
+        self.duration = end_time - self._start_time
+        self.user_time = user_time
+        self.system_time = system_time
+        if max_rss > self._rss_baseline:
+            self.max_rss = max_rss
+            self.memory_used = max(self.memory_used, max_rss)
+
+    def _exit_fd(self) -> int | None:
+        """ Returns a new file descriptor that becomes readable once the
+        process exits, or `None` if the exit can't be waited on this way. """
+        return _open_pidfd(self.pid)
 
     def _time_guard(self, time_limit: float | None) -> None:
         """ Asserts that the process is still running in his given timeframe.
         If the current time is pass the allowed time for the process, a
         `TimeLimitExceeded` exception is raised. """
 
-        self.duration = time.time() - self._start_time
+        self.duration = time.monotonic() - self._start_time
         if time_limit is not None and self.duration > time_limit:
             raise TimeLimitExceeded(
                 f'process running {self.duration} seconds '
                 f'(limited to {time_limit})',
             )
 
+    def _peak_memory(self) -> int:
+        """ Returns the memory usage of the process and all of its
+        descendants. Without descendants, this is the peak resident memory of
+        the process. Otherwise, the proportional memory of the processes is
+        summed (see `_shared_rss_of`), so the pages that they share are
+        counted once. """
+
+        peak = _peak_rss_of(self.pid)
+        tree = [self.pid]
+        pending = [self.pid]
+        while pending:
+            try:
+                children = _child_pids(pending.pop())
+            except (OSError, psutil.Error):
+                continue  # exited while we were looking
+            tree += children
+            pending += children
+
+        if len(tree) == 1:
+            return peak
+
+        usage = 0
+        for pid in tree:
+            with suppress(psutil.Error):
+                usage += _shared_rss_of(pid)
+        return max(peak, usage)
+
     def _memory_guard(self, memory_limit: float | None) -> None:
         """ Asserts that the process uses no more memory then he is allowed to.
         If the process is caught using more memory than he is allowed to, a
         `MemoryLimitExceeded` exception is raised. """
 
         try:
-            usage = self.memory_info().rss
-        except psutil.NoSuchProcess:
+            usage = self._peak_memory()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
             return
 
         self.memory_used = max(self.memory_used, usage)
@@ -59,6 +433,138 @@ class MonitoredProcess(psutil.Popen):
                 f'(limited to {memory_limit})',
             )
 
+    def _check_limits(
+        self,
+        time_limit: float | None,
+        memory_limit: float | None,
+    ) -> None:
+        if self._samples_memory():
+            self._memory_guard(memory_limit)
+        self._time_guard(time_limit)
+        self._limits_guard()
+
+    def _limits_guard(self) -> None:
+        """ Lets each of the kernel limits check the running process, and
+        records the moment that it should be checked again. """
+
+        self._guard_deadline = None
+        for limit in self.limits:
+            timeout = limit.guard(self)
+            if timeout is None:
+                continue
+            deadline = time.monotonic() + timeout
+            if self._guard_deadline is None or deadline < self._guard_deadline:
+                self._guard_deadline = deadline
+
+    def _check_usage(self, memory_limit: float | None) -> None:
+        """ Asserts that the process did not violate any of its limits, using
+        the exact resource usage that is collected after it has been reaped.
+        This catches short spikes that are missed by sampling. """
+
+        for limit in self.limits:
+            limit.check(self)
+
+        if memory_limit is not None and self.memory_used > memory_limit:
+            raise MemoryLimitExceeded(
+                f'process peaked at {self.memory_used} bytes '
+                f'(limited to {memory_limit})',
+            )
+
+    def _kill_tree(self) -> None:
+        """ Kills the process along with all of its descendants, once. If the
+        process leads its own process group, the whole group is killed.
+        Otherwise, only the descendants that can be found are. """
+
+        if self._tree_killed:
+            return
+        self._tree_killed = True
+
+        if self._session:
+            with suppress(OSError):
+                os.killpg(self.pid, signal.SIGKILL)
+            _sessions.discard(self.pid)
+            return
+
+        with suppress(psutil.Error):
+            for child in self.children(recursive=True):
+                with suppress(psutil.NoSuchProcess):
+                    child.kill()
+        with suppress(psutil.NoSuchProcess):
+            self.kill()
+
+    def _terminate(self) -> None:
+        """ Kills the process and all of its descendants (if they are still
+        running), reaps it and releases the resources that are held by its
+        kernel limits. """
+
+        # without `waitid`, a process that has exited by itself has already
+        # been reaped, and only the rest of its group is killed here.
+        self._kill_tree()
+
+        try:
+            self._reap(block=True)
+        finally:
+            for limit in self.limits:
+                limit.release(self)
+            self.limits = tuple()
+
+    def _wait_polling(
+        self,
+        time_limit: float | None,
+        memory_limit: float | None,
+    ) -> None:
+        """ Fallback waiting strategy for platforms that can't notify us when
+        the process exits. Polls the process every `POLLING_DELAY` seconds. """
+
+        while self._reap() is None:
+            self._check_limits(time_limit, memory_limit)
+            time.sleep(self.POLLING_DELAY)
+
+    def _wait_pidfd(
+        self,
+        pidfd: int,
+        time_limit: float | None,
+        memory_limit: float | None,
+    ) -> None:
+        """ Blocks on a pidfd that becomes readable as soon as the process
+        exits. We only wake up to sample the memory usage of the process (at
+        a decreasing rate, and only if needed) and exactly when the time limit
+        is reached. """
+
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+
+        while self._reap() is None:
+            self._check_limits(time_limit, memory_limit)
+            timeout = self._wakeup_timeout(time_limit)
+
+            # poll accepts a floating timeout in milliseconds, and rounds it
+            # up. Thus, we never wake up before the deadline is reached.
+            poller.poll(None if timeout is None else timeout * 1000)
+
+    def _wakeup_timeout(self, time_limit: float | None) -> float | None:
+        """ Returns the number of seconds until the limits of the process
+        should be checked again, or `None` if there is no need to wake up
+        before the process exits. """
+
+        timeout = self._sample_interval() if self._samples_memory() else None
+        deadlines = [self._guard_deadline]
+        if time_limit is not None:
+            deadlines.append(self._start_time + time_limit)
+
+        for deadline in deadlines:
+            if deadline is None:
+                continue
+            remaining = max(deadline - time.monotonic(), 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _sample_interval(self) -> float:
+        age = time.monotonic() - self._start_time
+        interval = age * self.SAMPLE_INTERVAL_RATIO
+        interval = max(interval, self.MIN_SAMPLE_INTERVAL)
+        return min(interval, self.MAX_SAMPLE_INTERVAL)
+
     def wait(
         self,
         time_limit: float = None,
@@ -74,48 +580,138 @@ class MonitoredProcess(psutil.Popen):
         get into a deadlock state caused by the operating system. In that case,
         use the `communicate` method instead. """
 
-        delay = 0.001
-        # similar delay constant is used in the subprocess implementation
-        # https://tinyurl.com/ydc9kjy4
-        # using a delay (even a small one) significantly improves performance,
-        # because the operating system doesn't think that we are busy, but
-        # actually just waiting for an event and doing some checks now and then.
-
         try:
-            while self.poll() is None:
-                self._memory_guard(memory_limit)
-                self._time_guard(time_limit)
-                time.sleep(delay)
+            pidfd = None if self.returncode is not None \
+                else self._exit_fd()
+            if pidfd is None:
+                self._wait_polling(time_limit, memory_limit)
+            else:
+                try:
+                    self._wait_pidfd(pidfd, time_limit, memory_limit)
+                finally:
+                    os.close(pidfd)
 
         finally:
-            try:
-                self.kill()
-            except psutil.NoSuchProcess:
-                pass
+            self._terminate()
 
+        self._check_usage(memory_limit)
         return self.returncode
 
-    @staticmethod
-    def _consume_stream(stream: IO[AnyStr]) -> None:
-        stream._buffer = stream.read()
-        stream.close()
+    def _consume_stream(
+        self,
+        stream: IO[AnyStr],
+        consumer: Callable[[AnyStr], None],
+        limit: float | None = None,
+    ) -> None:
+        """ Passes the stream to the consumer chunk by chunk, as the process
+        produces it. If the consumer raises an exception, or the stream grows
+        above the given limit, the process is killed and the exception is
+        re-raised by `communicate`. """
+
+        # binary streams return the avaliable data right away with read1,
+        # while read blocks until the whole chunk is avaliable.
+        read = getattr(stream, 'read1', stream.read)
+
+        size = 0
+        try:
+            while True:
+                chunk = read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise OutputLimitExceeded(
+                        f'process wrote more than {limit} bytes',
+                    )
+
+                consumer(chunk)
+
+        except Exception as exc:
+            self._consumer_failed(exc)
+
+        finally:
+            stream.close()
+
+    def _consumer_failed(self, exc: Exception) -> None:
+        """ Kills the process after one of its consumers has failed, and keeps
+        the first error so it can be re-raised. """
+
+        if self._consumer_error is None:
+            self._consumer_error = exc
+        try:
+            self.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+    def _feed_stream(self, stream: IO[AnyStr], input: AnyStr | IO) -> None:
+        try:
+            if hasattr(input, 'fileno'):
+                _send_file(input.fileno(), stream.fileno(), self.CHUNK_SIZE)
+            else:
+                stream.write(input)
+            stream.close()
+
+        except BrokenPipeError:
+            # the process exited (or has been killed) without reading all of
+            # its input.
+            pass
+
+    def _output_consumers(
+        self,
+        stdout_consumer: Callable[[AnyStr], None] | None,
+        output_limit: float | None,
+    ) -> tuple[OutputCapture | None, TailBuffer | None, list[tuple]]:
+        """ Returns the capture of the standard output (if it is buffered),
+        the tail of the standard error, and a `(stream, consumer, limit)`
+        tuple for each of the piped output streams. """
+
+        consumers = list()
+
+        capture = None
+        if self.stdout is not None:
+            if stdout_consumer is None:
+                capture = OutputCapture(text=_is_text(self.stdout))
+                stdout_consumer = capture.write
+            consumers.append((self.stdout, stdout_consumer, output_limit))
 
-    @staticmethod
-    def _feed_stream(stream: IO[AnyStr], input: AnyStr) -> None:
-        stream.write(input)
-        stream.close()
+        tail = None
+        if self.stderr is not None:
+            tail = TailBuffer(
+                self.STDERR_TAIL_SIZE,
+                text=_is_text(self.stderr),
+            )
+            consumers.append((self.stderr, tail.write, None))
+
+        return capture, tail, consumers
 
     def communicate(
         self,
-        input: AnyStr = None,
+        input: AnyStr | IO = None,
         time_limit: float = None,
         memory_limit: float = None,
+        stdout_consumer: Callable[[AnyStr], None] = None,
+        output_limit: float = None,
     ) -> tuple[Optional[AnyStr], Optional[AnyStr]]:
         """ Comminicate with the process, and wait until it terminates.
         Returns the buffered stdout and stderr stream values, after they
-        have been consumed and closed (if they were piped). """
+        have been consumed and closed (if they were piped). The input can be
+        a string, or an open file which is copied into the standard input of
+        the process inside the kernel (where supported). The standard output
+        spills to a temporary file while the process runs if it gets large
+        (a binary output is then returned as a `MappedOutput` of that file,
+        instead of being read back), and only the last `STDERR_TAIL_SIZE`
+        bytes of the standard error are kept.
+
+        If a `stdout_consumer` is provided, the standard output is not buffered
+        (and `None` is returned instead). Each chunk of the output is passed to
+        the consumer as soon as it is produced, and if the consumer raises an
+        exception, the process is killed and the exception is propagated.
+        If the standard output grows above the `output_limit`, the process is
+        killed and an `OutputLimitExceeded` exception is raised. """
 
         threads: list[threading.Thread] = list()
+        self._consumer_error = None
 
         if input:
             threads.append(
@@ -124,36 +720,230 @@ class MonitoredProcess(psutil.Popen):
                     args=(self.stdin, input),
                 ),
             )
+        elif self.stdin is not None:
+            self.stdin.close()
 
-        def create_consuming_thread(stream):
+        capture, tail, consumers = self._output_consumers(
+            stdout_consumer, output_limit,
+        )
+        for args in consumers:
             threads.append(
-                threading.Thread(
-                    target=self._consume_stream,
-                    args=(stream,),
-                ),
+                threading.Thread(target=self._consume_stream, args=args),
             )
 
-        if self.stdout is not None:
-            create_consuming_thread(self.stdout)
-
-        if self.stderr is not None:
-            create_consuming_thread(self.stderr)
-
         for thread in threads:
             thread.daemon = True
             thread.start()
 
         try:
-            self.wait(time_limit, memory_limit)
+            try:
+                self.wait(time_limit, memory_limit)
+            finally:
+                for thread in threads:
+                    thread.join()
+
+            if self._consumer_error is not None:
+                raise self._consumer_error
+            out = None if capture is None else capture.read()
+
+        finally:
+            if capture is not None:
+                capture.close()
+
+        return out, None if tail is None else tail.read()
+
+    async def wait_async(
+        self,
+        time_limit: float = None,
+        memory_limit: float = None,
+    ) -> int:
+        """ The same as `wait`, but waits on the running asyncio event loop
+        instead of blocking the calling thread. """
+
+        loop = asyncio.get_running_loop()
+        exited = asyncio.Event()
+
+        try:
+            fd = None if self.returncode is not None else self._exit_fd()
+            if fd is not None:
+                loop.add_reader(fd, exited.set)
+
+            try:
+                while self._reap() is None:
+                    self._check_limits(time_limit, memory_limit)
+                    timeout = self._wakeup_timeout(time_limit)
+                    if fd is None:
+                        timeout = self.POLLING_DELAY if timeout is None \
+                            else min(timeout, self.POLLING_DELAY)
+
+                    try:
+                        await asyncio.wait_for(exited.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+            finally:
+                if fd is not None:
+                    loop.remove_reader(fd)
+                    os.close(fd)
+
         finally:
-            for thread in threads:
-                thread.join()
+            self._terminate()
+
+        self._check_usage(memory_limit)
+        return self.returncode
+
+    def _consume_async(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        stream: IO[bytes],
+        consumer: Callable[[bytes], None],
+        limit: float | None = None,
+    ) -> asyncio.Future:
+        """ Registers a reader that passes the stream to the consumer chunk
+        by chunk (see `_consume_stream`). Returns a future that is done once
+        the stream is closed. """
+
+        fd = stream.fileno()
+        os.set_blocking(fd, False)
+        done = loop.create_future()
+        size = 0
+
+        def on_readable() -> None:
+            nonlocal size
             try:
-                self.kill()
-            except psutil.NoSuchProcess:
+                chunk = os.read(fd, self.CHUNK_SIZE)
+                if chunk:
+                    size += len(chunk)
+                    if limit is not None and size > limit:
+                        raise OutputLimitExceeded(
+                            f'process wrote more than {limit} bytes',
+                        )
+                    consumer(chunk)
+                    return
+            except BlockingIOError:
+                return
+            except Exception as exc:
+                self._consumer_failed(exc)
+
+            loop.remove_reader(fd)
+            stream.close()
+            done.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        return done
+
+    def _feed_async(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        stream: IO[bytes],
+        input: bytes | IO,
+    ) -> asyncio.Future:
+        """ Registers a writer that feeds the input into the given stream (see
+        `_feed_stream`). Returns a future that is done once the stream is
+        closed. """
+
+        fd = stream.fileno()
+        os.set_blocking(fd, False)
+        done = loop.create_future()
+
+        source = input.fileno() if hasattr(input, 'fileno') else None
+        pending = memoryview(b'' if source is not None else input)
+        use_sendfile = source is not None and \
+            sys.platform.startswith('linux')
+
+        def on_writable() -> None:
+            nonlocal pending, use_sendfile
+            try:
+                if source is not None and not pending and use_sendfile:
+                    try:
+                        if os.sendfile(fd, source, None, self.CHUNK_SIZE):
+                            return
+                    except OSError as err:
+                        if err.errno not in (errno.EINVAL, errno.ENOSYS):
+                            raise
+                        use_sendfile = False
+                        return
+
+                elif source is not None and not pending:
+                    pending = memoryview(os.read(source, self.CHUNK_SIZE))
+
+                if pending:
+                    pending = pending[os.write(fd, pending):]
+                    return
+
+            except BlockingIOError:
+                return
+            except BrokenPipeError:
                 pass
 
-        return (
-            None if self.stdout is None else self.stdout._buffer,
-            None if self.stderr is None else self.stderr._buffer,
+            loop.remove_writer(fd)
+            stream.close()
+            done.set_result(None)
+
+        loop.add_writer(fd, on_writable)
+        return done
+
+    async def communicate_async(
+        self,
+        input: bytes | IO = None,
+        time_limit: float = None,
+        memory_limit: float = None,
+        stdout_consumer: Callable[[bytes], None] = None,
+        output_limit: float = None,
+    ) -> tuple[Optional[bytes], Optional[bytes]]:
+        """ The same as `communicate`, but instead of starting a thread for
+        each stream, the streams and the exit of the process are multiplexed
+        on the running asyncio event loop. Supports only binary streams.
+
+        Event loops on Windows can't wait on pipes, so there `communicate`
+        runs in the default executor of the loop instead. """
+
+        loop = asyncio.get_running_loop()
+        if sys.platform == 'win32':
+            return await loop.run_in_executor(
+                None, functools.partial(
+                    self.communicate, input, time_limit, memory_limit,
+                    stdout_consumer, output_limit,
+                ),
+            )
+
+        self._consumer_error = None
+
+        capture, tail, consumers = self._output_consumers(
+            stdout_consumer, output_limit,
         )
+        streams = [stream for stream, _, _ in consumers]
+        if any(_is_text(stream) for stream in streams):
+            raise ValueError('only binary streams can be consumed async')
+
+        futures = [
+            self._consume_async(loop, *args) for args in consumers
+        ]
+        if input:
+            streams.append(self.stdin)
+            futures.append(self._feed_async(loop, self.stdin, input))
+        elif self.stdin is not None:
+            self.stdin.close()
+
+        try:
+            try:
+                await self.wait_async(time_limit, memory_limit)
+            finally:
+                await asyncio.gather(*futures)
+
+            if self._consumer_error is not None:
+                raise self._consumer_error
+            out = None if capture is None else capture.read()
+
+        finally:
+            for stream in streams:
+                if not stream.closed:
+                    # the streams are still registered only if we have been
+                    # cancelled.
+                    loop.remove_reader(stream.fileno())
+                    loop.remove_writer(stream.fileno())
+                    stream.close()
+            if capture is not None:
+                capture.close()
+
+        return out, None if tail is None else tail.read()
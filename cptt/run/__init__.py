@@ -1,8 +1,13 @@
 from .base import Job, Runner, JobEventManager
 from .events import JobEvent, JobStartEvent, JobEndEvent
+from .loop import AsyncRunner
+from .pool import ProcessPoolRunner
+from .schedule import JobHistory, SchedulingPolicy
+from .schedule import FifoPolicy, LongestFirstPolicy, FailedFirstPolicy
 
 
 __all__ = [
-    'Job', 'Runner', 'JobEventManager',
-    'JobEvent', 'JobStartEvent', 'JobEndEvent',
+    'Job', 'Runner', 'AsyncRunner', 'ProcessPoolRunner', 'JobEventManager',
+    'JobEvent', 'JobStartEvent', 'JobEndEvent', 'JobHistory',
+    'SchedulingPolicy', 'FifoPolicy', 'LongestFirstPolicy', 'FailedFirstPolicy',
 ]
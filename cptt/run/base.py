@@ -1,87 +1,317 @@
 from __future__ import annotations
 
+import asyncio
+import itertools
 import threading
+import time
 from abc import ABC
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from dataclasses import field
 from queue import Empty
 from queue import Queue
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 
+from cptt.cpus import allocate_cpu_sets
 from cptt.run.events import JobEndEvent
 from cptt.run.events import JobEvent
 from cptt.run.events import JobStartEvent
+from cptt.run.schedule import FifoPolicy
+from cptt.run.schedule import JobHistory
+from cptt.run.schedule import SchedulingPolicy
+
+
+Continuation = Callable[[], None]
 
 
 class JobEventManager:
 
     def __init__(self) -> None:
-        self._events: Queue[JobEvent] = Queue()
+        self._events: Queue[JobEvent | None] = Queue()
 
-    def push_event(self, event: JobEvent) -> None:
+    def push_event(self, event: JobEvent | None) -> None:
         self._events.put(event, block=True)
 
-    def next_event(self) -> JobEvent:
+    def next_event(self) -> JobEvent | None:
         return self._events.get(block=True)
 
 
 @dataclass
 class Job(ABC):
     manager: JobEventManager = field(init=False, default=None)
+    cpus: frozenset[int] = field(init=False, default=None)
+    # the CPUs that the job should run on, if it has been assigned to a pinned
+    # slot by the runner.
+    cancelled: bool = field(init=False, default=False)
 
     @abstractmethod
-    def execute(self) -> None:
+    def execute(self) -> Continuation | None:
         """ The function that will be executed when the job runs in its own
         thread. You can assume that `self.manager` is initialized correctly
         and avaliable for message passing using the `self.manager.push_event`
-        method. """
+        method.
+
+        The job may return a function that completes it, if the rest of its
+        work doesn't need the slot of the job (for example, validating the
+        output of a process). The runner calls it concurrently with the next
+        jobs, and the job ends once it returns. """
+
+    async def run(self) -> None:
+        """ Executes the job on the running asyncio event loop. By default,
+        `execute` (and the function that it returns, if any) is called in the
+        default executor of the loop. Jobs that can wait for their work
+        without blocking a thread should override this. """
+
+        loop = asyncio.get_running_loop()
+        rest = await loop.run_in_executor(None, self.execute)
+        if rest is not None:
+            await loop.run_in_executor(None, rest)
+
+    def cancel(self) -> None:
+        """ Asks the job to stop as soon as possible. May be called from
+        another thread while the job is executing, before it has started, or
+        after it has finished. """
+        self.cancelled = True
+
+    def drop(self) -> None:
+        """ Called instead of `execute` (or `run`) if the job is cancelled
+        before it starts. Jobs can push the events that describe their final
+        state here. Does nothing by default. """
+
+    def history_key(self) -> str | None:
+        """ Returns a string that identifies the job between runs, so its
+        duration and outcome can be recorded in a `JobHistory`. Jobs that
+        return `None` (the default) are not recorded. """
+        return None
 
 
 class Runner:
+    """ Executes the collected jobs in `threads` concurrent slots.
+
+    If `pin_cpus` is set, each slot is assigned a dedicated CPU (or a whole
+    physical core, if `avoid_smt` is also set), which the jobs that run in it
+    are pinned to. Isolated CPUs are preferred, and by default there is a
+    slot for each of the avaliable CPUs. Without pinning, a single slot is
+    used by default.
+
+    The order in which the jobs are executed is decided by the given
+    scheduling `policy` (by order of collection, by default). If a `history`
+    is provided, the duration and the outcome of each job are recorded in it,
+    and it is saved once all jobs are finished.
+
+    The execution can be cancelled by calling `cancel` (usually from
+    `_handle_job_event`), or automatically once a job fails if `fail_fast` is
+    set.
+
+    Jobs can also be collected lazily (see `collect_lazily`), so they are
+    created only once a slot is free to execute them. """
+
+    def __init__(
+        self,
+        threads: int = None,
+        pin_cpus: bool = False,
+        avoid_smt: bool = False,
+        policy: SchedulingPolicy = None,
+        history: JobHistory = None,
+        fail_fast: bool = False,
+    ) -> None:
+        self._cpu_sets = allocate_cpu_sets(threads, avoid_smt) \
+            if pin_cpus else None
+        if threads is None:
+            threads = len(self._cpu_sets) if pin_cpus else 1
 
-    def __init__(self, threads: int = 1) -> None:
         self._threads = threads
         self._queue: Queue[Job] = Queue()
         self._manager = JobEventManager()
+        self._policy = FifoPolicy() if policy is None else policy
+        self._history = history
+        self._started: dict[int, float] = dict()
+        self._failed: set[int] = set()
+        self._fail_fast = fail_fast
+        self._lazy: list[Iterable[Job]] = list()
+        self._active: dict[int, Job] = dict()
+        # the jobs that have been handed to a slot and haven't ended yet.
+        self._next_lock = threading.Lock()
+        self._cancelled = False
 
     def collect(self, job: Job) -> None:
         job.manager = self._manager
         self._queue.put(job)
 
-    def _execute_thread(self) -> None:
+    def collect_lazily(self, jobs: Iterable[Job]) -> None:
+        """ Collects the jobs of the given iterable without iterating over it.
+        The next job is taken from it only once a slot is free, so a generator
+        can create its jobs (and whatever they hold) on demand. Lazily
+        collected jobs are executed after the rest of the jobs, by order of
+        iteration, regardless of the scheduling policy. """
+        self._lazy.append(jobs)
+
+    def _take_jobs(self) -> Iterator[Job]:
+        """ Removes all of the collected jobs from the queue, and returns an
+        iterator over them in the order they should be executed (see
+        `_next_job`). """
+
+        jobs = list()
         while True:
             try:
-                job = self._queue.get_nowait()
+                jobs.append(self._queue.get_nowait())
             except Empty:
                 break
-            job.manager.push_event(JobStartEvent(job))
+
+        lazy, self._lazy = self._lazy, list()
+        self._active = dict()
+        self._cancelled = False
+        return itertools.chain(self._policy.order(jobs, self._history), *lazy)
+
+    def _next_job(self, jobs: Iterator[Job]) -> Job | None:
+        """ Takes the next job to execute from the iterator that is returned by
+        `_take_jobs`, or returns `None` if there are no jobs left. May be
+        called from any slot. Jobs that are taken after the execution has been
+        cancelled are cancelled too, so they are dropped. """
+
+        with self._next_lock:
+            job = next(jobs, None)
+        if job is None:
+            return None
+
+        job.manager = self._manager
+        self._active[id(job)] = job
+        if self._cancelled:
+            job.cancel()
+        return job
+
+    def cancel(self) -> None:
+        """ Cancels the execution of the jobs. Jobs that haven't started yet
+        are dropped (see `Job.drop`) and the running jobs are cancelled, so
+        all of them end quickly. Should be called from the thread that handles
+        the events. """
+
+        if self._cancelled:
+            return
+        self._cancelled = True
+        for job in list(self._active.values()):
+            job.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def _slot_cpus(self, slot: int) -> frozenset[int] | None:
+        return None if self._cpu_sets is None else self._cpu_sets[slot]
+
+    def _execute_thread(self, slot: int, jobs: Iterator[Job]) -> None:
+        try:
+            while True:
+                job = self._next_job(jobs)
+                if job is None:
+                    break
+                self._execute_job(slot, job)
+        finally:
+            # tells the main thread that the slot has no more jobs.
+            self._manager.push_event(None)
+
+    def _execute_job(self, slot: int, job: Job) -> None:
+        job.cpus = self._slot_cpus(slot)
+        job.manager.push_event(JobStartEvent(job))
+        rest = None
+        try:
+            if job.cancelled:
+                job.drop()
+            else:
+                rest = job.execute()
+        finally:
+            if rest is None:
+                job.manager.push_event(JobEndEvent(job))
+            else:
+                self._complete(job, rest)
+
+    def _complete(self, job: Job, rest: Continuation) -> None:
+        """ Calls the function that completes the job in the background,
+        and ends the job once it returns. There are at most `threads` jobs
+        that are being completed at the same time: if there are more, the
+        calling slot waits, so the pending work doesn't pile up. """
+
+        self._completing.acquire()
+
+        def complete() -> None:
             try:
-                job.execute()
+                rest()
             finally:
+                self._completing.release()
                 job.manager.push_event(JobEndEvent(job))
 
+        self._completions.submit(complete)
+
+    def _dispatch_event(self, event: JobEvent) -> None:
+        """ Records the event in the history (if there is one), cancels the
+        execution if the job has failed and `fail_fast` is set, and passes the
+        event to `_handle_job_event`. Called from the main thread. """
+
+        job = id(event.job)
+        if isinstance(event, JobStartEvent):
+            self._started[job] = time.monotonic()
+
+        elif isinstance(event, JobEndEvent):
+            self._active.pop(job, None)
+            duration = time.monotonic() - self._started.pop(job, time.monotonic())
+            failed = job in self._failed
+            self._failed.discard(job)
+            # jobs that have been stopped before they have finished (or
+            # failed) do not tell anything about their next execution.
+            if self._history is not None and (failed or not event.job.cancelled):
+                self._history.record(event.job, duration, failed)
+
+        elif event.failed:
+            self._failed.add(job)
+            if self._fail_fast:
+                self.cancel()
+
+        self._handle_job_event(event)
+
+    def _save_history(self) -> None:
+        if self._history is not None:
+            self._history.save()
+
     def _handle_job_event(self, event: JobEvent) -> None:
         """ This method will get called during the blocking execution of the
         jobs from the main thread, reacting to different events from the child
         threads. Avaliable to be overwritten. """
 
     def execute(self) -> None:
-        """ Execute all collected jobs in all avaliable threads, by order
-        of collection. Block execution of calling thread until all jobs are
-        finished executing. """
-
-        # although the documentation states the the qsize method is only an
-        # estimate for the size of the queue, I find it useful and accurate.
-        # if we find out that it it causes bugs, we should count the jobs
-        # independently.
-        active_jobs = self._queue.qsize()
-
-        for _ in range(self._threads):
-            t = threading.Thread(target=self._execute_thread, daemon=True)
+        """ Execute all collected jobs in all avaliable threads, in the order
+        that is decided by the scheduling policy. Block execution of calling
+        thread until all jobs are finished executing. """
+
+        jobs = self._take_jobs()
+        self._completing = threading.BoundedSemaphore(self._threads)
+        self._completions = ThreadPoolExecutor(self._threads)
+        for slot in range(self._threads):
+            t = threading.Thread(
+                target=self._execute_thread,
+                args=(slot, jobs),
+                daemon=True,
+            )
             t.start()
 
-        while active_jobs:
-            event = self._manager.next_event()
-            if isinstance(event, JobEndEvent):
-                active_jobs -= 1
-            self._handle_job_event(event)
+        # the number of jobs isn't known in advance (as some may be collected
+        # lazily), so the execution ends once all slots have run out of jobs
+        # and all of the jobs that have started have ended.
+        slots, active_jobs = self._threads, 0
+        try:
+            while slots or active_jobs:
+                event = self._manager.next_event()
+                if event is None:
+                    slots -= 1
+                    continue
+                if isinstance(event, JobStartEvent):
+                    active_jobs += 1
+                elif isinstance(event, JobEndEvent):
+                    active_jobs -= 1
+                self._dispatch_event(event)
+        finally:
+            self._completions.shutdown(wait=False)
+
+        self._save_history()
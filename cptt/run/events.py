@@ -10,6 +10,11 @@ if TYPE_CHECKING:
 class JobEvent:
     job: Job
 
+    @property
+    def failed(self) -> bool:
+        """ True if the event reports that the job has failed. """
+        return False
+
 
 @dataclass
 class JobStartEvent(JobEvent):
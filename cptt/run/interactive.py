@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import os
+import signal
+import threading
+from contextlib import suppress
+from dataclasses import dataclass
+from dataclasses import field
+from subprocess import PIPE
+
+import psutil  # pip install psutil
+
+from cptt.limits import create_cpu_affinity
+from cptt.limits import KernelLimit
+from cptt.process import MemoryLimitExceeded
+from cptt.process import MonitoredProcess
+from cptt.process import TimeLimitExceeded
+from cptt.run.base import Job
+from cptt.run.process import ProcessStatus
+from cptt.run.process import ProcessStatusEvent
+
+
+@dataclass
+class InteractiveJob(Job):
+    """ Executes the program along with an interactor, which talks with it
+    and decides whether it is correct. The standard output of each of them
+    is connected directly to the standard input of the other through a pipe,
+    so messages never pass through Python.
+
+    Each of them has its own time and memory limits. The status of the job
+    is decided by the interactor: if it exits with zero, the program is
+    correct (as long as it exits with zero too). If it exits with any other
+    code, the answer of the program is wrong. An interactor that exceeds its
+    limits or is killed by a signal is reported as `INTERACTOR_ERROR`, unless
+    it has been killed by `SIGPIPE` because the program has stopped reading
+    (in which case, the status is decided by the program). """
+
+    program: list[str]
+    interactor: list[str]
+    time_limit: float = None
+    memory_limit: float = None
+    interactor_time_limit: float = None
+    interactor_memory_limit: float = None
+
+    _processes: list[MonitoredProcess] = field(
+        init=False, default_factory=list,
+        repr=False, compare=False,
+    )
+    # the processes of the program and the interactor, which are killed if
+    # the job is cancelled.
+
+    def _kernel_limits(self) -> list[KernelLimit]:
+        # only the program is pinned to the CPUs of the slot. The interactor
+        # is free to run on other CPUs, so its computation is not added to the
+        # wall time of the program.
+        limit = None if self.cpus is None else create_cpu_affinity(self.cpus)
+        return [] if limit is None else [limit]
+
+    def _kill(self) -> None:
+        for process in self._processes:
+            with suppress(psutil.NoSuchProcess):
+                process.kill()
+
+    def cancel(self) -> None:
+        super().cancel()
+        self._kill()
+
+    def drop(self) -> None:
+        self.manager.push_event(
+            ProcessStatusEvent(
+                job=self,
+                status=ProcessStatus.KILLED,
+                time=0,
+                memory=0,
+            ),
+        )
+
+    def _start(self) -> tuple[MonitoredProcess, MonitoredProcess]:
+        """ Starts the interactor and the program, with their standard streams
+        connected to each other. """
+
+        to_program, from_interactor = os.pipe()
+        to_interactor, from_program = os.pipe()
+        try:
+            interactor = MonitoredProcess(
+                self.interactor,
+                stdin=to_interactor, stdout=from_interactor, stderr=PIPE,
+            )
+            self._processes.append(interactor)
+            try:
+                program = MonitoredProcess(
+                    self.program,
+                    stdin=to_program, stdout=from_program, stderr=PIPE,
+                    limits=self._kernel_limits(),
+                )
+            except BaseException:
+                self._kill()
+                interactor.wait()
+                raise
+            self._processes.append(program)
+
+        finally:
+            for fd in (to_program, from_interactor, to_interactor, from_program):
+                os.close(fd)
+
+        if self.cancelled:
+            self._kill()
+        return interactor, program
+
+    def _communicate(
+        self,
+        process: MonitoredProcess,
+        time_limit: float | None,
+        memory_limit: float | None,
+        errors: dict[MonitoredProcess, Exception],
+    ) -> None:
+        """ Waits for one of the sides to exit. If it exceeds its limits, the
+        other side is killed too, as it would wait for it forever. """
+
+        try:
+            process.communicate(
+                time_limit=time_limit,
+                memory_limit=memory_limit,
+            )
+        except (TimeLimitExceeded, MemoryLimitExceeded) as exc:
+            errors[process] = exc
+            self._kill()
+
+    def _status(
+        self,
+        interactor: MonitoredProcess,
+        program: MonitoredProcess,
+        errors: dict[MonitoredProcess, Exception],
+    ) -> ProcessStatus:
+        if self.cancelled:
+            return ProcessStatus.KILLED
+
+        error = errors.get(program)
+        if isinstance(error, TimeLimitExceeded):
+            return ProcessStatus.TIME_LIMIT
+        if isinstance(error, MemoryLimitExceeded):
+            return ProcessStatus.MEMORY_LIMIT
+
+        if interactor in errors:
+            return ProcessStatus.INTERACTOR_ERROR
+        if interactor.returncode == -getattr(signal, 'SIGPIPE', 0):
+            # the interactor has written to the program after it has exited.
+            return ProcessStatus.RUNTIME_ERROR if program.returncode != 0 \
+                else ProcessStatus.WRONG_ANSWER
+        if interactor.returncode < 0:
+            return ProcessStatus.INTERACTOR_ERROR
+        if interactor.returncode != 0:
+            return ProcessStatus.WRONG_ANSWER
+        if program.returncode != 0:
+            return ProcessStatus.RUNTIME_ERROR
+        return ProcessStatus.FINISHED
+
+    def execute(self) -> None:
+        interactor, program = self._start()
+        errors: dict[MonitoredProcess, Exception] = dict()
+
+        thread = threading.Thread(
+            target=self._communicate,
+            args=(
+                interactor, self.interactor_time_limit,
+                self.interactor_memory_limit, errors,
+            ),
+            daemon=True,
+        )
+        thread.start()
+        try:
+            self._communicate(
+                program, self.time_limit, self.memory_limit, errors,
+            )
+        finally:
+            thread.join()
+
+        self.manager.push_event(
+            ProcessStatusEvent(
+                job=self,
+                status=self._status(interactor, program, errors),
+                time=program.duration,
+                memory=program.memory_used,
+                user_time=program.user_time,
+                system_time=program.system_time,
+                max_rss=program.max_rss,
+            ),
+        )
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Callable
+from typing import Iterator
+
+from cptt.run.base import Job
+from cptt.run.base import JobEventManager
+from cptt.run.base import Runner
+from cptt.run.events import JobEndEvent
+from cptt.run.events import JobEvent
+from cptt.run.events import JobStartEvent
+
+
+class AsyncJobEventManager(JobEventManager):
+    """ Passes the events directly to the given handler, on the thread of the
+    event loop. Events that are pushed from other threads (by jobs that run in
+    an executor) are scheduled on the loop, in the order they are pushed. """
+
+    def __init__(self, handler: Callable[[JobEvent], None]) -> None:
+        self._handler = handler
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: int = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._thread = threading.get_ident()
+
+    def push_event(self, event: JobEvent) -> None:
+        if threading.get_ident() == self._thread:
+            self._handler(event)
+        else:
+            self._loop.call_soon_threadsafe(self._handler, event)
+
+    def next_event(self) -> JobEvent:
+        raise NotImplementedError('events are passed to the handler directly')
+
+
+class AsyncRunner(Runner):
+    """ Runs the collected jobs on a single asyncio event loop, with up to
+    `concurrency` jobs running at the same time (see `Runner` for the rest of
+    the options).
+    Jobs that implement `run` natively (such as `ProcessJob`) do not occupy a
+    thread while they wait, so the concurrency can be much higher than the
+    number of threads of a regular `Runner`. """
+
+    def __init__(self, concurrency: int = None, **kwargs) -> None:
+        super().__init__(concurrency, **kwargs)
+        self._manager = AsyncJobEventManager(self._dispatch_event)
+
+    async def _run_job(self, job: Job, slot: int) -> None:
+        job.cpus = self._slot_cpus(slot)
+        job.manager.push_event(JobStartEvent(job))
+        try:
+            if job.cancelled:
+                job.drop()
+            else:
+                await job.run()
+        finally:
+            job.manager.push_event(JobEndEvent(job))
+
+    async def _run_slot(self, slot: int, jobs: Iterator[Job]) -> None:
+        while True:
+            job = self._next_job(jobs)
+            if job is None:
+                return
+            await self._run_job(job, slot)
+
+    async def execute_async(self) -> None:
+        """ Executes all collected jobs in the order that is decided by the
+        scheduling policy, and returns once all of them are finished. Events
+        are handled on the loop. """
+
+        self._manager.bind(asyncio.get_running_loop())
+        jobs = self._take_jobs()
+        await asyncio.gather(
+            *(self._run_slot(slot, jobs) for slot in range(self._threads)),
+        )
+        self._save_history()
+
+    def execute(self) -> None:
+        asyncio.run(self.execute_async())
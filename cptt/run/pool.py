@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import copy
+import itertools
+import multiprocessing
+import threading
+import traceback
+from multiprocessing.connection import Connection
+from queue import Empty
+from queue import Queue
+from typing import Any
+
+from cptt.run.base import Job
+from cptt.run.base import JobEventManager
+from cptt.run.base import Runner
+from cptt.run.events import JobEndEvent
+from cptt.run.events import JobEvent
+from cptt.run.events import JobStartEvent
+
+
+class WorkerEventManager(JobEventManager):
+    """ Used by jobs that are executed in a worker process. Sends the events
+    back to the main process, along with the index of the job that pushed
+    them. The `job` of the events is replaced by the job object of the main
+    process once they are received. """
+
+    def __init__(self, events: Any, worker: int, index: int) -> None:
+        self._events = events
+        self._worker = worker
+        self._index = index
+
+    def push_event(self, event: JobEvent) -> None:
+        event = copy.copy(event)
+        event.job = None
+        self._events.put((self._worker, self._index, event))
+
+    def next_event(self) -> JobEvent:
+        raise NotImplementedError('events are received by the main process')
+
+
+def _receive(tasks: Connection, queue: Queue, jobs: dict[int, Job]) -> None:
+    """ Receives the messages of the main process in a worker: jobs are
+    passed to the main thread of the worker through the given queue, and
+    cancellation requests are applied to them directly, even while they are
+    executing. """
+
+    while True:
+        try:
+            message = tasks.recv()
+        except (EOFError, OSError):
+            message = None
+
+        if message is None:
+            queue.put(None)
+            return
+
+        index, job = message
+        if job is not None:
+            jobs[index] = job
+            queue.put(index)
+        elif index in jobs:
+            jobs[index].cancel()
+
+
+def _work(worker: int, tasks: Connection, events: Any) -> None:
+    """ The main loop of a worker process: receives jobs and executes them,
+    until `None` is received. """
+
+    queue: Queue[int | None] = Queue()
+    jobs: dict[int, Job] = dict()
+    threading.Thread(
+        target=_receive, args=(tasks, queue, jobs),
+        daemon=True,
+    ).start()
+
+    while True:
+        index = queue.get()
+        if index is None:
+            return
+
+        job = jobs[index]
+        job.manager = WorkerEventManager(events, worker, index)
+        job.manager.push_event(JobStartEvent(job))
+        try:
+            if job.cancelled:
+                job.drop()
+            else:
+                rest = job.execute()
+                if rest is not None:
+                    rest()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            job.manager.push_event(JobEndEvent(job))
+            del jobs[index]
+
+
+class _Worker:
+
+    def __init__(self, context, worker: int, events: Any) -> None:
+        self.index: int | None = None
+        # the index of the job that the worker executes.
+
+        self.tasks, remote = context.Pipe()
+        self.process = context.Process(
+            target=_work, args=(worker, remote, events),
+            daemon=True,
+        )
+        self.process.start()
+        remote.close()
+
+    def send(self, index: int | None, job: Job | None) -> None:
+        self.index = index
+        if job is None:
+            self.tasks.send(None)
+            return
+
+        # the manager of the job (and anything that refers to it) is not
+        # sent to the worker.
+        job = copy.copy(job)
+        job.manager = None
+        self.tasks.send((index, job))
+
+    def cancel(self) -> None:
+        """ Cancels the job that the worker executes (if any). """
+
+        if self.index is not None:
+            try:
+                self.tasks.send((self.index, None))
+            except OSError:
+                pass  # the worker has died, and will be replaced
+
+    def stop(self) -> None:
+        if self.index is None:
+            try:
+                self.tasks.send(None)
+            except OSError:
+                pass  # the worker has already exited
+        else:
+            self.process.terminate()
+
+        self.process.join()
+        self.tasks.close()
+
+
+class ProcessPoolRunner(Runner):
+    """ Executes the collected jobs in a pool of worker processes, instead of
+    threads of the running interpreter. This way, the Python side work of one
+    job (such as validating its output) does not delay the monitoring of the
+    others.
+
+    The jobs, and the events that they push, must be picklable. Events are
+    passed to `_handle_job_event` in the main process, with their `job` set to
+    the job object that has been collected. If a worker dies while executing
+    a job, the end of the job is reported and the worker is replaced. """
+
+    POLLING_DELAY = 0.1
+    # while no events are received, the workers are checked for crashes every
+    # `POLLING_DELAY` seconds.
+
+    def __init__(
+        self,
+        processes: int = None,
+        start_method: str | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(processes, **kwargs)
+        self._context = multiprocessing.get_context(start_method)
+        self._workers: list[_Worker] = list()
+        self._running: dict[int, Job] = dict()
+        # the jobs that have been sent to the workers, by their index.
+        self._indices = itertools.count()
+
+    def cancel(self) -> None:
+        """ Cancels the execution of the jobs (see `Runner.cancel`). The
+        cancellation is passed to the jobs that are executing in the workers.
+        """
+
+        if self.cancelled:
+            return
+        super().cancel()
+        for worker in self._workers:
+            worker.cancel()
+
+    def _dispatch(self, number: int, job: Job | None) -> None:
+        """ Sends the given job to the given worker, or tells it to exit if
+        there are no pending jobs. """
+
+        if job is None:
+            self._workers[number].send(None, None)
+            return
+
+        index = next(self._indices)
+        self._running[index] = job
+        job.cpus = self._slot_cpus(number)
+        self._workers[number].send(index, job)
+
+    def _next_event(self, workers: list[_Worker], events: Any) -> tuple:
+        """ Returns the next `(worker, index, event)` tuple that is pushed by
+        the workers. If a worker has died, it is replaced, and the end of its
+        job is returned instead. """
+
+        while True:
+            try:
+                return events.get(timeout=self.POLLING_DELAY)
+            except Empty:
+                pass
+
+            for number, worker in enumerate(workers):
+                if worker.index is None or worker.process.is_alive():
+                    continue
+
+                workers[number] = _Worker(self._context, number, events)
+                workers[number].index = worker.index
+                return number, worker.index, JobEndEvent(None)
+
+    def execute(self) -> None:
+        """ Execute all collected jobs in all worker processes, in the order
+        that is decided by the scheduling policy. Block execution of calling
+        thread until all jobs are finished executing. """
+
+        jobs = self._take_jobs()
+        events = self._context.Queue()
+        workers = self._workers = list()
+        self._running = dict()
+
+        try:
+            # a worker is started for each job, up to the number of processes.
+            for number in range(self._threads):
+                job = self._next_job(jobs)
+                if job is None:
+                    break
+                workers.append(_Worker(self._context, number, events))
+                self._dispatch(number, job)
+
+            while self._running:
+                number, index, event = self._next_event(workers, events)
+                if workers[number].index != index:
+                    continue  # sent by a worker that has been replaced
+                event.job = self._running[index]
+
+                if isinstance(event, JobEndEvent):
+                    del self._running[index]
+                    self._dispatch(number, self._next_job(jobs))
+                self._dispatch_event(event)
+
+            self._save_history()
+
+        finally:
+            for worker in workers:
+                worker.stop()
+            events.close()
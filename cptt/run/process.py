@@ -1,26 +1,79 @@
 from __future__ import annotations
 
+import asyncio
 import enum
+import hashlib
+import itertools
+import os
+import shutil
+import statistics
+import struct
+import threading
+from contextlib import contextmanager
+from contextlib import suppress
+from dataclasses import asdict
 from dataclasses import dataclass
 from dataclasses import field
+from dataclasses import fields
+from subprocess import DEVNULL
 from subprocess import PIPE
+from typing import Callable
+from typing import Generator
+from typing import IO
+from typing import Iterator
+from typing import Union
 
+import psutil  # pip install psutil
+
+from cptt.cache import VerdictCache
+from cptt.forkserver import ForkServer
+from cptt.forkserver import ForkServerProcess
+from cptt.limits import CpuTimeLimit
+from cptt.limits import create_cpu_affinity
+from cptt.limits import create_cpu_time_limit
+from cptt.limits import create_memory_limit
+from cptt.limits import KernelLimit
+from cptt.output import MappedOutput
+from cptt.output import OutputCapture
 from cptt.process import MemoryLimitExceeded
 from cptt.process import MonitoredProcess
+from cptt.process import OutputLimitExceeded
 from cptt.process import TimeLimitExceeded
+from cptt.run.base import Continuation
 from cptt.run.base import Job
 from cptt.run.events import JobEvent
+from cptt.stats import confidence_interval
+from cptt.stats import Summary
+from cptt.validate import StreamingValidator
 from cptt.validate import ValidationError
+from cptt.validate import ValidationStream
 from cptt.validate import Validator
+from cptt.validate.base import as_bytes
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # pragma: no cover
+    fcntl = termios = None  # not avaliable on Windows
 
 
 class ProcessStatus(enum.Enum):
     FINISHED = enum.auto()
     TIME_LIMIT = enum.auto()
     MEMORY_LIMIT = enum.auto()
+    OUTPUT_LIMIT = enum.auto()
     WRONG_ANSWER = enum.auto()
     RUNTIME_ERROR = enum.auto()
     KILLED = enum.auto()
+    GENERATOR_ERROR = enum.auto()
+    REFERENCE_ERROR = enum.auto()
+    INTERACTOR_ERROR = enum.auto()
+
+
+class TimeLimitKind(enum.Enum):
+    WALL = 'wall'
+    CPU = 'cpu'
+    BOTH = 'both'
 
 
 @dataclass
@@ -28,6 +81,55 @@ class ProcessStatusEvent(JobEvent):
     status: ProcessStatus
     time: float
     memory: float
+    user_time: float = 0
+    system_time: float = 0
+    max_rss: int | None = None
+    # the peak resident memory that the kernel has reported for the program,
+    # if it can be attributed to the program itself.
+    time_stats: Summary = None
+    memory_stats: Summary = None
+    # in benchmark mode, the summaries of the time and the memory of all
+    # measured runs. The rest of the fields describe the run with the median
+    # time.
+    cached: bool = False
+    # true if the status has been read from a `VerdictCache`, instead of
+    # executing the program.
+
+    def to_entry(self) -> dict:
+        """ Returns the status and the measurements as a JSON serializable
+        dictionary, that can be stored in a `VerdictCache`. """
+
+        entry = {
+            f.name: getattr(self, f.name) for f in fields(self)
+            if f.name not in ('job', 'cached')
+        }
+        entry['status'] = self.status.name
+        for name in ('time_stats', 'memory_stats'):
+            if entry[name] is not None:
+                entry[name] = asdict(entry[name])
+        return entry
+
+    @classmethod
+    def from_entry(cls, job: Job, entry: dict) -> ProcessStatusEvent:
+        entry = dict(entry)
+        entry['status'] = ProcessStatus[entry['status']]
+        for name in ('time_stats', 'memory_stats'):
+            if entry.get(name) is not None:
+                entry[name] = Summary(**entry[name])
+        return cls(job=job, cached=True, **entry)
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.system_time
+
+    @property
+    def failed(self) -> bool:
+        # a killed process has been stopped by the runner, and its program
+        # hasn't necessarily done anything wrong.
+        return self.status not in (ProcessStatus.FINISHED, ProcessStatus.KILLED)
+
+
+ProcessInput = Union[str, bytes, MappedOutput, os.PathLike, int, IO]
 
 
 @dataclass
@@ -35,66 +137,671 @@ class ProcessJob(Job):
     program: list[str]
     time_limit: float = None
     memory_limit: float = None
-    input: str = None
+    input: ProcessInput = None
     validators: list[Validator] = field(default_factory=list)
+    kernel_memory_limit: bool = False
+    # if set, the memory limit is also enforced by the kernel. With a cgroup
+    # v2 (see `cptt.limits.CGROUP_ENV`), the program is killed as soon as it
+    # crosses the limit, and its exact peak is measured. Otherwise, the kernel
+    # only stops allocations above a few times the limit (see
+    # `RlimitMemoryLimit`), and the memory is still sampled, so the peak of a
+    # short program may be missed (or reported as zero).
+    time_limit_kind: TimeLimitKind = TimeLimitKind.WALL
+    output_limit: float = None
+    fork_server: ForkServer = None
+    # if provided, the program (which must be a Python script) is forked by
+    # the given server instead of being executed in a new interpreter.
+    repeat: int = 1
+    warmup: int = 0
+    confidence: float = None
+    # benchmark mode: the program is executed `warmup` times without being
+    # measured, and then up to `repeat` times. If `confidence` is provided,
+    # the runs stop early once the 95% confidence interval of the mean time is
+    # narrower than that fraction of the mean (in both directions). The first
+    # run that fails ends the benchmark, and its status is reported.
 
-    def execute(self) -> None:
+    cache: VerdictCache = None
+    # if provided, the status of the job is read from the cache if the same
+    # program (including the files that are passed to it as arguments) has
+    # already been executed with the same input, validators and limits.
+    # Jobs whose input is an open file, or with a validator that doesn't
+    # support fingerprints, are never cached.
 
-        process = MonitoredProcess(
-            self.program,
-            encoding='utf8',
-            stdin=PIPE, stdout=PIPE, stderr=PIPE,
+    generator: list[str] = None
+    # a command that generates the input of the program (instead of `input`).
+    # Its standard output is connected directly to the standard input of the
+    # program through a pipe, so the input is never stored in memory or on
+    # disk. The generator is a separate process, so its resource usage is not
+    # counted towards the limits of the program. If the generator fails or
+    # runs out of time, or if the program runs out of time while it is
+    # waiting for the generator, the status of the job is `GENERATOR_ERROR`.
+    generator_time_limit: float = None
+    # the wall time limit of the generator. By default, the generator is
+    # given the grace period on top of the wall time limit of the program (so
+    # a generator that is blocked until the program reads its input is never
+    # killed before the program is), or `GENERATOR_TIME_LIMIT` if the program
+    # is not limited.
+
+    _process: MonitoredProcess = field(
+        init=False, default=None,
+        repr=False, compare=False,
+    )
+    # the process of the current run, which is killed if the job is cancelled.
+
+    MIN_BENCHMARK_RUNS = 3
+    # the confidence interval is not trusted with less runs than this.
+
+    WALL_TIME_SAFETY_FACTOR = 3
+    # when only the CPU time of the process is limited, the process is still
+    # killed after a generous amount of wall time, so processes that are
+    # sleeping or blocked do not run forever.
+
+    GENERATOR_GRACE_PERIOD = 0.5
+    # once the program has exited, the generator is given this many seconds
+    # to finish by itself (and report its exit code) before it is killed.
+
+    GENERATOR_TIME_LIMIT = 60
+    # a generator never runs for longer than this, so a generator that hangs
+    # does not hang the job.
+
+    def __post_init__(self) -> None:
+        if self.generator is not None and self.input is not None:
+            raise ValueError('a job can have an input or a generator, not both')
+
+    def _kernel_limits(self) -> list[KernelLimit]:
+        limits = list()
+
+        if self.kernel_memory_limit and self.memory_limit is not None:
+            limit = create_memory_limit(self.memory_limit)
+            if limit is not None:
+                limits.append(limit)
+
+        limits_cpu = self.time_limit_kind is not TimeLimitKind.WALL
+        if limits_cpu and self.time_limit is not None:
+            limit = create_cpu_time_limit(self.time_limit)
+            if limit is not None:
+                limits.append(limit)
+
+        if self.cpus is not None:
+            limit = create_cpu_affinity(self.cpus)
+            if limit is not None:
+                limits.append(limit)
+
+        return limits
+
+    def _wall_time_limit(self, limits: list[KernelLimit]) -> float | None:
+        if self.time_limit is None:
+            return None
+        if self.time_limit_kind is TimeLimitKind.CPU and any(
+            isinstance(limit, CpuTimeLimit) for limit in limits
+        ):
+            return self.time_limit * self.WALL_TIME_SAFETY_FACTOR
+        return self.time_limit
+
+    def history_key(self) -> str | None:
+        """ Jobs are identified by their program (but not its content, which
+        changes between versions of the solution) and their input. """
+
+        if self.generator is not None:
+            input = '\0'.join(['generator'] + self.generator).encode()
+        elif self.input is None:
+            input = b''
+        elif isinstance(self.input, (str, bytes, MappedOutput)):
+            input = hashlib.sha256(as_bytes(self.input)).digest()
+        elif isinstance(self.input, os.PathLike):
+            input = os.fsencode(os.path.abspath(self.input))
+        else:
+            return None
+
+        sha = hashlib.sha256('\0'.join(self.program).encode() + b'\0')
+        sha.update(input)
+        return sha.hexdigest()
+
+    def cancel(self) -> None:
+        """ Kills the running process (if any). Its status is reported as
+        `ProcessStatus.KILLED`, and no more runs are started. """
+
+        super().cancel()
+        # if the process is started concurrently, it is killed by `_start`
+        # once it sees that the job has been cancelled.
+        process = self._process
+        if process is not None:
+            with suppress(psutil.NoSuchProcess):
+                process.kill()
+
+    def drop(self) -> None:
+        self.manager.push_event(
+            ProcessStatusEvent(
+                job=self,
+                status=ProcessStatus.KILLED,
+                time=0,
+                memory=0,
+            ),
         )
 
-        try:
-            out, err = process.communicate(
-                input=self.input,
-                time_limit=self.time_limit,
-                memory_limit=self.memory_limit,
+    def _command_parts(self, command: list[str]) -> list[bytes]:
+        """ The parts of the cache key that identify a command, including the
+        content of the files that are passed to it. """
+
+        parts = [str(len(command)).encode()]
+        for index, arg in enumerate(command):
+            path = (shutil.which(arg) or arg) if index == 0 else arg
+            parts.append(os.fsencode(arg))
+            parts.append(
+                self.cache.file_digest(path) if os.path.isfile(path) else b'',
+            )
+        return parts
+
+    def _cache_key(self) -> str | None:
+        """ Hashes everything that determines the status of the job. Returns
+        `None` if the job can't be cached. """
+
+        if self.cache is None:
+            return None
+
+        parts = self._command_parts(self.program)
+        if self.generator is not None:
+            parts.append(b'generator')
+            parts.extend(self._command_parts(self.generator))
+            parts.append(repr(self.generator_time_limit).encode())
+        elif self.input is None:
+            parts.append(b'')
+        elif isinstance(self.input, (str, bytes, MappedOutput)):
+            parts.append(as_bytes(self.input))
+        elif isinstance(self.input, os.PathLike):
+            parts.append(self.cache.file_digest(self.input))
+        else:
+            return None
+
+        parts.append(str(len(self.validators)).encode())
+        for validator in self.validators:
+            fingerprint = validator.fingerprint()
+            if fingerprint is None:
+                return None
+            parts.append(fingerprint)
+
+        parts.append(
+            repr((
+                self.time_limit, self.memory_limit, self.output_limit,
+                self.kernel_memory_limit, self.time_limit_kind.value,
+                self.repeat, self.warmup, self.confidence,
+            )).encode(),
+        )
+        return self.cache.key(parts)
+
+    def _push_cached(self) -> bool:
+        """ Pushes the cached status of the job, if there is one. """
+
+        self._verdict_key = self._cache_key()
+        entry = None if self._verdict_key is None \
+            else self.cache.get(self._verdict_key)
+        if entry is None:
+            return False
+
+        self.manager.push_event(ProcessStatusEvent.from_entry(self, entry))
+        return True
+
+    def _push_status(
+        self,
+        process: MonitoredProcess,
+        status: ProcessStatus,
+        time_stats: Summary = None,
+        memory_stats: Summary = None,
+    ) -> None:
+        event = ProcessStatusEvent(
+            job=self,
+            status=status,
+            time=process.duration,
+            memory=process.memory_used,
+            user_time=process.user_time,
+            system_time=process.system_time,
+            max_rss=process.max_rss,
+            time_stats=time_stats,
+            memory_stats=memory_stats,
+        )
+
+        if self._verdict_key is not None and status is not ProcessStatus.KILLED:
+            self.cache.put(self._verdict_key, event.to_entry())
+        self.manager.push_event(event)
+
+    def _stdout_consumer(
+        self,
+        streams: list[ValidationStream],
+        capture: OutputCapture | None,
+    ) -> Callable[[bytes], None]:
+        """ Returns a consumer that feeds the standard output of the process to
+        the given validation streams as it is produced, and collects it into
+        the given capture (if provided). Output that isn't needed by any of
+        them is discarded as it is read. """
+
+        def consume(chunk: bytes) -> None:
+            if capture is not None:
+                capture.write(chunk)
+            for stream in streams:
+                stream.feed(chunk)
+
+        return consume
+
+    @contextmanager
+    def _stdin(
+        self,
+        time_limit: float | None,
+    ) -> Iterator[tuple[int | IO, bytes | None]]:
+        """ Yields the standard input that the process should be created with,
+        and the data that should be fed into it through a pipe (if any). The
+        given time limit is the wall time limit of the program.
+
+        Paths and open files (or file descriptors) are passed to the process
+        as is, without copying their content into Python. Notice that the file
+        offset of an open file is shared with the process. """
+
+        self._generator = None
+
+        if self.generator is not None:
+            read, write = os.pipe()
+            try:
+                self._generator = MonitoredProcess(
+                    self.generator,
+                    stdin=DEVNULL, stdout=write, stderr=DEVNULL,
+                )
+            except BaseException:
+                os.close(read)
+                raise
+            finally:
+                os.close(write)
+
+            self._generator_pipe = read
+            self._generator_watchdog = _Watchdog(
+                self._generator, self._generator_time_limit(time_limit),
+            )
+            try:
+                yield read, None
+            except BaseException:
+                self._generator_status(ProcessStatus.KILLED)  # kills it
+                raise
+
+        elif self.input is None:
+            yield DEVNULL, None
+
+        elif isinstance(self.input, str):
+            yield PIPE, self.input.encode('utf8')
+
+        elif isinstance(self.input, (bytes, MappedOutput)):
+            yield PIPE, self.input
+
+        elif isinstance(self.input, os.PathLike):
+            with open(self.input, 'rb') as file:
+                yield file, None
+
+        else:
+            yield self.input, None
+
+    def _create_process(
+        self,
+        stdin: int | IO,
+        limits: list[KernelLimit],
+    ) -> MonitoredProcess:
+        # the output is read only if it is validated, or if it is limited.
+        stdout = PIPE if self.validators or self.output_limit is not None \
+            else DEVNULL
+
+        if self.fork_server is not None:
+            return ForkServerProcess(
+                self.fork_server, self.program,
+                stdin=stdin, stdout=stdout, stderr=PIPE,
+                limits=limits,
             )
 
-            for validator in self.validators:
+        return MonitoredProcess(
+            self.program,
+            stdin=stdin, stdout=stdout, stderr=PIPE,
+            limits=limits,
+        )
+
+    def _start(self) -> tuple[MonitoredProcess, bytes | None, dict]:
+        """ Starts the process. Returns it along with the input that should be
+        fed into it, and the arguments for communicating with it. """
+
+        limits = self._kernel_limits()
+        time_limit = self._wall_time_limit(limits)
+        with self._stdin(time_limit) as (stdin, input):
+            process = self._create_process(stdin, limits)
+
+        self._process = process
+        if self.cancelled:
+            with suppress(psutil.NoSuchProcess):
+                process.kill()
+
+        streams = [
+            validator.stream() for validator in self.validators
+            if isinstance(validator, StreamingValidator)
+        ]
+        # validators that can't consume the output as it is produced receive
+        # all of it afterwards (see `_validate`).
+        capture = OutputCapture(text=False) \
+            if len(streams) < len(self.validators) else None
+
+        self._streams, self._capture = streams, capture
+        return process, input, dict(
+            time_limit=time_limit,
+            memory_limit=self.memory_limit,
+            stdout_consumer=self._stdout_consumer(streams, capture),
+            output_limit=self.output_limit,
+        )
+
+    def _validate(
+        self,
+        process: MonitoredProcess,
+        out: bytes | None,
+        err: bytes | None,
+    ) -> None:
+        for stream in self._streams:
+            stream.finish()
+
+        # the rest of the validators receive the captured output, which is
+        # memory-mapped if it has spilled to the disk.
+        if self._capture is not None:
+            out = self._capture.read()
+
+        for validator in self.validators:
+            if not isinstance(validator, StreamingValidator):
                 validator.validate(
                     stdout=out, stderr=err,
                     returncode=process.returncode,
                 )
 
+    def _release_output(self) -> None:
+        """ Releases the captured output, and the validation streams (which
+        may hold memory-mapped expected outputs). """
+
+        if self._capture is not None:
+            self._capture.close()
+        self._streams = list()
+
+    @contextmanager
+    def _judge(self, finish: bool = True) -> Iterator[_Verdict]:
+        """ Decides the status of the process, according to the exception
+        that is raised while it is communicated with and validated (if any).
+        Unless `finish` is false, the captured output is released afterwards.
+        """
+
+        verdict = _Verdict()
+        try:
+            yield verdict
+
         except TimeLimitExceeded:
-            self.manager.push_event(
-                ProcessStatusEvent(
-                    job=self,
-                    status=ProcessStatus.TIME_LIMIT,
-                    time=process.duration,
-                    memory=process.memory_used,
-                ),
-            )
+            verdict.status = ProcessStatus.TIME_LIMIT
 
         except MemoryLimitExceeded:
-            self.manager.push_event(
-                ProcessStatusEvent(
-                    job=self,
-                    status=ProcessStatus.MEMORY_LIMIT,
-                    time=process.duration,
-                    memory=process.memory_used,
-                ),
-            )
+            verdict.status = ProcessStatus.MEMORY_LIMIT
+
+        except OutputLimitExceeded:
+            verdict.status = ProcessStatus.OUTPUT_LIMIT
 
         except ValidationError:
-            self.manager.push_event(
-                ProcessStatusEvent(
-                    job=self,
-                    status=ProcessStatus.WRONG_ANSWER,
-                    time=process.duration,
-                    memory=process.memory_used,
-                ),
-            )
+            verdict.status = ProcessStatus.WRONG_ANSWER
 
-        else:
-            self.manager.push_event(
-                ProcessStatusEvent(
-                    job=self,
-                    status=ProcessStatus.FINISHED,
-                    time=process.duration,
-                    memory=process.memory_used,
-                ),
+        finally:
+            if finish:
+                self._release_output()
+            if self.cancelled:
+                verdict.status = ProcessStatus.KILLED
+
+    def _generator_time_limit(self, time_limit: float | None) -> float:
+        if self.generator_time_limit is not None:
+            return self.generator_time_limit
+        if time_limit is not None:
+            return time_limit + self.GENERATOR_GRACE_PERIOD
+        return self.GENERATOR_TIME_LIMIT
+
+    def _generator_status(self, status: ProcessStatus) -> ProcessStatus:
+        """ Returns the status of the job, once the program has finished with
+        the given status. The job fails if the generator has failed or has
+        run out of time, or if the program has run out of time while it was
+        waiting for its input (the generator is still running, and none of
+        its output is waiting in the pipe).
+
+        The rest of the output of the generator is discarded, so it never
+        fails because of a broken pipe, and it is given a grace period to
+        exit by itself. If it is still running after that (or if the job has
+        been killed), its output is not needed and it is killed instead. """
+
+        generator = self._generator
+        if generator is None:
+            return status
+        watchdog = self._generator_watchdog
+
+        running = watchdog.is_alive()
+        starved = status is ProcessStatus.TIME_LIMIT and running and \
+            not _pending(self._generator_pipe)
+
+        drain = threading.Thread(
+            target=_discard, args=(self._generator_pipe,),
+            daemon=True,
+        )
+        drain.start()
+
+        if status is not ProcessStatus.KILLED:
+            watchdog.join(self.GENERATOR_GRACE_PERIOD)
+
+        # once the program has exited, the generator may be killed (by us, or
+        # by its time limit) without failing the job.
+        exited = not watchdog.is_alive() and not (running and watchdog.timed_out)
+        if watchdog.is_alive():
+            with suppress(psutil.NoSuchProcess):
+                generator.kill()
+        watchdog.join()
+        drain.join()
+        os.close(self._generator_pipe)
+
+        if status is ProcessStatus.KILLED:
+            return status
+        if starved or (exited and generator.returncode != 0):
+            return ProcessStatus.GENERATOR_ERROR
+        return status
+
+    def _execute_once(self) -> tuple[MonitoredProcess, ProcessStatus]:
+        process, input, arguments = self._start()
+        with self._judge() as verdict:
+            out, err = process.communicate(input=input, **arguments)
+            self._validate(process, out, err)
+        return process, self._generator_status(verdict.status)
+
+    async def _generator_status_async(
+        self,
+        status: ProcessStatus,
+    ) -> ProcessStatus:
+        if self._generator is None:
+            return status
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._generator_status, status)
+
+    async def _run_once(self) -> tuple[MonitoredProcess, ProcessStatus]:
+        process, input, arguments = self._start()
+        with self._judge() as verdict:
+            out, err = await process.communicate_async(
+                input=input, **arguments,
             )
+            self._validate(process, out, err)
+        return process, await self._generator_status_async(verdict.status)
+
+    def _input_offset(self) -> int | None:
+        """ Returns the offset of the input file (if it has been provided as an
+        open file), so it can be rewound between runs. """
+
+        if isinstance(
+            self.input, (type(None), str, bytes, MappedOutput, os.PathLike),
+        ):
+            return None
+        fd = self.input if isinstance(self.input, int) else self.input.fileno()
+        try:
+            return os.lseek(fd, 0, os.SEEK_CUR)
+        except OSError:
+            return None  # the input is not seekable (for example, a pipe)
+
+    def _rewind_input(self, offset: int | None) -> None:
+        if offset is not None:
+            fd = self.input if isinstance(self.input, int) \
+                else self.input.fileno()
+            os.lseek(fd, offset, os.SEEK_SET)
+
+    def _is_precise(self, runs: list[MonitoredProcess]) -> bool:
+        if self.confidence is None or len(runs) < self.MIN_BENCHMARK_RUNS:
+            return False
+
+        times = [process.duration for process in runs]
+        interval = confidence_interval(times)
+        return interval <= self.confidence * statistics.mean(times)
+
+    def _runs(self) -> Generator[None, tuple, None]:
+        """ Decides how many times the program is executed. Receives the
+        process and the status of each run, and pushes the final status once
+        it is decided. """
+
+        offset = self._input_offset()
+        runs: list[MonitoredProcess] = list()
+
+        for count in itertools.count():
+            self._rewind_input(offset)
+            process, status = yield
+
+            if status is not ProcessStatus.FINISHED:
+                self._push_status(process, status)
+                return
+
+            if count >= self.warmup:
+                runs.append(process)
+                if len(runs) >= self.repeat or self._is_precise(runs):
+                    break
+
+        if self.repeat == 1:
+            self._push_status(runs[0], ProcessStatus.FINISHED)
+            return
+
+        runs.sort(key=lambda process: process.duration)
+        self._push_status(
+            runs[(len(runs) - 1) // 2], ProcessStatus.FINISHED,
+            time_stats=Summary.of([process.duration for process in runs]),
+            memory_stats=Summary.of([process.memory_used for process in runs]),
+        )
+
+    def _defers_validation(self) -> bool:
+        """ Slow validators (such as checkers) are executed after the slot
+        of the job has been released, if the program is executed only once.
+        """
+
+        return self.repeat == 1 and self.warmup == 0 and any(
+            validator.concurrent for validator in self.validators
+        )
+
+    def _validation(
+        self,
+        process: MonitoredProcess,
+        out: bytes | None,
+        err: bytes | None,
+        status: ProcessStatus,
+    ) -> Continuation | None:
+        """ Returns a function that validates the output of the process and
+        pushes its status. If the process has already failed (see
+        `_generator_status`), its status is pushed right away instead, and
+        `None` is returned. """
+
+        if status is not ProcessStatus.FINISHED:
+            self._release_output()
+            self._push_status(process, status)
+            return None
+
+        def validate() -> None:
+            with self._judge() as verdict:
+                self._validate(process, out, err)
+            self._push_status(process, verdict.status)
+
+        return validate
+
+    def execute(self) -> Continuation | None:
+        if self._push_cached():
+            return None
+
+        if self._defers_validation():
+            process, input, arguments = self._start()
+            with self._judge(finish=False) as verdict:
+                out, err = process.communicate(input=input, **arguments)
+            status = self._generator_status(verdict.status)
+            return self._validation(process, out, err, status)
+
+        runs = self._runs()
+        next(runs)
+        with suppress(StopIteration):
+            while True:
+                runs.send(self._execute_once())
+
+    async def run(self) -> None:
+        """ Communicates with the process on the running event loop, without
+        occupying any thread while the process runs. """
+
+        if self._push_cached():
+            return
+
+        if self._defers_validation():
+            process, input, arguments = self._start()
+            with self._judge(finish=False) as verdict:
+                out, err = await process.communicate_async(
+                    input=input, **arguments,
+                )
+            status = await self._generator_status_async(verdict.status)
+            validate = self._validation(process, out, err, status)
+            if validate is not None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, validate)
+            return
+
+        runs = self._runs()
+        next(runs)
+        with suppress(StopIteration):
+            while True:
+                runs.send(await self._run_once())
+
+
+class _Watchdog(threading.Thread):
+    """ Waits for a process in the background, and kills it once it runs out
+    of time. """
+
+    def __init__(self, process: MonitoredProcess, time_limit: float) -> None:
+        super().__init__(daemon=True)
+        self.process = process
+        self.time_limit = time_limit
+        self.timed_out = False
+        self.start()
+
+    def run(self) -> None:
+        try:
+            self.process.wait(time_limit=self.time_limit)
+        except TimeLimitExceeded:
+            self.timed_out = True
+
+
+def _pending(fd: int) -> int | None:
+    """ Returns the number of bytes that are waiting to be read from the given
+    pipe, or `None` if it is unknown. """
+
+    if fcntl is None:
+        return None
+    try:
+        buffer = fcntl.ioctl(fd, termios.FIONREAD, bytes(4))
+    except OSError:
+        return None
+    return struct.unpack('i', buffer)[0]
+
+
+def _discard(fd: int) -> None:
+    """ Reads from the given file descriptor until its end, and discards the
+    data. """
+
+    with suppress(OSError):
+        while os.read(fd, 64 * 1024):
+            pass
+
+
+@dataclass
+class _Verdict:
+    status: ProcessStatus = ProcessStatus.FINISHED
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from abc import ABC
+from abc import abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cptt.run.base import Job
+
+
+class JobHistory:
+    """ The duration and the outcome of the last execution of each job,
+    persisted in a small JSON file between runs. Jobs are identified by their
+    `history_key`, and jobs without one are not recorded. """
+
+    VERSION = 1
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = os.fspath(path)
+        self._records: dict[str, dict] = dict()
+
+        try:
+            with open(self.path, encoding='utf8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self._records = data['jobs']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # start with an empty history
+
+    def duration(self, job: Job) -> float | None:
+        """ Returns the duration of the last execution of the job, or `None`
+        if it is unknown. """
+
+        record = self._records.get(job.history_key())
+        return None if record is None else record['duration']
+
+    def failed(self, job: Job) -> bool:
+        """ Returns true if the last execution of the job has failed. """
+
+        record = self._records.get(job.history_key())
+        return record is not None and record['failed']
+
+    def record(self, job: Job, duration: float, failed: bool) -> None:
+        key = job.history_key()
+        if key is not None:
+            self._records[key] = {'duration': duration, 'failed': failed}
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf8') as f:
+            json.dump({'version': self.VERSION, 'jobs': self._records}, f)
+        os.replace(temporary, self.path)
+
+
+class SchedulingPolicy(ABC):
+    """ Decides the order in which the collected jobs are executed. """
+
+    @abstractmethod
+    def order(self, jobs: list[Job], history: JobHistory | None) -> list[Job]:
+        """ Returns the given jobs, in the order they should be executed. """
+
+
+class FifoPolicy(SchedulingPolicy):
+    """ Executes the jobs by order of collection. """
+
+    def order(self, jobs: list[Job], history: JobHistory | None) -> list[Job]:
+        return list(jobs)
+
+
+class LongestFirstPolicy(SchedulingPolicy):
+    """ Executes the jobs that took the longest in their last execution first
+    (longest processing time first), so a slow job does not start last and
+    stretch the total time. Jobs without a history are executed before all
+    others, as they may be long, and by order of collection. """
+
+    def order(self, jobs: list[Job], history: JobHistory | None) -> list[Job]:
+        if history is None:
+            return list(jobs)
+
+        def key(job: Job) -> float:
+            duration = history.duration(job)
+            return float('-inf') if duration is None else -duration
+
+        return sorted(jobs, key=key)
+
+
+class FailedFirstPolicy(SchedulingPolicy):
+    """ Executes the jobs that have failed in their last execution first, so
+    regressions surface sooner. The order within the failed jobs and within
+    the rest is decided by the given policy. """
+
+    def __init__(self, then: SchedulingPolicy = None) -> None:
+        self.then = FifoPolicy() if then is None else then
+
+    def order(self, jobs: list[Job], history: JobHistory | None) -> list[Job]:
+        jobs = self.then.order(jobs, history)
+        if history is None:
+            return jobs
+        return sorted(jobs, key=lambda job: not history.failed(job))
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import math
+import statistics
+from dataclasses import dataclass
+from typing import Sequence
+
+T_CRITICAL_95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+# the two sided 95% critical values of the Student's t-distribution, for 1 to
+# 30 degrees of freedom. Above that, the normal distribution is used.
+
+Z_CRITICAL_95 = 1.960
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """ Returns the `q`-th percentile (0 to 100) of the given samples, using
+    linear interpolation between the closest ranks. """
+
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def confidence_interval(samples: Sequence[float]) -> float:
+    """ Returns the half width of the 95% confidence interval of the mean of
+    the given samples (which should contain at least two of them). """
+
+    degrees = len(samples) - 1
+    critical = T_CRITICAL_95[degrees - 1] \
+        if degrees <= len(T_CRITICAL_95) else Z_CRITICAL_95
+    return critical * statistics.stdev(samples) / math.sqrt(len(samples))
+
+
+@dataclass(frozen=True)
+class Summary:
+    """ Summarizes repeated measurements of the same quantity. """
+
+    count: int
+    min: float
+    median: float
+    p95: float
+    mean: float
+    stddev: float
+
+    @classmethod
+    def of(cls, samples: Sequence[float]) -> Summary:
+        return cls(
+            count=len(samples),
+            min=min(samples),
+            median=statistics.median(samples),
+            p95=percentile(samples, 95),
+            mean=statistics.mean(samples),
+            stddev=statistics.stdev(samples) if len(samples) > 1 else 0,
+        )
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from dataclasses import field
+from subprocess import DEVNULL
+from subprocess import PIPE
+
+import psutil  # pip install psutil
+
+from cptt.output import MappedOutput
+from cptt.process import MonitoredProcess
+from cptt.run.base import Job
+from cptt.run.base import JobEventManager
+from cptt.run.base import Runner
+from cptt.run.events import JobEvent
+from cptt.run.process import ProcessJob
+from cptt.run.process import ProcessStatus
+from cptt.run.process import ProcessStatusEvent
+from cptt.validate.base import OutputValidator
+from cptt.validate.token import TokenValidator
+
+
+@dataclass
+class StressEvent(JobEvent):
+    """ Reports the result of a single seed. The input is kept only if the
+    seed has failed. """
+
+    seed: int
+    status: ProcessStatus
+    input: bytes | MappedOutput | None = None
+
+    @property
+    def failed(self) -> bool:
+        return self.status is not ProcessStatus.FINISHED
+
+
+class _StatusCollector(JobEventManager):
+    """ Keeps the status that is pushed by a `ProcessJob` that is executed
+    as a part of another job. """
+
+    def __init__(self) -> None:
+        self.event: ProcessStatusEvent | None = None
+
+    def push_event(self, event: JobEvent) -> None:
+        if isinstance(event, ProcessStatusEvent):
+            self.event = event
+
+
+@dataclass
+class StressJob(Job):
+    """ Runs a batch of seeds, one after the other. For each seed, the
+    generator is executed with the seed as its last argument, and its output
+    is passed to both the reference and the solution. The output of the
+    solution is compared with the output of the reference, using the given
+    validator. The generator and the reference are trusted, and are not
+    limited. """
+
+    seeds: range
+    generator: list[str]
+    reference: list[str]
+    solution: list[str]
+    validator: type[OutputValidator] = TokenValidator
+    time_limit: float = None
+    memory_limit: float = None
+
+    _process: MonitoredProcess | ProcessJob = field(
+        init=False, default=None,
+        repr=False, compare=False,
+    )
+    # the process (or the job of the solution) that is currently running,
+    # which is killed if the job is cancelled.
+
+    def cancel(self) -> None:
+        super().cancel()
+        process = self._process
+        if isinstance(process, ProcessJob):
+            process.cancel()
+        elif process is not None:
+            with suppress(psutil.NoSuchProcess):
+                process.kill()
+
+    def _output(self, program: list[str], input: bytes = None) -> bytes | None:
+        """ Executes a trusted program, and returns its output. Returns `None`
+        if it has failed. """
+
+        process = self._process = MonitoredProcess(
+            program,
+            stdin=DEVNULL if input is None else PIPE,
+            stdout=PIPE, stderr=DEVNULL,
+        )
+        if self.cancelled:
+            with suppress(psutil.NoSuchProcess):
+                process.kill()
+
+        out, _ = process.communicate(input=input)
+        return out if process.returncode == 0 else None
+
+    def _judge(self, input: bytes, expected: bytes) -> ProcessStatus:
+        solution = self._process = ProcessJob(
+            self.solution,
+            time_limit=self.time_limit,
+            memory_limit=self.memory_limit,
+            input=input,
+            validators=[self.validator(expected)],
+        )
+        solution.cpus = self.cpus
+        solution.manager = _StatusCollector()
+        if self.cancelled:
+            solution.cancel()
+
+        rest = solution.execute()
+        if rest is not None:
+            rest()
+        return solution.manager.event.status
+
+    def _run_seed(self, seed: int) -> StressEvent:
+        input = self._output([*self.generator, str(seed)])
+        if input is None:
+            return StressEvent(self, seed, ProcessStatus.GENERATOR_ERROR)
+
+        expected = self._output(self.reference, input)
+        if expected is None:
+            return StressEvent(
+                self, seed, ProcessStatus.REFERENCE_ERROR, input,
+            )
+
+        status = self._judge(input, expected)
+        if status is ProcessStatus.FINISHED:
+            return StressEvent(self, seed, status)
+        return StressEvent(self, seed, status, input)
+
+    def execute(self) -> None:
+        for seed in self.seeds:
+            if self.cancelled:
+                return
+
+            event = self._run_seed(seed)
+            # a seed that has been interrupted by the cancellation is not
+            # reported: it hasn't passed, nor failed.
+            if self.cancelled:
+                return
+            self.manager.push_event(event)
+
+
+class StressRunner(Runner):
+    """ Hunts for inputs on which the solution and the reference disagree,
+    over many seeds in parallel (see `StressJob`). By default, there is a
+    slot for each CPU and the execution stops once a seed fails.
+
+    The seeds are divided into batches of `batch_size` seeds, and each batch
+    is executed as a single job, so the cost of scheduling a job is shared
+    by the whole batch. Once the runner has finished, the failures are in
+    `failures`, the input of the smallest one is saved to `save_path` (if
+    provided), and `throughput` is the number of seeds per second. """
+
+    def __init__(
+        self,
+        generator: list[str],
+        reference: list[str],
+        solution: list[str],
+        seeds: range,
+        validator: type[OutputValidator] = TokenValidator,
+        time_limit: float = None,
+        memory_limit: float = None,
+        batch_size: int = None,
+        stop_on_failure: bool = True,
+        save_path: str | os.PathLike = None,
+        threads: int = None,
+        **kwargs,
+    ) -> None:
+        if threads is None and not kwargs.get('pin_cpus'):
+            threads = os.cpu_count() or 1
+        super().__init__(threads, fail_fast=stop_on_failure, **kwargs)
+
+        if batch_size is None:
+            # a few batches for each slot, so the slots finish together.
+            batch_size = max(1, min(64, len(seeds) // (self._threads * 4)))
+
+        for start in range(0, len(seeds), batch_size):
+            self.collect(
+                StressJob(
+                    seeds[start:start + batch_size],
+                    generator, reference, solution,
+                    validator=validator,
+                    time_limit=time_limit,
+                    memory_limit=memory_limit,
+                ),
+            )
+
+        self.save_path = save_path
+        self.passed = 0
+        self.failures: list[StressEvent] = list()
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """ The number of seeds that have been checked per second. """
+
+        checked = self.passed + len(self.failures)
+        return checked / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def smallest_failure(self) -> StressEvent | None:
+        """ The failure with the smallest input (the first seed among the
+        failures with inputs of the same size). Failures of the generator
+        have no input, and are not considered. """
+
+        return min(
+            (event for event in self.failures if event.input is not None),
+            key=lambda event: (len(event.input), event.seed),
+            default=None,
+        )
+
+    def _handle_job_event(self, event: JobEvent) -> None:
+        if isinstance(event, StressEvent):
+            if event.failed:
+                self.failures.append(event)
+            else:
+                self.passed += 1
+
+    def execute(self) -> None:
+        start = time.monotonic()
+        super().execute()
+        self.elapsed = time.monotonic() - start
+
+        failure = self.smallest_failure
+        if failure is not None and self.save_path is not None:
+            with open(self.save_path, 'wb') as f:
+                f.write(failure.input)
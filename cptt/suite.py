@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Sequence
+from typing import Union
+
+from cptt.run.process import ProcessJob
+from cptt.validate.base import Validator
+from cptt.validate.token import TokenValidator
+
+
+@dataclass(frozen=True)
+class TestCase:
+    """ A single test of a suite: the path of its input, and the path of its
+    expected answer (if it has one). """
+
+    __test__ = False  # not a test class, for pytest
+
+    name: str
+    input: Path
+    answer: Path | None = None
+
+
+AnswerRule = Union[Sequence[str], Callable[[Path], Union[Path, None]]]
+# how the answer of an input is found: either templates of its path, or a
+# function that returns it (or `None`, if the input has no answer).
+
+DEFAULT_ANSWERS = ('{stem}.out', '{stem}.ans', '{stem}.a')
+
+
+def natural_key(path: str | os.PathLike) -> list:
+    """ A sort key that orders the numbers in paths by their value, so
+    `test2` comes before `test10`. """
+
+    return [
+        (0, int(part), '') if part.isdigit() else (1, 0, part)
+        for part in re.split(r'(\d+)', os.fspath(path))
+    ]
+
+
+def _find_answer(input: Path, answers: AnswerRule) -> Path | None:
+    if callable(answers):
+        return answers(input)
+
+    for template in answers:
+        answer = input.parent / template.format(
+            name=input.name,
+            stem=input.stem,
+        )
+        if answer != input and answer.is_file():
+            return answer
+    return None
+
+
+def discover(
+    directory: str | os.PathLike,
+    inputs: str = '*.in',
+    answers: AnswerRule = DEFAULT_ANSWERS,
+) -> list[TestCase]:
+    """ Finds the tests in the given directory. The inputs are the files that
+    match the glob pattern `inputs` (which may also match files in
+    subdirectories, such as `input/*`). The answer of each input is the first
+    existing file among the `answers` templates, which are relative to the
+    directory of the input, and may refer to its `name` and its `stem` (the
+    name without the extension). For example, `../output/{name}` finds the
+    answers of inputs in a sibling directory.
+
+    The tests are named after the paths of their inputs (relative to the
+    directory), and are sorted naturally by them. The files are not opened.
+    """
+
+    directory = Path(directory)
+    paths = sorted(
+        (path for path in directory.glob(inputs) if path.is_file()),
+        key=natural_key,
+    )
+    return [
+        TestCase(
+            path.relative_to(directory).as_posix(),
+            path, _find_answer(path, answers),
+        )
+        for path in paths
+    ]
+
+
+def suite_jobs(
+    tests: Iterable[TestCase],
+    program: list[str],
+    validator: Callable[[TestCase], Validator] = None,
+    **kwargs,
+) -> Iterator[ProcessJob]:
+    """ Yields a `ProcessJob` for each of the given tests, only once it is
+    needed. Collect them using `Runner.collect_lazily`, so the jobs of a large
+    suite are created as slots free up.
+
+    The input of each job is the path of its input file, which is opened
+    only once the job starts, and the validator (a `TokenValidator`, unless
+    another factory is provided) receives the path of the answer, which is
+    memory-mapped only while the output is validated. This way, the memory of
+    the judge grows with the number of slots, not with the size of the suite.
+    Tests without an answer are executed without validators. The rest of the
+    arguments are passed to the jobs. """
+
+    if validator is None:
+        def validator(test: TestCase) -> Validator:
+            return TokenValidator(test.answer)
+
+    for test in tests:
+        validators = [] if test.answer is None else [validator(test)]
+        yield ProcessJob(
+            program,
+            input=test.input,
+            validators=validators,
+            **kwargs,
+        )
@@ -2,12 +2,18 @@ from __future__ import annotations
 
 from .base import Validator
 from .base import ValidationError
+from .base import StreamingValidator
+from .base import ValidationStream
 from .strict import StrictValidator
 from .token import TokenValidator
+from .checker import CheckerValidator
 
 __all__ = [
     'Validator',
     'ValidationError',
+    'StreamingValidator',
+    'ValidationStream',
     'StrictValidator',
     'TokenValidator',
+    'CheckerValidator',
 ]
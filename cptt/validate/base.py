@@ -1,8 +1,29 @@
 from __future__ import annotations
 
+import hashlib
+import mmap
+import os
 from abc import ABC
 from abc import abstractmethod
 from dataclasses import dataclass
+from typing import Union
+
+Output = Union[bytes, bytearray, memoryview, str]
+# the output of a process, as it is passed to validators. Strings are
+# accepted for convenience, and are encoded using UTF-8.
+
+Expected = Union[Output, os.PathLike]
+# the expected output of a process: either the output itself, or the path of
+# a file that contains it.
+
+
+def as_bytes(data: Output) -> bytes | bytearray | memoryview:
+    """ Encodes the given output if it is a string. Other bytes-like objects
+    are returned as they are, without copying them. """
+
+    if isinstance(data, str):
+        return data.encode('utf8')
+    return data
 
 
 @dataclass
@@ -14,15 +35,83 @@ class ValidationError(Exception):
 class Validator(ABC):
     """ Comperes the programs output with the expected one. """
 
+    concurrent = False
+    # slow validators (such as the ones that execute a checker) set this, so
+    # the runner validates outputs concurrently with the execution of the
+    # next jobs.
+
     @abstractmethod
-    def validate(self, *, stdout: str, stderr: str, returncode: int) -> None:
+    def validate(
+        self, *,
+        stdout: Output,
+        stderr: Output,
+        returncode: int,
+    ) -> None:
         """ Recives the output that is produced by a process and validates
         it. """
 
+    def fingerprint(self) -> bytes | None:
+        """ Returns bytes that identify the behavior of the validator, so the
+        verdicts of jobs that use it can be cached. Returns `None` if the
+        validator can't be identified (verdicts are never cached then). """
+        return None
+
+
+class ValidationStream(ABC):
+    """ Validates the standard output of a single process incrementally,
+    while the process is still producing it. """
+
+    @abstractmethod
+    def feed(self, chunk: Output) -> None:
+        """ Recives the next chunk of the output. Raises a `ValidationError`
+        as soon as the output is known to be invalid. """
+
+    @abstractmethod
+    def finish(self) -> None:
+        """ Called after the whole output has been fed to the stream. Raises a
+        `ValidationError` if the output is invalid. """
+
+
+class StreamingValidator(Validator):
+    """ Validators that can check the output of the program while it is
+    being produced, without buffering all of it first. """
+
+    @abstractmethod
+    def stream(self) -> ValidationStream:
+        """ Returns a new stream that validates a single output. """
+
+
+def map_file(path: str | os.PathLike) -> bytes | mmap.mmap:
+    """ Maps the content of the given file into memory, without reading it.
+    The mapping is released once the returned object is discarded. """
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''  # empty files can't be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
 
 class OutputValidator(Validator):
     """ Validators that compare the output of the program with some
-    expected output. """
+    expected output.
+
+    The expected output can be the path of a file, which is memory-mapped
+    only while an output is validated. This way, validators for many tests
+    can be created up front without loading their expected outputs. """
+
+    def __init__(self, expected: Expected) -> None:
+        if isinstance(expected, os.PathLike):
+            self._path, self._data = expected, None
+        else:
+            self._path, self._data = None, as_bytes(expected)
+
+    @property
+    def _expected(self) -> bytes | bytearray | memoryview | mmap.mmap:
+        """ The expected output. If it is stored in a file, the file is mapped
+        again each time, so keep a reference only while it is in use. """
+
+        return self._data if self._path is None else map_file(self._path)
 
-    def __init__(self, expected: str) -> None:
-        self._expected = expected
+    def fingerprint(self) -> bytes:
+        digest = hashlib.sha256(self._expected).digest()
+        return type(self).__qualname__.encode() + b'\0' + digest
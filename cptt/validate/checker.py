@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from contextlib import ExitStack
+from subprocess import DEVNULL
+from subprocess import PIPE
+from typing import Iterator
+from typing import Sequence
+from typing import Union
+
+from cptt.output import MappedOutput
+from cptt.process import MemoryLimitExceeded
+from cptt.process import MonitoredProcess
+from cptt.process import TimeLimitExceeded
+from cptt.validate.base import as_bytes
+from cptt.validate.base import Output
+from cptt.validate.base import ValidationError
+from cptt.validate.base import Validator
+
+CheckerFile = Union[Output, os.PathLike]
+# data that is passed to the checker as a file. Paths are passed as they
+# are, and the rest is stored in a temporary file first.
+
+TMPFS = '/dev/shm'
+# temporary files are created here if it exists, so they never hit a disk.
+
+
+@contextmanager
+def _checker_file(data: CheckerFile, fds: list[int]) -> Iterator[str]:
+    """ Yields a path to a file with the given data, which the checker can
+    open. Where supported, the data is stored in an anonymous memory file,
+    which the checker inherits and opens using its `/proc/self/fd` path (the
+    inherited descriptors are appended to `fds`). Output that is mapped from
+    a file is passed the same way, without copying it. """
+
+    if isinstance(data, os.PathLike):
+        yield os.fspath(data)
+        return
+
+    proc = os.path.isdir('/proc/self/fd')
+    if isinstance(data, MappedOutput) and proc:
+        fds.append(data.fd)
+        yield f'/proc/self/fd/{data.fd}'
+        return
+
+    data = as_bytes(data)
+    if hasattr(os, 'memfd_create') and proc:
+        fd = os.memfd_create('cptt')
+        try:
+            with memoryview(data) as view:
+                while view:
+                    view = view[os.write(fd, view):]
+            fds.append(fd)
+            yield f'/proc/self/fd/{fd}'
+        finally:
+            os.close(fd)
+        return
+
+    directory = TMPFS if os.path.isdir(TMPFS) else None
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(data)
+    try:
+        yield f.name
+    finally:
+        os.unlink(f.name)
+
+
+class CheckerValidator(Validator):
+    """ Validates the output using an external checker, in the style of
+    testlib: the checker is executed with the paths of the input, the output
+    of the program and the expected answer, and accepts the output if it
+    exits with zero. Otherwise, the standard error of the checker is used as
+    the message of the validation error.
+
+    The input and the answer can be paths, which are passed to the checker
+    as they are. The checker is a `MonitoredProcess`, and can be limited as
+    any other program. A checker that exceeds its limits fails the output.
+    """
+
+    concurrent = True
+
+    def __init__(
+        self,
+        checker: Sequence[str],
+        input: CheckerFile = b'',
+        answer: CheckerFile = b'',
+        time_limit: float = None,
+        memory_limit: float = None,
+    ) -> None:
+        self.checker = list(checker)
+        self.input = input
+        self.answer = answer
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+
+    def validate(self, *, stdout: Output, **_) -> None:
+        fds: list[int] = list()
+        with ExitStack() as stack:
+            paths = [
+                stack.enter_context(_checker_file(data, fds))
+                for data in (self.input, stdout, self.answer)
+            ]
+
+            process = MonitoredProcess(
+                self.checker + paths,
+                stdin=DEVNULL, stdout=DEVNULL, stderr=PIPE,
+                **({'pass_fds': fds} if fds else {}),
+            )
+            try:
+                _, err = process.communicate(
+                    time_limit=self.time_limit,
+                    memory_limit=self.memory_limit,
+                )
+            except (TimeLimitExceeded, MemoryLimitExceeded) as exc:
+                raise ValidationError(f'checker failed: {exc}') from None
+
+        if process.returncode != 0:
+            message = err.decode('utf8', errors='replace').strip()
+            raise ValidationError(
+                message or f'checker exited with {process.returncode}',
+            )
@@ -1,11 +1,57 @@
 from __future__ import annotations
 
 from cptt.validate import ValidationError
+from cptt.validate.base import as_bytes
+from cptt.validate.base import Output
 from cptt.validate.base import OutputValidator
+from cptt.validate.base import StreamingValidator
+from cptt.validate.base import ValidationStream
 
 
-class StrictValidator(OutputValidator):
+class StrictValidationStream(ValidationStream):
 
-    def validate(self, *, stdout: str, **_) -> None:
-        if stdout != self._expected:
+    def __init__(self, expected: Output) -> None:
+        # slices of `bytes` (and of memory maps) are `bytes`, which are
+        # compared using memcmp. memoryviews are compared item by item.
+        expected = as_bytes(expected)
+        if isinstance(expected, memoryview):
+            expected = bytes(expected)
+        self._expected = expected
+        self._position = 0
+
+    def feed(self, chunk: Output) -> None:
+        chunk = as_bytes(chunk)
+        if not isinstance(chunk, bytes):
+            chunk = bytes(chunk)
+        end = self._position + len(chunk)
+        if self._expected[self._position:end] != chunk:
+            raise ValidationError('Output does not match expectations')
+        self._position = end
+
+    def finish(self) -> None:
+        if self._position != len(self._expected):
             raise ValidationError('Output does not match expectations')
+
+
+class StrictValidator(OutputValidator, StreamingValidator):
+    """ Compares the output of the program with the expected one, byte by
+    byte. """
+
+    CHUNK_SIZE = 1024 * 1024
+    # outputs that are not `bytes` (such as outputs that are mapped from
+    # files) are compared in chunks, so they are never copied as a whole.
+
+    def validate(self, *, stdout: Output, **_) -> None:
+        stdout, expected = as_bytes(stdout), self._expected
+        if isinstance(stdout, bytes) and isinstance(expected, bytes):
+            if stdout != expected:
+                raise ValidationError('Output does not match expectations')
+            return
+
+        stream = StrictValidationStream(expected)
+        for start in range(0, len(stdout), self.CHUNK_SIZE):
+            stream.feed(stdout[start:start + self.CHUNK_SIZE])
+        stream.finish()
+
+    def stream(self) -> StrictValidationStream:
+        return StrictValidationStream(self._expected)
@@ -1,16 +1,146 @@
 from __future__ import annotations
 
+from itertools import compress
+from operator import ne
+from typing import Iterator
+
+from cptt.validate.base import as_bytes
+from cptt.validate.base import Output
 from cptt.validate.base import OutputValidator
+from cptt.validate.base import StreamingValidator
 from cptt.validate.base import ValidationError
+from cptt.validate.base import ValidationStream
+
+try:
+    import numpy  # pip install cptt[numpy]
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class Tokenizer:
+    """ Splits a stream of bytes, which is recived in chunks, into whitespace
+    separated lowercase tokens. A token may be split between multiple chunks:
+    we collect its parts, and join them only after the whitespace that ends it
+    is recived. """
+
+    def __init__(self) -> None:
+        self._partial: list[bytes] = list()
+
+    def _end_token(self) -> list[bytes]:
+        if not self._partial:
+            return []
+        token = b''.join(self._partial)
+        self._partial.clear()
+        return [token]
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """ Returns the tokens that are completed by the given chunk. """
+
+        tokens = chunk.lower().split()
+        if not tokens:
+            return self._end_token() if chunk else []
+
+        completed = self._end_token() if chunk[:1].isspace() else []
+        ends_token = chunk[-1:].isspace()
+
+        self._partial.append(tokens[0])
+        if len(tokens) > 1 or ends_token:
+            completed += self._end_token()
+            rest = tokens[1:]
+            if rest and not ends_token:
+                self._partial.append(rest.pop())
+            completed += rest
+
+        return completed
+
+    def finish(self) -> list[bytes]:
+        """ Returns the last token of the stream, if it is not followed by any
+        whitespace. """
+        return self._end_token()
+
+
+def iter_tokens(data: Output, chunk_size: int) -> Iterator[list[bytes]]:
+    """ Yields the tokens of the given bytes-like object, in batches. Only a
+    single chunk of the data is copied at a time. """
+
+    data = memoryview(as_bytes(data))
+    tokenizer = Tokenizer()
+    for start in range(0, len(data), chunk_size):
+        yield tokenizer.feed(bytes(data[start:start + chunk_size]))
+    yield tokenizer.finish()
+
+
+class TokenValidationStream(ValidationStream):
+
+    def __init__(self, validator: TokenValidator, expected: Output) -> None:
+        self._validator = validator
+        self._tokenizer = Tokenizer()
+        self._expected = iter_tokens(expected, validator.CHUNK_SIZE)
+        self._pending: list[bytes] = list()
+        self._count = 0
+
+    def _take_expected(self, count: int) -> list[bytes]:
+        """ Returns the next `count` expected tokens (or less, if the expected
+        output ends before that). """
+
+        while len(self._pending) < count:
+            batch = next(self._expected, None)
+            if batch is None:
+                break
+            self._pending += batch
+
+        taken = self._pending[:count]
+        del self._pending[:count]
+        return taken
+
+    def _count_expected(self) -> int:
+        return self._count + len(self._pending) + sum(
+            len(batch) for batch in self._expected
+        )
+
+    def _compare(self, tokens: list[bytes]) -> None:
+        expected = self._take_expected(len(tokens))
+        self._validator.compare_token_lists(
+            tokens[:len(expected)], expected,
+            offset=self._count,
+        )
+
+        if len(expected) < len(tokens):
+            raise ValidationError(
+                f'Got at least {self._count + len(tokens)} tokens, '
+                f'expected {self._count + len(expected)}',
+            )
+        self._count += len(expected)
 
+    def feed(self, chunk: Output) -> None:
+        self._compare(self._tokenizer.feed(bytes(as_bytes(chunk))))
 
-class TokenValidator(OutputValidator):
+    def finish(self) -> None:
+        self._compare(self._tokenizer.finish())
+        expected = self._count_expected()
+        if self._count != expected:
+            raise ValidationError(
+                f'Got {self._count} tokens, expected {expected}',
+            )
+
+
+class TokenValidator(OutputValidator, StreamingValidator):
+    """ Compares the whitespace separated tokens of the output with the
+    expected ones. Tokens are compared case insensitively, and numbers are
+    compared up to a small error. """
 
     MAX_NUMBER_LENGTH = 20
     MAX_ALLOWED_ERROR = 1e-5
 
+    CHUNK_SIZE = 1024 * 1024
+    # the expected output is tokenized lazily, in chunks of this size.
+
+    VECTORIZE_THRESHOLD = 64
+    # if NumPy is avaliable and at least this number of tokens differ from
+    # their expected values, they are parsed and compared as numbers in bulk.
+
     @classmethod
-    def compare_tokens(cls, got: str, exp: str) -> None:
+    def compare_tokens(cls, got: bytes | str, exp: bytes | str) -> None:
         if got.lower() == exp.lower():
             return
 
@@ -23,14 +153,92 @@ class TokenValidator(OutputValidator):
         except (ValueError, AssertionError):
             raise ValidationError('Tokens differ') from None
 
-    def validate(self, *, stdout: str, **_) -> None:
-        stdout = stdout.split()
-        expected = self._expected.split()
+    @classmethod
+    def _first_mismatch_vectorized(
+        cls,
+        got: list[bytes],
+        exp: list[bytes],
+    ) -> int | None:
+        """ Parses all of the given tokens as numbers at once, and returns
+        the index of the first pair that is not equal up to the allowed error.
+        Raises a `ValueError` if one of the tokens is not a number. """
+
+        if b'\0' in b''.join(got) or b'\0' in b''.join(exp):
+            # NumPy strips trailing NUL bytes from the tokens.
+            raise ValueError('tokens contain NUL bytes')
+
+        got, exp = numpy.array(got), numpy.array(exp)
+        too_long = numpy.char.str_len(got) > cls.MAX_NUMBER_LENGTH
+        too_long |= numpy.char.str_len(exp) > cls.MAX_NUMBER_LENGTH
+
+        with numpy.errstate(invalid='ignore'):
+            # infinities of the same sign differ by NaN, like in Python.
+            error = numpy.abs(
+                got.astype(numpy.float64) - exp.astype(numpy.float64),
+            )
+
+        mismatches = numpy.flatnonzero(
+            too_long | ~(error <= cls.MAX_ALLOWED_ERROR),
+        )
+        return int(mismatches[0]) if len(mismatches) else None
+
+    @classmethod
+    def _first_mismatch(
+        cls,
+        got: list[bytes],
+        exp: list[bytes],
+    ) -> int | None:
+        if numpy is not None and len(got) >= cls.VECTORIZE_THRESHOLD:
+            try:
+                return cls._first_mismatch_vectorized(got, exp)
+            except ValueError:
+                pass  # some tokens are not numbers
+
+        for index, (got_token, exp_token) in enumerate(zip(got, exp)):
+            try:
+                cls.compare_tokens(got_token, exp_token)
+            except ValidationError:
+                return index
+        return None
+
+    @classmethod
+    def compare_token_lists(
+        cls,
+        got: list[bytes],
+        exp: list[bytes],
+        offset: int = 0,
+    ) -> None:
+        """ Compares two lists of lowercase tokens with the same length, and
+        raises a `ValidationError` with the index of the first pair of tokens
+        that differ (counted from the given offset).
+
+        Identical tokens are filtered out without a Python level loop, and the
+        rest are compared as numbers (in bulk, if NumPy is avaliable). """
+
+        candidates = list(compress(range(len(got)), map(ne, got, exp)))
+        if not candidates:
+            return
+
+        index = cls._first_mismatch(
+            [got[i] for i in candidates],
+            [exp[i] for i in candidates],
+        )
+
+        if index is not None:
+            raise ValidationError(
+                f'Tokens differ at index {offset + candidates[index]}',
+            )
+
+    def validate(self, *, stdout: Output, **_) -> None:
+        stdout = bytes(as_bytes(stdout)).lower().split()
+        expected = bytes(self._expected).lower().split()
 
         if len(stdout) != len(expected):
             raise ValidationError(
                 f'Got {len(stdout)} tokens, expected {len(expected)}',
             )
 
-        for out, exp in zip(stdout, expected):
-            self.compare_tokens(out, exp)
+        self.compare_token_lists(stdout, expected)
+
+    def stream(self) -> TokenValidationStream:
+        return TokenValidationStream(self, self._expected)
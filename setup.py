@@ -22,6 +22,9 @@ setup(
 
     python_requires=">=3.7,<4",
     install_requires=DEPENDENCIES,
+    extras_require={
+        'numpy': ['numpy'],
+    },
 
     long_description=README + '\n\n' + CHANGELOG,
     long_description_content_type="text/markdown",
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from cptt.run import AsyncRunner
+from cptt.run import ProcessPoolRunner
 from cptt.run import Runner
 
 if TYPE_CHECKING:
@@ -10,8 +12,28 @@ if TYPE_CHECKING:
 
 class RecordingRunner(Runner):
 
-    def __init__(self, threads: int = 1) -> None:
-        super().__init__(threads)
+    def __init__(self, threads: int = 1, **kwargs) -> None:
+        super().__init__(threads, **kwargs)
+        self.events = list()
+
+    def _handle_job_event(self, event: JobEvent) -> None:
+        self.events.append(event)
+
+
+class RecordingAsyncRunner(AsyncRunner):
+
+    def __init__(self, concurrency: int = 1, **kwargs) -> None:
+        super().__init__(concurrency, **kwargs)
+        self.events = list()
+
+    def _handle_job_event(self, event: JobEvent) -> None:
+        self.events.append(event)
+
+
+class RecordingProcessPoolRunner(ProcessPoolRunner):
+
+    def __init__(self, processes: int = 1, **kwargs) -> None:
+        super().__init__(processes, **kwargs)
         self.events = list()
 
     def _handle_job_event(self, event: JobEvent) -> None:
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+from cptt.build import ArtifactCache
+from cptt.build import CompileEvent
+from cptt.build import CompileJob
+from cptt.build import CompileStatus
+from cptt.build import LanguageProfile
+from cptt.build import profile_for
+from testing import requires_cli
+from testing.runners import RecordingRunner
+
+HELLO = """
+#include <iostream>
+int main() { std::cout << "hello " << %d << std::endl; }
+"""
+
+
+def compile(*jobs: CompileJob, threads: int = 1) -> list[CompileEvent]:
+    runner = RecordingRunner(threads)
+    for job in jobs:
+        runner.collect(job)
+    runner.execute()
+
+    events = [
+        event for event in runner.events
+        if isinstance(event, CompileEvent)
+    ]
+    return [
+        next(event for event in events if event.job is job)
+        for job in jobs
+    ]
+
+
+def run(program: list[str]) -> str:
+    return subprocess.run(
+        program, stdout=subprocess.PIPE, check=True,
+        encoding='utf8',
+    ).stdout
+
+
+@requires_cli('g++')
+def test_parallel_compiles_are_cached(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    sources = list()
+    for index in range(3):
+        source = tmp_path / f'hello{index}.cpp'
+        source.write_text(HELLO % index)
+        sources.append(source)
+
+    events = compile(
+        *(CompileJob(source, cache=cache) for source in sources),
+        threads=3,
+    )
+    assert [event.status for event in events] == [CompileStatus.COMPILED] * 3
+    assert all(event.time > 0 for event in events)
+    assert [run(event.program) for event in events] == \
+        [f'hello {index}\n' for index in range(3)]
+
+    again, = compile(CompileJob(sources[1], cache=cache))
+    assert again.status is CompileStatus.CACHED
+    assert again.program == events[1].program
+
+    sources[1].write_text(HELLO % 7)
+    changed, = compile(CompileJob(sources[1], cache=cache))
+    assert changed.status is CompileStatus.COMPILED
+    assert run(changed.program) == 'hello 7\n'
+
+
+@requires_cli('g++')
+def test_compile_error(tmp_path):
+    source = tmp_path / 'broken.cpp'
+    source.write_text('int main() { return undefined_name; }')
+
+    event, = compile(CompileJob(source, cache=ArtifactCache(tmp_path)))
+    assert event.status is CompileStatus.COMPILE_ERROR
+    assert event.failed
+    assert 'undefined_name' in event.message
+    assert event.program is None
+
+
+def test_missing_compiler(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    profile = LanguageProfile(
+        'missing', ('.x',),
+        run=('{artifact}',),
+        compile=('cptt-missing-compiler', '{source}'),
+    )
+    source = tmp_path / 'program.x'
+    source.write_text('')
+    python = tmp_path / 'hello.py'
+    python.write_text('print("hello")')
+
+    missing, compiled = compile(
+        CompileJob(source, profile=profile, cache=cache),
+        CompileJob(python),
+    )
+    assert missing.status is CompileStatus.COMPILE_ERROR
+    assert 'cptt-missing-compiler' in missing.message
+    assert missing.program is None
+    assert compiled.status is CompileStatus.COMPILED
+    assert not list((tmp_path / 'cache').iterdir())
+
+
+def test_interpreted_source(tmp_path):
+    source = tmp_path / 'hello.py'
+    source.write_text('print("hello")')
+
+    event, = compile(CompileJob(source))
+    assert event.status is CompileStatus.COMPILED
+    assert event.program == [sys.executable, str(source)]
+    assert run(event.program) == 'hello\n'
+
+
+def test_unknown_language():
+    with pytest.raises(ValueError):
+        profile_for('program.unknown')
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import pickle
+
+from cptt.cache import VerdictCache
+from cptt.run.process import ProcessJob
+from cptt.run.process import ProcessStatus
+from cptt.validate import TokenValidator
+from cptt.validate import Validator
+from testing import python_script
+from testing.runners import RecordingRunner
+
+
+def run_job(job: ProcessJob):
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+    return runner.events[1]
+
+
+def counting_script(log) -> list[str]:
+    """ A script that doubles its input, and counts its executions in the
+    given log file. """
+
+    return python_script(
+        f"""
+        with open({str(log)!r}, 'a') as log:
+            log.write('.')
+        print(int(input()) * 2)
+        """,
+    )
+
+
+def test_cache_hit(tmp_path):
+    cache = VerdictCache(tmp_path / 'cache')
+    log = tmp_path / 'log'
+    program = counting_script(log)
+
+    def job(input='21'):
+        return ProcessJob(
+            program, input=input, time_limit=5,
+            validators=[TokenValidator('42')], cache=cache,
+        )
+
+    first = run_job(job())
+    second = run_job(job())
+    assert first.status is second.status is ProcessStatus.FINISHED
+    assert not first.cached and second.cached
+    assert second.time == first.time
+    assert log.read_text() == '.'
+
+    assert run_job(job('20')).status is ProcessStatus.WRONG_ANSWER
+    assert run_job(job('20')).cached
+    assert log.read_text() == '..'
+
+
+def test_cache_invalidated_by_program(tmp_path):
+    cache = VerdictCache(tmp_path / 'cache')
+    program = python_script('print(1)')
+
+    def job():
+        return ProcessJob(
+            program, validators=[TokenValidator('1')], cache=cache,
+        )
+
+    assert run_job(job()).status is ProcessStatus.FINISHED
+    assert run_job(job()).cached
+
+    with open(program[1], 'w') as f:
+        f.write('print(2)')
+    status = run_job(job())
+    assert not status.cached
+    assert status.status is ProcessStatus.WRONG_ANSWER
+
+
+def test_cache_bypass(tmp_path):
+    log = tmp_path / 'log'
+    program = counting_script(log)
+
+    for bypass in (False, False, True):
+        cache = VerdictCache(tmp_path / 'cache', bypass=bypass)
+        run_job(ProcessJob(program, input='1', cache=cache))
+    assert log.read_text() == '..'
+
+
+def test_uncacheable_validator(tmp_path):
+
+    class ReturnCodeValidator(Validator):
+        def validate(self, *, returncode, **_):
+            pass
+
+    cache = VerdictCache(tmp_path / 'cache')
+    log = tmp_path / 'log'
+    for _ in range(2):
+        run_job(
+            ProcessJob(
+                counting_script(log), input='1', cache=cache,
+                validators=[ReturnCodeValidator()],
+            ),
+        )
+    assert log.read_text() == '..'
+    assert not os.listdir(tmp_path / 'cache')
+
+
+def test_lru_eviction(tmp_path):
+    cache = VerdictCache(tmp_path, max_size=1000)
+    for index in range(8):
+        cache.put(f'key{index}', {'data': 'x' * 90})
+        os.utime(tmp_path / f'key{index}.json', (index, index))
+
+    assert cache.get('key0') is not None  # marks the oldest entry as used
+    for index in range(8, 10):
+        cache.put(f'key{index}', {'data': 'x' * 90})
+
+    assert cache.get('key0') is not None
+    assert cache.get('key1') is None
+    assert cache.get('key9') is not None
+    assert sum(
+        os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)
+    ) <= 1000
+
+
+def test_pickled_cache(tmp_path):
+    cache = pickle.loads(pickle.dumps(VerdictCache(tmp_path)))
+    cache.put('key', {'status': 'FINISHED'})
+    assert cache.get('key') == {'status': 'FINISHED'}
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import pytest
+
+from cptt.output import OutputCapture
+from cptt.run.events import JobStartEvent
+from cptt.run.process import ProcessJob
+from cptt.run.process import ProcessStatus
+from cptt.run.process import ProcessStatusEvent
+from cptt.validate import CheckerValidator
+from cptt.validate import ValidationError
+from testing import python_script
+from testing.runners import RecordingAsyncRunner
+from testing.runners import RecordingRunner
+
+CHECKER = python_script("""
+import sys
+input, output, answer = (open(path).read() for path in sys.argv[1:])
+if int(output) != int(input) * 2 or output.strip() != answer.strip():
+    sys.exit(f'expected {answer.strip()}, got {output.strip()}')
+""")
+
+
+def test_accepts_output():
+    validator = CheckerValidator(CHECKER, input='21\n', answer='42\n')
+    validator.validate(stdout=b'42\n', stderr=b'', returncode=0)
+
+
+def test_rejects_output(tmp_path):
+    answer = tmp_path / 'answer.txt'
+    answer.write_text('42\n')
+    validator = CheckerValidator(CHECKER, input='21\n', answer=answer)
+
+    with pytest.raises(ValidationError) as info:
+        validator.validate(stdout=b'43\n', stderr=b'', returncode=0)
+    assert info.value.message == 'expected 42, got 43'
+
+
+def test_mapped_output():
+    capture = OutputCapture(text=False, threshold=1)
+    capture.write(b'42\n')
+    validator = CheckerValidator(CHECKER, input='21\n', answer='42\n')
+    validator.validate(stdout=capture.read(), stderr=b'', returncode=0)
+    capture.close()
+
+
+def test_checker_time_limit():
+    validator = CheckerValidator(
+        python_script('while True: pass'),
+        time_limit=0.2,
+    )
+    with pytest.raises(ValidationError):
+        validator.validate(stdout=b'', stderr=b'', returncode=0)
+
+
+def collect(runner, checker):
+    for index in range(4):
+        runner.collect(
+            ProcessJob(
+                python_script('print(int(input()) * 2)'),
+                input=f'{index}\n',
+                validators=[
+                    CheckerValidator(
+                        checker, input=f'{index}\n',
+                        answer=f'{index * 2 if index != 2 else 0}\n',
+                    ),
+                ],
+            ),
+        )
+
+
+@pytest.mark.parametrize('runner_type', (RecordingRunner, RecordingAsyncRunner))
+def test_checked_jobs(runner_type):
+    runner = runner_type()
+    collect(runner, CHECKER)
+    runner.execute()
+
+    statuses = [
+        event.status for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    ]
+    assert statuses == [
+        ProcessStatus.FINISHED, ProcessStatus.FINISHED,
+        ProcessStatus.WRONG_ANSWER, ProcessStatus.FINISHED,
+    ]
+
+
+def test_checker_runs_concurrently():
+    slow_checker = python_script('import time; time.sleep(0.3)')
+    runner = RecordingRunner()
+    collect(runner, slow_checker)
+    runner.execute()
+
+    # the slot moves on to the next job while the output of the previous one
+    # is being checked.
+    kinds = [type(event) for event in runner.events]
+    assert kinds.index(JobStartEvent, 1) < kinds.index(ProcessStatusEvent)
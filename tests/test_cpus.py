@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from cptt import cpus
+from cptt.run.process import ProcessJob
+from cptt.run.process import ProcessStatus
+from cptt.validate import TokenValidator
+from testing import python_script
+from testing.runners import RecordingAsyncRunner
+from testing.runners import RecordingRunner
+
+
+def test_parse_cpu_list():
+    assert cpus.parse_cpu_list('0-3,8,10-11\n') == {0, 1, 2, 3, 8, 10, 11}
+    assert cpus.parse_cpu_list('\n') == set()
+
+
+@pytest.fixture
+def topology(monkeypatch):
+    # 4 physical cores with 2 threads each, where cpu `n` and cpu `n + 4`
+    # are siblings.
+    monkeypatch.setattr(cpus, 'isolated_cpus', set)
+    monkeypatch.setattr(cpus, 'available_cpus', lambda: set(range(8)))
+    monkeypatch.setattr(
+        cpus, 'smt_siblings', lambda cpu: {cpu % 4, cpu % 4 + 4},
+    )
+
+
+def test_allocate_cpu_sets(topology):
+    assert cpus.allocate_cpu_sets() == [frozenset({i}) for i in range(8)]
+    assert cpus.allocate_cpu_sets(2) == [frozenset({0}), frozenset({1})]
+    assert cpus.allocate_cpu_sets(10)[8:] == [frozenset({0}), frozenset({1})]
+
+
+def test_allocate_cpu_sets_avoid_smt(topology):
+    assert cpus.allocate_cpu_sets(avoid_smt=True) == [
+        frozenset({i}) for i in range(4)
+    ]
+
+
+def test_allocate_isolated_cpus(topology, monkeypatch):
+    monkeypatch.setattr(cpus, 'isolated_cpus', lambda: {2, 3})
+    assert cpus.allocate_cpu_sets() == [frozenset({2}), frozenset({3})]
+
+
+def test_isolated_cpus_outside_of_mask(topology, monkeypatch):
+    monkeypatch.setattr(cpus, 'isolated_cpus', lambda: {3, 9})
+    assert cpus.allocate_cpu_sets() == [frozenset({3})]
+
+    monkeypatch.setattr(cpus, 'isolated_cpus', lambda: {9})
+    assert cpus.allocate_cpu_sets() == [frozenset({i}) for i in range(8)]
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'sched_setaffinity'),
+    reason='CPU affinity is not supported',
+)
+@pytest.mark.parametrize('runner_type', (RecordingRunner, RecordingAsyncRunner))
+def test_pinned_jobs(runner_type):
+    runner = runner_type(None, pin_cpus=True)
+    slots = cpus.allocate_cpu_sets()
+    assert runner._threads == len(slots)
+
+    job = ProcessJob(
+        python_script('import os; print(*os.sched_getaffinity(0))'),
+        validators=[TokenValidator(str(min(slots[0])))],
+    )
+    runner.collect(job)
+    runner.execute()
+
+    statuses = [e.status for e in runner.events if hasattr(e, 'status')]
+    assert statuses == [ProcessStatus.FINISHED]
+    assert job.cpus == slots[0]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cptt.forkserver import ForkServer
+from cptt.forkserver import ForkServerError
+from cptt.forkserver import ForkServerProcess
+from cptt.process import TimeLimitExceeded
+from cptt.run.process import ProcessJob
+from cptt.run.process import ProcessStatus
+from cptt.validate import StrictValidator
+from testing import python_script
+from testing.runners import RecordingRunner
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, 'fork'),
+    reason='fork servers require fork',
+)
+
+
+@pytest.fixture(scope='module')
+def server():
+    with ForkServer(preload=['json']) as server:
+        yield server
+
+
+def test_forked_process_streams(server):
+    process = ForkServerProcess(
+        server,
+        python_script("""
+        import sys
+        data = b'x' * 64_000_000
+        print(input()[::-1], sys.argv[1:])
+        sys.stderr.write('done')
+        """) + ('arg',),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    out, err = process.communicate(input=b'olleh\n')
+    assert out == b"hello ['arg']\n"
+    assert err == b'done'
+    assert process.returncode == 0
+    assert 0 < process.duration
+    assert 64_000_000 <= process.memory_used < 150_000_000
+
+
+def test_forked_exit_codes(server):
+    process = ForkServerProcess(
+        server, python_script('import sys; sys.exit(3)'),
+    )
+    assert process.wait() == 3
+
+    process = ForkServerProcess(
+        server, python_script('raise ValueError'),
+        stderr=subprocess.PIPE,
+    )
+    _, err = process.communicate()
+    assert process.returncode == 1
+    assert b'ValueError' in err
+
+
+def test_forked_time_limit(server):
+    process = ForkServerProcess(
+        server, python_script('while True: pass'),
+    )
+
+    with pytest.raises(TimeLimitExceeded):
+        process.wait(time_limit=0.2)
+    assert process.returncode < 0
+    assert 0.2 < process.duration < 1
+
+
+def test_preloaded_modules(server):
+    runner = RecordingRunner()
+    for index in range(5):
+        runner.collect(
+            ProcessJob(
+                python_script("""
+                import sys
+                print(input(), 'json' in sys.modules)
+                """),
+                input=f'{index}\n',
+                validators=[StrictValidator(f'{index} True\n')],
+                fork_server=server,
+            ),
+        )
+
+    runner.execute()
+    statuses = [
+        event.status for event in runner.events
+        if hasattr(event, 'status')
+    ]
+    assert statuses == [ProcessStatus.FINISHED] * 5
+
+
+def test_forked_job_time_limit(server):
+    runner = RecordingRunner()
+    runner.collect(
+        ProcessJob(
+            python_script('while True: pass'),
+            time_limit=0.1,
+            fork_server=server,
+        ),
+    )
+    runner.execute()
+
+    _, update, _ = runner.events
+    assert update.status is ProcessStatus.TIME_LIMIT
+
+
+def test_closed_server():
+    server = ForkServer()
+    server.close()
+
+    with pytest.raises(ForkServerError):
+        ForkServerProcess(server, python_script('pass'))
+
+
+def test_not_a_script(server):
+    with pytest.raises(ValueError):
+        ForkServerProcess(server, [sys.executable, '-c', 'pass'])
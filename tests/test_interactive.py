@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from cptt.run.interactive import InteractiveJob
+from cptt.run.process import ProcessStatus
+from cptt.run.process import ProcessStatusEvent
+from testing import python_script
+from testing.runners import RecordingRunner
+
+ROUNDS = 10_000
+
+INTERACTOR = python_script(f"""
+import sys
+for i in range({ROUNDS}):
+    print(i, flush=True)
+    if int(input()) != i + 1:
+        sys.exit(1)
+print(-1, flush=True)
+""")
+
+PROGRAM = """
+while True:
+    i = int(input())
+    if i < 0:
+        break
+    print(i + {step}, flush=True)
+"""
+
+
+def status(job: InteractiveJob) -> ProcessStatusEvent:
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    update, = (
+        event for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    )
+    return update
+
+
+def test_accepted():
+    update = status(
+        InteractiveJob(
+            python_script(PROGRAM.format(step=1)), INTERACTOR,
+            time_limit=8,
+        ),
+    )
+    assert update.status is ProcessStatus.FINISHED
+    assert 0 < update.time < 8
+
+
+def test_wrong_answer():
+    update = status(
+        InteractiveJob(python_script(PROGRAM.format(step=2)), INTERACTOR),
+    )
+    assert update.status is ProcessStatus.WRONG_ANSWER
+
+
+def test_time_limit():
+    update = status(
+        InteractiveJob(
+            python_script('import time; time.sleep(30)'), INTERACTOR,
+            time_limit=0.5,
+        ),
+    )
+    assert update.status is ProcessStatus.TIME_LIMIT
+    assert update.time < 2
+
+
+def test_runtime_error():
+    update = status(
+        InteractiveJob(
+            python_script('raise SystemExit(3)'),
+            python_script('pass'),
+        ),
+    )
+    assert update.status is ProcessStatus.RUNTIME_ERROR
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='requires signals')
+@pytest.mark.parametrize(
+    ('program', 'expected'), (
+        ('raise SystemExit(3)', ProcessStatus.RUNTIME_ERROR),
+        ('import sys; sys.stdin.close()', ProcessStatus.WRONG_ANSWER),
+    ),
+)
+def test_interactor_broken_pipe(program, expected):
+    # a native interactor is killed by `SIGPIPE` once the program exits.
+    update = status(InteractiveJob(python_script(program), ['yes']))
+    assert update.status is expected
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='requires signals')
+def test_interactor_error():
+    update = status(
+        InteractiveJob(
+            python_script(PROGRAM.format(step=1)),
+            python_script("""
+            import os, signal
+            os.kill(os.getpid(), signal.SIGKILL)
+            """),
+        ),
+    )
+    assert update.status is ProcessStatus.INTERACTOR_ERROR
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import os
 import time
 
 from cptt.run import Job
 from cptt.run import JobEvent
 from cptt.run import Runner
+from cptt.run.events import JobEndEvent
 from cptt.run.events import JobStartEvent
+from testing.runners import RecordingAsyncRunner
+from testing.runners import RecordingProcessPoolRunner
 from testing.runners import RecordingRunner
 
 
@@ -114,3 +118,89 @@ def test_adding_custom_events():
     expected = sorted(sleeps)
     got = [e.job.args[0] for e in runner.events if isinstance(e, MyEvent)]
     assert expected == got
+
+
+def test_async_runner_executes_jobs():
+
+    class MyEvent(JobEvent):
+        pass
+
+    class MyJob(LambdaJob):
+        def execute(self) -> None:
+            super().execute()
+            self.manager.push_event(MyEvent(self))
+
+    runner = RecordingAsyncRunner(concurrency=3)
+    jobs = [MyJob(time.sleep, args=(0.1,)) for _ in range(3)]
+    for job in jobs:
+        runner.collect(job)
+
+    start = time.time()
+    runner.execute()
+    assert time.time() - start < 0.3
+
+    for job in jobs:
+        kinds = [type(e) for e in runner.events if e.job is job]
+        assert kinds == [JobStartEvent, MyEvent, JobEndEvent]
+
+
+class PingEvent(JobEvent):
+    pass
+
+
+class PingJob(LambdaJob):
+    def execute(self) -> None:
+        super().execute()
+        self.manager.push_event(PingEvent(self))
+
+
+def test_process_pool_runner():
+    runner = RecordingProcessPoolRunner(processes=3)
+    jobs = [PingJob(time.sleep, args=(0.5,)) for _ in range(3)]
+    for job in jobs:
+        runner.collect(job)
+
+    start = time.time()
+    runner.execute()
+    assert time.time() - start < 1.5
+
+    for job in jobs:
+        kinds = [type(e) for e in runner.events if e.job is job]
+        assert kinds == [JobStartEvent, PingEvent, JobEndEvent]
+
+
+def test_process_pool_worker_crash():
+    runner = RecordingProcessPoolRunner(processes=1)
+    crashing = LambdaJob(os._exit, args=(1,))
+    jobs = [crashing] + [LambdaJob(print, args=(i,)) for i in range(2)]
+    for job in jobs:
+        runner.collect(job)
+
+    runner.execute()
+    ends = [e.job for e in runner.events if isinstance(e, JobEndEvent)]
+    assert ends == jobs
+
+
+def test_cancel_drops_pending_jobs():
+    items = list()
+
+    def func(i):
+        items.append(i)
+        time.sleep(0.2)
+
+    class CancellingRunner(RecordingRunner):
+        def _handle_job_event(self, event: JobEvent) -> None:
+            super()._handle_job_event(event)
+            self.cancel()
+
+    runner = CancellingRunner()
+    jobs = [LambdaJob(func, args=(i,)) for i in range(5)]
+    for job in jobs:
+        runner.collect(job)
+    runner.execute()
+
+    assert items == [0]
+    assert runner.cancelled
+    assert all(job.cancelled for job in jobs)
+    assert [type(event) for event in runner.events] == \
+        [JobStartEvent, JobEndEvent] * 5
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import errno
+import os
+
+from cptt import limits
+
+
+def test_judge_moves_into_leaf_cgroup(tmp_path, monkeypatch):
+    (tmp_path / 'cgroup.subtree_control').write_text('')
+    written = list()
+
+    def write_cgroup(path, value):
+        # the cgroup can't enable controllers while the judge is in it.
+        if path.endswith('subtree_control') and not written:
+            raise OSError(errno.EBUSY, 'busy')
+        written.append((os.path.relpath(path, tmp_path), value))
+
+    monkeypatch.setattr(limits, '_write_cgroup', write_cgroup)
+    assert limits._enable_memory_controller(str(tmp_path))
+    assert written == [
+        (f'{limits.JUDGE_CGROUP}/cgroup.procs', str(os.getpid())),
+        ('cgroup.subtree_control', '+memory'),
+    ]
+
+
+def test_judge_cgroup_is_not_a_parent(tmp_path, monkeypatch):
+    monkeypatch.delenv(limits.CGROUP_ENV, raising=False)
+    monkeypatch.setattr(limits, '_cgroup2_mountpoint', lambda: str(tmp_path))
+    monkeypatch.setattr(limits, '_own_cgroup', lambda: 'user')
+    assert limits._cgroup2_parent() == os.path.join(tmp_path, 'user')
+
+    # once the judge has moved into its leaf cgroup, the parent stays the same.
+    monkeypatch.setattr(
+        limits, '_own_cgroup', lambda: f'user/{limits.JUDGE_CGROUP}',
+    )
+    assert limits._cgroup2_parent() == os.path.join(tmp_path, 'user')
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import os
 import random
 import subprocess
+import time
 
+import psutil
 import pytest
 
+from cptt.process import CLEAR_REFS
 from cptt.process import MemoryLimitExceeded
 from cptt.process import MonitoredProcess
+from cptt.process import OutputLimitExceeded
 from cptt.process import TimeLimitExceeded
 from testing import python_script
 from testing import requires_cli
@@ -140,3 +145,243 @@ def test_time_limit():
         process.wait(time_limit=0.5)
 
     assert process.duration > 0.5
+
+
+def test_time_limit_without_pidfd(monkeypatch):
+    import cptt.process
+    monkeypatch.setattr(cptt.process, '_open_pidfd', lambda pid: None)
+
+    process = MonitoredProcess(
+        python_script("""
+        import time
+        time.sleep(1)
+        """),
+    )
+
+    with pytest.raises(TimeLimitExceeded):
+        process.wait(time_limit=0.5)
+
+    assert process.duration > 0.5
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'pidfd_open'),
+    reason='pidfd is not supported on this platform',
+)
+def test_idle_wait_does_not_busy_poll(monkeypatch):
+    samples = list()
+    guard = MonitoredProcess._memory_guard
+
+    def counting_guard(self, memory_limit):
+        samples.append(memory_limit)
+        return guard(self, memory_limit)
+
+    monkeypatch.setattr(MonitoredProcess, '_memory_guard', counting_guard)
+
+    process = MonitoredProcess(
+        python_script("""
+        import time
+        time.sleep(0.5)
+        """),
+    )
+
+    process.wait()
+    assert process.returncode == 0
+    assert len(samples) < 100
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'wait4'),
+    reason='peak memory is only collected on posix',
+)
+def test_short_memory_spike():
+    process = MonitoredProcess(
+        python_script("""
+            array = bytearray(200_000_000)
+            array[::4096] = b'x' * len(array[::4096])
+        """),
+    )
+
+    with pytest.raises(MemoryLimitExceeded):
+        process.wait(memory_limit=150_000_000)
+
+    assert process.memory_used > 150_000_000
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'wait4'),
+    reason='resource usage is only collected on posix',
+)
+def test_cpu_time_accounting():
+    process = MonitoredProcess(
+        python_script("""
+            import time
+            time.sleep(0.3)
+            start = time.process_time()
+            while time.process_time() - start < 0.2: pass
+        """),
+    )
+
+    process.wait()
+    assert process.duration > 0.5
+    assert 0.2 <= process.cpu_time < process.duration
+    assert process.memory_used > 0
+
+
+@pytest.mark.skipif(
+    not os.path.exists(CLEAR_REFS),
+    reason='the peak memory of the judge can only be reset on linux',
+)
+def test_peak_memory_of_judge_is_not_inherited():
+    garbage = b'x' * 300_000_000
+    del garbage
+
+    process = MonitoredProcess(python_script("data = b'x' * 100_000_000"))
+    process.wait()
+    assert 100_000_000 <= process.max_rss < 250_000_000
+    assert process.memory_used >= 100_000_000
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'wait4'),
+    reason='resource usage is only collected on posix',
+)
+def test_max_rss_is_not_inflated():
+    garbage = b'x' * 300_000_000
+    process = MonitoredProcess(python_script('pass'))
+    process.wait()
+    del garbage
+
+    # the peak of the small program can't be told apart from the memory of
+    # the judge, which it has started from.
+    assert process.max_rss is None or process.max_rss < 100_000_000
+
+
+def test_output_limit():
+    process = MonitoredProcess(
+        python_script("""
+        while True:
+            print('spam' * 1000)
+        """),
+        encoding='utf8',
+        stdout=subprocess.PIPE,
+    )
+
+    with pytest.raises(OutputLimitExceeded):
+        process.communicate(output_limit=1_000_000)
+
+
+def test_stderr_tail():
+    process = MonitoredProcess(
+        python_script("""
+        import sys
+        for i in range(100_000):
+            sys.stderr.write(f'{i}\\n')
+        """),
+        encoding='utf8',
+        stderr=subprocess.PIPE,
+    )
+
+    _, err = process.communicate()
+    assert len(err) == MonitoredProcess.STDERR_TAIL_SIZE
+    assert err.endswith('99998\n99999\n')
+
+
+def test_communicate_file_input(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('hello\n' * 100_000)
+
+    process = MonitoredProcess(
+        python_script("""
+        import sys
+        print(len(sys.stdin.read()))
+        """),
+        encoding='utf8',
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+
+    with open(path, 'rb') as file:
+        out, _ = process.communicate(file)
+    assert out == '600000\n'
+
+
+def _is_gone(pid: int) -> bool:
+    """ Orphans are reaped by init, which may take a moment. """
+
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            if psutil.Process(pid).status() == psutil.STATUS_ZOMBIE:
+                return True
+        except psutil.NoSuchProcess:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+SPAWN_SLEEPER = """
+import subprocess, sys
+child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+print(child.pid, flush=True)
+"""
+
+
+@pytest.mark.skipif(not hasattr(os, 'killpg'), reason='requires sessions')
+def test_time_limit_kills_descendants():
+    process = MonitoredProcess(
+        python_script(SPAWN_SLEEPER + 'while True: pass'),
+        stdout=subprocess.PIPE,
+    )
+
+    with pytest.raises(TimeLimitExceeded):
+        process.wait(time_limit=0.5)
+    assert _is_gone(int(process.stdout.read()))
+
+
+@pytest.mark.skipif(not hasattr(os, 'killpg'), reason='requires sessions')
+def test_exit_kills_descendants():
+    process = MonitoredProcess(
+        python_script(SPAWN_SLEEPER),
+        stdout=subprocess.PIPE,
+    )
+
+    # the sleeper inherits the standard output, so without killing it, the
+    # output would not be closed for 30 seconds.
+    out, _ = process.communicate(time_limit=5)
+    assert process.returncode == 0
+    assert _is_gone(int(out))
+
+
+def test_memory_of_descendants():
+    process = MonitoredProcess(
+        python_script("""
+        import subprocess, sys
+        subprocess.run([
+            sys.executable, '-c',
+            'import time; x = bytearray(128 * 2 ** 20); time.sleep(5)',
+        ])
+        """),
+    )
+
+    with pytest.raises(MemoryLimitExceeded):
+        process.wait(memory_limit=96 * 2 ** 20, time_limit=5)
+    assert process.duration < 5
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_memory_shared_with_descendants():
+    process = MonitoredProcess(
+        python_script("""
+        import os, time
+        data = b'x' * 150_000_000
+        pid = os.fork()
+        time.sleep(1)
+        if pid:
+            os.waitpid(pid, 0)
+        """),
+    )
+
+    # the pages of the data are shared by both processes after the fork.
+    process.wait(memory_limit=250_000_000, time_limit=5)
+    assert 150_000_000 <= process.memory_used < 250_000_000
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+
+from cptt.output import MappedOutput
+from cptt.output import OutputCapture
+from cptt.output import TailBuffer
+
+
+def test_capture_in_memory():
+    capture = OutputCapture()
+    capture.write('hello, ')
+    capture.write('world!')
+    assert capture.read() == 'hello, world!'
+    assert capture.size == 13
+    capture.close()
+
+
+def test_capture_spills_to_disk():
+    capture = OutputCapture(text=False, threshold=1024)
+    for _ in range(100):
+        capture.write(b'0123456789')
+    assert capture.read() == b'0123456789' * 100
+    capture.close()
+
+
+def test_spilled_capture_is_mapped():
+    capture = OutputCapture(text=False, threshold=1024)
+    for _ in range(1000):
+        capture.write(b'0123456789')
+    output = capture.read()
+    capture.close()
+
+    # the mapping outlives the capture.
+    assert isinstance(output, MappedOutput)
+    assert bytes(output) == b'0123456789' * 1000
+    assert os.pread(output.fd, 10, 0) == b'0123456789'
+
+
+def test_tail_keeps_last_bytes():
+    tail = TailBuffer(5)
+    for chunk in ('ab', 'cdef', 'g', 'hijklmnop', 'q'):
+        tail.write(chunk)
+    assert tail.read() == 'mnopq'
+
+
+def test_tail_short_stream():
+    tail = TailBuffer(5, text=False)
+    assert tail.read() == b''
+    tail.write(b'ab')
+    assert tail.read() == b'ab'
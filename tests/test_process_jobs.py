@@ -1,13 +1,26 @@
 from __future__ import annotations
 
+import os
 import random
+import time
 
+import pytest
+
+from cptt.output import MappedOutput
+from cptt.output import SPOOL_THRESHOLD
 from cptt.run import JobEndEvent
 from cptt.run import JobStartEvent
 from cptt.run.process import ProcessJob
 from cptt.run.process import ProcessStatus
 from cptt.run.process import ProcessStatusEvent
+from cptt.run.process import TimeLimitKind
+from cptt.run.schedule import JobHistory
+from cptt.validate import StrictValidator
+from cptt.validate import TokenValidator
+from cptt.validate import Validator
 from testing import python_script
+from testing.runners import RecordingAsyncRunner
+from testing.runners import RecordingProcessPoolRunner
 from testing.runners import RecordingRunner
 
 
@@ -34,6 +47,7 @@ def test_single_job():
     assert update.status is ProcessStatus.FINISHED
     assert update.time > 0
     assert update.memory > 0
+    assert update.cpu_time > 0
 
     assert end.job is job
     assert isinstance(end, JobEndEvent)
@@ -146,3 +160,584 @@ def test_memory_limit():
     assert isinstance(status, ProcessStatusEvent)
     assert status.status is ProcessStatus.MEMORY_LIMIT
     assert status.memory > MEMORY_LIMIT
+
+
+def test_kernel_memory_limit():
+
+    MEMORY_LIMIT = 100_000_000  # 100mb
+
+    job = ProcessJob(
+        python_script(
+            """
+            from random import random
+            l = list()
+            while True: l.append(random())
+            """,
+        ),
+        memory_limit=MEMORY_LIMIT,
+        kernel_memory_limit=True,
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert isinstance(status, ProcessStatusEvent)
+    assert status.status is ProcessStatus.MEMORY_LIMIT
+    assert status.memory > MEMORY_LIMIT
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'wait4'),
+    reason='cpu time limits are only supported on posix',
+)
+def test_cpu_time_limit_ignores_sleep():
+    job = ProcessJob(
+        python_script('from time import sleep; sleep(1)'),
+        time_limit=0.5,
+        time_limit_kind=TimeLimitKind.CPU,
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+    assert status.time > 1
+    assert status.cpu_time < 0.5
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'wait4'),
+    reason='cpu time limits are only supported on posix',
+)
+@pytest.mark.parametrize('kind', (TimeLimitKind.CPU, TimeLimitKind.BOTH))
+def test_cpu_time_limit(kind):
+    TIME_LIMIT = 0.3
+
+    job = ProcessJob(
+        python_script('while True: pass'),
+        time_limit=TIME_LIMIT,
+        time_limit_kind=kind,
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.TIME_LIMIT
+    assert status.time > TIME_LIMIT
+    # the kernel limit is rounded up to a whole second, but the process is
+    # killed as soon as it is caught over the actual limit.
+    assert status.cpu_time < 2 * TIME_LIMIT
+
+
+def test_wrong_answer_kills_process():
+    job = ProcessJob(
+        python_script(
+            """
+            while True: print('no')
+            """,
+        ),
+        validators=[TokenValidator('yes')],
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert isinstance(status, ProcessStatusEvent)
+    assert status.status is ProcessStatus.WRONG_ANSWER
+    assert status.time < 1
+
+
+@pytest.mark.parametrize('validator', (StrictValidator, TokenValidator))
+def test_streaming_accepted(validator):
+    job = ProcessJob(
+        python_script(
+            """
+            for i in range(100_000): print(i)
+            """,
+        ),
+        validators=[
+            validator(''.join(f'{i}\n' for i in range(100_000))),
+        ],
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+
+
+def test_output_limit():
+    job = ProcessJob(
+        python_script('while True: print(0)'),
+        output_limit=1_000_000,
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.OUTPUT_LIMIT
+
+
+def test_unvalidated_output_is_discarded():
+    job = ProcessJob(python_script('print(0)'))
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    assert runner.events[1].status is ProcessStatus.FINISHED
+    assert job._process.stdout is None
+
+
+class LengthValidator(Validator):
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.output = None
+
+    def validate(self, *, stdout, **_) -> None:
+        self.output = stdout
+        assert len(stdout) == self.length
+
+
+def test_large_output_is_mapped():
+    size = SPOOL_THRESHOLD + 1024
+    validator = LengthValidator(size)
+    job = ProcessJob(
+        python_script(f"import sys; sys.stdout.write('0' * {size})"),
+        validators=[validator],
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    assert runner.events[1].status is ProcessStatus.FINISHED
+    assert isinstance(validator.output, MappedOutput)
+
+
+def test_input_from_path(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text(''.join(f'{i}\n' for i in range(100_000)))
+
+    job = ProcessJob(
+        python_script(
+            """
+            import sys
+            print(sum(int(line) for line in sys.stdin))
+            """,
+        ),
+        input=path,
+        validators=[TokenValidator(str(sum(range(100_000))))],
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+
+
+def test_no_input_is_empty():
+    job = ProcessJob(
+        python_script(
+            """
+            import sys
+            print(len(sys.stdin.read()))
+            """,
+        ),
+        time_limit=5,
+        validators=[TokenValidator('0')],
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+
+
+def test_binary_output():
+    job = ProcessJob(
+        python_script(
+            """
+            import sys
+            sys.stdout.buffer.write(bytes(range(256)))
+            """,
+        ),
+        validators=[StrictValidator(bytes(range(256)))],
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+
+
+def test_async_concurrent_jobs():
+    from time import time
+
+    JOBS = 20
+    SLEEPFOR = 0.5
+
+    runner = RecordingAsyncRunner(concurrency=JOBS)
+    for index in range(JOBS):
+        runner.collect(
+            ProcessJob(
+                python_script(
+                    f"""
+                    from time import sleep
+                    sleep({SLEEPFOR})
+                    print(input() * 2)
+                    """,
+                ),
+                input=f'{index}\n',
+                validators=[StrictValidator(f'{index}{index}\n')],
+            ),
+        )
+
+    start = time()
+    runner.execute()
+    took = time() - start
+
+    statuses = [
+        event.status for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    ]
+    assert statuses == [ProcessStatus.FINISHED] * JOBS
+    assert took < JOBS * SLEEPFOR / 2
+
+
+@pytest.mark.parametrize(
+    ('code', 'kwargs', 'expected'),
+    (
+        (
+            'from time import sleep; sleep(1)',
+            {'time_limit': 0.1},
+            ProcessStatus.TIME_LIMIT,
+        ),
+        (
+            'while True: print(0)',
+            {'output_limit': 1_000_000},
+            ProcessStatus.OUTPUT_LIMIT,
+        ),
+        (
+            'while True: print("no")',
+            {'validators': [TokenValidator('yes')]},
+            ProcessStatus.WRONG_ANSWER,
+        ),
+        (
+            'import sys; print(len(sys.stdin.read()))',
+            {
+                'input': b'x' * 1_000_000,
+                'validators': [TokenValidator('1000000')],
+            },
+            ProcessStatus.FINISHED,
+        ),
+    ),
+)
+def test_async_statuses(code, kwargs, expected):
+    runner = RecordingAsyncRunner()
+    runner.collect(ProcessJob(python_script(code), **kwargs))
+    runner.execute()
+
+    start, status, end = runner.events
+    assert status.status is expected
+    assert status.time < 5
+
+
+def test_async_input_from_path(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text(''.join(f'{i}\n' for i in range(100_000)))
+
+    job = ProcessJob(
+        python_script(
+            """
+            import sys
+            print(sum(int(line) for line in sys.stdin))
+            """,
+        ),
+        input=path,
+        validators=[
+            TokenValidator(str(sum(range(100_000)))),
+            StrictValidator(f'{sum(range(100_000))}\n'),
+        ],
+    )
+
+    runner = RecordingAsyncRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+
+
+def test_process_pool_jobs():
+    runner = RecordingProcessPoolRunner(processes=2)
+    jobs = [
+        ProcessJob(
+            python_script(f'print({index} * 2)'),
+            validators=[TokenValidator(str(index * 2 if index % 2 else -1))],
+        )
+        for index in range(4)
+    ]
+    for job in jobs:
+        runner.collect(job)
+    runner.execute()
+
+    statuses = {
+        event.job.program: event.status for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    }
+    assert [statuses[job.program] for job in jobs] == [
+        ProcessStatus.WRONG_ANSWER, ProcessStatus.FINISHED,
+    ] * 2
+
+
+def test_benchmark_mode():
+    job = ProcessJob(
+        python_script('print(sum(range(10_000)))'),
+        validators=[TokenValidator(str(sum(range(10_000))))],
+        repeat=5,
+        warmup=2,
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+    assert status.time_stats.count == 5
+    assert status.memory_stats.count == 5
+    assert status.time_stats.min <= status.time == status.time_stats.median
+    assert status.time_stats.median <= status.time_stats.p95
+
+
+def test_benchmark_stops_early():
+    job = ProcessJob(
+        python_script('pass'),
+        repeat=100,
+        confidence=10,
+    )
+
+    runner = RecordingAsyncRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+    assert status.time_stats.count == ProcessJob.MIN_BENCHMARK_RUNS
+
+
+def test_benchmark_failing_run(tmp_path):
+    counter = tmp_path / 'counter'
+    counter.write_text('0')
+
+    job = ProcessJob(
+        python_script(
+            f"""
+            from pathlib import Path
+            path = Path({str(counter)!r})
+            runs = int(path.read_text()) + 1
+            path.write_text(str(runs))
+            print('yes' if runs < 3 else 'no')
+            """,
+        ),
+        validators=[TokenValidator('yes')],
+        repeat=5,
+    )
+
+    runner = RecordingRunner()
+    runner.collect(job)
+    runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.WRONG_ANSWER
+    assert status.time_stats is None
+    assert counter.read_text() == '3'
+
+
+def test_benchmark_rewinds_input(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('skipped\n21\n')
+
+    with open(path, 'rb', buffering=0) as file:
+        file.readline()
+        job = ProcessJob(
+            python_script('print(int(input()) * 2)'),
+            input=file,
+            validators=[TokenValidator('42')],
+            repeat=3,
+        )
+
+        runner = RecordingRunner()
+        runner.collect(job)
+        runner.execute()
+
+    status = runner.events[1]
+    assert status.status is ProcessStatus.FINISHED
+    assert status.time_stats.count == 3
+
+
+@pytest.mark.parametrize(
+    'runner_type',
+    (RecordingRunner, RecordingAsyncRunner, RecordingProcessPoolRunner),
+)
+def test_fail_fast(runner_type, tmp_path):
+    history = JobHistory(tmp_path / 'history.json')
+    runner = runner_type(2, fail_fast=True, history=history)
+    jobs = [
+        ProcessJob(python_script('while True: pass'), time_limit=5),
+        ProcessJob(
+            python_script('import time; time.sleep(0.2); print(1)'),
+            validators=[TokenValidator('2')],
+        ),
+    ] + [
+        ProcessJob(python_script('print(2)'), validators=[TokenValidator('2')])
+        for _ in range(10)
+    ]
+    for job in jobs:
+        runner.collect(job)
+    runner.execute()
+
+    statuses = {
+        jobs.index(event.job): event.status for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    }
+    assert statuses == {
+        0: ProcessStatus.KILLED,
+        1: ProcessStatus.WRONG_ANSWER,
+        **{index: ProcessStatus.KILLED for index in range(2, 12)},
+    }
+
+    # only the job that has failed is recorded in the history.
+    assert history.failed(jobs[1])
+    assert history.duration(jobs[0]) is None
+    assert history.duration(jobs[5]) is None
+
+
+@pytest.mark.parametrize('runner_type', (RecordingRunner, RecordingAsyncRunner))
+def test_generator(runner_type):
+    runner = runner_type()
+    count = 200_000
+    runner.collect(
+        ProcessJob(
+            python_script("""
+            import sys
+            print(sum(int(line) for line in sys.stdin))
+            """),
+            generator=python_script(f"""
+            for i in range({count}):
+                print(i)
+            """),
+            validators=[TokenValidator(str(count * (count - 1) // 2))],
+        ),
+    )
+    runner.execute()
+
+    _, update, _ = runner.events
+    assert update.status is ProcessStatus.FINISHED
+
+
+@pytest.mark.parametrize(
+    ('generator', 'expected'), (
+        ('print(1); raise SystemExit(3)', ProcessStatus.GENERATOR_ERROR),
+        # the generator fails after the program has already exited.
+        (
+            'import time; print(1, flush=True); time.sleep(0.2); exit(3)',
+            ProcessStatus.GENERATOR_ERROR,
+        ),
+        # the program stops reading before the generator is done.
+        ('while True: print(1)', ProcessStatus.FINISHED),
+    ),
+)
+@pytest.mark.parametrize('runner_type', (RecordingRunner, RecordingAsyncRunner))
+def test_generator_status(runner_type, generator, expected):
+    runner = runner_type()
+    runner.collect(
+        ProcessJob(
+            python_script('print(input())'),
+            generator=python_script(generator),
+            validators=[TokenValidator('1')],
+            time_limit=5,
+        ),
+    )
+    runner.execute()
+
+    _, update, _ = runner.events
+    assert update.status is expected
+
+
+@pytest.mark.parametrize(
+    ('program', 'generator', 'expected'), (
+        # the program is waiting for the input of a slow generator.
+        (
+            'print(input())', 'import time; time.sleep(3); print(1)',
+            ProcessStatus.GENERATOR_ERROR,
+        ),
+        # the program is slow, and doesn't read the input of the generator.
+        (
+            'import time; time.sleep(3)', 'while True: print(1)',
+            ProcessStatus.TIME_LIMIT,
+        ),
+    ),
+)
+@pytest.mark.parametrize('kind', (TimeLimitKind.WALL, TimeLimitKind.BOTH))
+def test_slow_generator(program, generator, expected, kind):
+    runner = RecordingRunner()
+    runner.collect(
+        ProcessJob(
+            python_script(program),
+            generator=python_script(generator),
+            validators=[TokenValidator('1')],
+            time_limit=1,
+            time_limit_kind=kind,
+        ),
+    )
+    runner.execute()
+
+    _, update, _ = runner.events
+    assert update.status is expected
+    assert update.time < 2
+
+
+@pytest.mark.parametrize('generator_time_limit', (0.5, None))
+def test_generator_time_limit(monkeypatch, generator_time_limit):
+    monkeypatch.setattr(ProcessJob, 'GENERATOR_TIME_LIMIT', 0.5)
+    runner = RecordingRunner()
+    runner.collect(
+        ProcessJob(
+            python_script('print(input())'),
+            generator=python_script('import time; time.sleep(10)'),
+            generator_time_limit=generator_time_limit,
+        ),
+    )
+
+    start = time.monotonic()
+    runner.execute()
+    assert time.monotonic() - start < 5
+
+    _, update, _ = runner.events
+    assert update.status is ProcessStatus.GENERATOR_ERROR
+
+
+def test_generator_with_input():
+    with pytest.raises(ValueError):
+        ProcessJob(['cat'], input='hi', generator=['echo', 'hi'])
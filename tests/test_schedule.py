@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from cptt.run import Job
+from cptt.run.events import JobStartEvent
+from cptt.run.process import ProcessJob
+from cptt.run.schedule import FailedFirstPolicy
+from cptt.run.schedule import FifoPolicy
+from cptt.run.schedule import JobHistory
+from cptt.run.schedule import LongestFirstPolicy
+from cptt.validate import TokenValidator
+from testing import python_script
+from testing.runners import RecordingAsyncRunner
+from testing.runners import RecordingRunner
+
+
+@dataclass
+class SleepJob(Job):
+    name: str
+    duration: float = 0
+
+    def execute(self) -> None:
+        time.sleep(self.duration)
+
+    def history_key(self) -> str:
+        return self.name
+
+
+def started(runner) -> list[str]:
+    return [
+        event.job.name for event in runner.events
+        if isinstance(event, JobStartEvent)
+    ]
+
+
+def test_policies_without_history():
+    jobs = [SleepJob(name) for name in 'abc']
+    for policy in (FifoPolicy(), LongestFirstPolicy(), FailedFirstPolicy()):
+        assert policy.order(jobs, None) == jobs
+
+
+def test_history_is_persisted(tmp_path):
+    path = tmp_path / 'history.json'
+    history = JobHistory(path)
+    history.record(SleepJob('a'), 1.5, True)
+    history.save()
+
+    loaded = JobHistory(path)
+    assert loaded.duration(SleepJob('a')) == 1.5
+    assert loaded.failed(SleepJob('a'))
+    assert loaded.duration(SleepJob('b')) is None
+    assert not loaded.failed(SleepJob('b'))
+
+    path.write_text('not json')
+    assert JobHistory(path).duration(SleepJob('a')) is None
+
+
+def test_longest_first(tmp_path):
+    path = tmp_path / 'history.json'
+    durations = {'short': 0.01, 'long': 0.3, 'medium': 0.1}
+
+    runner = RecordingRunner(history=JobHistory(path))
+    for name, duration in durations.items():
+        runner.collect(SleepJob(name, duration))
+    runner.execute()
+    assert started(runner) == ['short', 'long', 'medium']
+
+    runner = RecordingAsyncRunner(
+        policy=LongestFirstPolicy(),
+        history=JobHistory(path),
+    )
+    for name, duration in durations.items():
+        runner.collect(SleepJob(name, duration))
+    runner.collect(SleepJob('new'))
+    runner.execute()
+    assert started(runner) == ['new', 'long', 'medium', 'short']
+
+
+def test_failed_first(tmp_path):
+    path = tmp_path / 'history.json'
+    program = python_script('print(input())')
+
+    def collect(runner):
+        for index in range(4):
+            runner.collect(
+                ProcessJob(
+                    program,
+                    input=str(index),
+                    validators=[TokenValidator('2')],
+                ),
+            )
+
+    runner = RecordingRunner(history=JobHistory(path))
+    collect(runner)
+    runner.execute()
+
+    runner = RecordingRunner(
+        policy=FailedFirstPolicy(),
+        history=JobHistory(path),
+    )
+    collect(runner)
+    runner.execute()
+
+    inputs = [
+        event.job.input for event in runner.events
+        if isinstance(event, JobStartEvent)
+    ]
+    assert inputs == ['0', '1', '3', '2']
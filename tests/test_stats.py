@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+
+from cptt.stats import confidence_interval
+from cptt.stats import percentile
+from cptt.stats import Summary
+
+
+def test_percentile():
+    samples = [5, 1, 4, 2, 3]
+    assert percentile(samples, 0) == 1
+    assert percentile(samples, 50) == 3
+    assert percentile(samples, 100) == 5
+    assert percentile(samples, 95) == pytest.approx(4.8)
+    assert percentile([7], 95) == 7
+
+
+def test_summary():
+    summary = Summary.of([1, 2, 3, 4, 10])
+    assert summary.count == 5
+    assert summary.min == 1
+    assert summary.median == 3
+    assert summary.mean == 4
+    assert summary.stddev == pytest.approx(3.535, abs=1e-3)
+    assert Summary.of([2]).stddev == 0
+
+
+def test_confidence_interval():
+    assert confidence_interval([1, 1, 1]) == 0
+    assert confidence_interval([1, 2]) == pytest.approx(12.706 * 0.5)
+    many = [1, 2] * 50
+    assert confidence_interval(many) < confidence_interval(many[:10])
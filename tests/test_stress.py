@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from cptt.run.process import ProcessStatus
+from cptt.stress import StressRunner
+from testing import python_script
+
+GENERATOR = python_script("""
+import sys
+print(sys.argv[1])
+""")
+
+REFERENCE = python_script('print(int(input()) * 2)')
+
+SOLUTION = python_script("""
+n = int(input())
+print(n * 2 if n % 5 != 3 or n < 10 else n)
+""")
+
+
+def test_finds_all_failures(tmp_path):
+    path = tmp_path / 'input.txt'
+    runner = StressRunner(
+        GENERATOR, REFERENCE, SOLUTION, range(30),
+        stop_on_failure=False, save_path=path, threads=2,
+    )
+    runner.execute()
+
+    assert sorted(event.seed for event in runner.failures) == [13, 18, 23, 28]
+    assert all(
+        event.status is ProcessStatus.WRONG_ANSWER
+        for event in runner.failures
+    )
+    assert runner.passed == 26
+    assert runner.throughput > 0
+    assert path.read_text() == '13\n'
+
+
+def test_stops_on_failure(tmp_path):
+    path = tmp_path / 'input.txt'
+    runner = StressRunner(
+        GENERATOR, REFERENCE, SOLUTION, range(10, 1000),
+        save_path=path, threads=2, batch_size=4,
+    )
+    runner.execute()
+
+    assert runner.cancelled
+    assert runner.failures
+    assert runner.passed + len(runner.failures) < 100
+    assert int(path.read_text()) % 5 == 3
+
+
+def test_failing_generator(tmp_path):
+    runner = StressRunner(
+        python_script('raise SystemExit(1)'), REFERENCE, SOLUTION, range(5),
+        save_path=tmp_path / 'input.txt',
+    )
+    runner.execute()
+
+    failure, = runner.failures
+    assert failure.status is ProcessStatus.GENERATOR_ERROR
+    assert runner.smallest_failure is None
+    assert not (tmp_path / 'input.txt').exists()
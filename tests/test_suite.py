@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import pytest
+
+from cptt.run.process import ProcessJob
+from cptt.run.process import ProcessStatus
+from cptt.run.process import ProcessStatusEvent
+from cptt.suite import discover
+from cptt.suite import suite_jobs
+from cptt.validate import StrictValidator
+from cptt.validate import TokenValidator
+from cptt.validate import ValidationError
+from testing import python_script
+from testing.runners import RecordingAsyncRunner
+from testing.runners import RecordingProcessPoolRunner
+from testing.runners import RecordingRunner
+
+DOUBLE = python_script('print(int(input()) * 2)')
+
+
+def write_suite(directory, count, wrong=()):
+    for number in range(1, count + 1):
+        (directory / f'{number}.in').write_text(f'{number}\n')
+        answer = number * 2 + (number in wrong)
+        (directory / f'{number}.out').write_text(f'{answer}\n')
+
+
+def test_discover(tmp_path):
+    write_suite(tmp_path, 10)
+    (tmp_path / '10.out').rename(tmp_path / '10.ans')
+    (tmp_path / '5.out').unlink()
+    (tmp_path / 'notes.txt').write_text('not a test')
+
+    tests = discover(tmp_path)
+    assert [test.name for test in tests] == [
+        f'{number}.in' for number in range(1, 11)
+    ]
+    assert tests[0].input == tmp_path / '1.in'
+    assert tests[0].answer == tmp_path / '1.out'
+    assert tests[4].answer is None
+    assert tests[9].answer == tmp_path / '10.ans'
+
+
+def test_discover_directories(tmp_path):
+    for directory in ('input', 'output'):
+        (tmp_path / directory).mkdir()
+    for name in ('a', 'b'):
+        (tmp_path / 'input' / name).write_text('1\n')
+        (tmp_path / 'output' / name).write_text('2\n')
+
+    tests = discover(tmp_path, 'input/*', ['../output/{name}'])
+    assert [test.name for test in tests] == ['input/a', 'input/b']
+    assert tests[1].answer.resolve() == (tmp_path / 'output' / 'b').resolve()
+
+
+@pytest.mark.parametrize('validator_type', (StrictValidator, TokenValidator))
+def test_expected_output_file(validator_type, tmp_path):
+    path = tmp_path / 'answer.out'
+    path.write_bytes(b'1 2 3\n' * 1000)
+    validator = validator_type(path)
+
+    validator.validate(stdout=b'1 2 3\n' * 1000, stderr=b'', returncode=0)
+    with pytest.raises(ValidationError):
+        validator.validate(stdout=b'1 2 3\n' * 999, stderr=b'', returncode=0)
+
+    stream = validator.stream()
+    for _ in range(1000):
+        stream.feed(b'1 2 3\n')
+    stream.finish()
+
+    assert validator.fingerprint() == validator_type(path.read_bytes()) \
+        .fingerprint()
+
+
+def test_empty_expected_output_file(tmp_path):
+    path = tmp_path / 'empty.out'
+    path.write_bytes(b'')
+
+    StrictValidator(path).validate(stdout=b'', stderr=b'', returncode=0)
+    with pytest.raises(ValidationError):
+        TokenValidator(path).validate(stdout=b'1', stderr=b'', returncode=0)
+
+
+@pytest.mark.parametrize(
+    'runner_type',
+    (RecordingRunner, RecordingAsyncRunner, RecordingProcessPoolRunner),
+)
+def test_run_suite(runner_type, tmp_path):
+    write_suite(tmp_path, 6, wrong={4})
+    tests = discover(tmp_path)
+
+    runner = runner_type(2)
+    runner.collect_lazily(suite_jobs(tests, DOUBLE, time_limit=5))
+    runner.execute()
+
+    statuses = {
+        event.job.input.name: event.status for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    }
+    assert statuses == {
+        f'{number}.in': ProcessStatus.WRONG_ANSWER if number == 4
+        else ProcessStatus.FINISHED
+        for number in range(1, 7)
+    }
+
+
+@pytest.mark.parametrize('runner_type', (RecordingRunner, RecordingAsyncRunner))
+def test_jobs_are_created_lazily(runner_type, tmp_path):
+    write_suite(tmp_path, 5)
+    created: list[ProcessJob] = list()
+
+    def jobs():
+        for job in suite_jobs(discover(tmp_path), DOUBLE):
+            # with a single slot, the previous job must have finished.
+            assert all(
+                previous._process.returncode is not None
+                for previous in created
+            )
+            created.append(job)
+            yield job
+
+    runner = runner_type(1)
+    runner.collect(ProcessJob(DOUBLE, input='0'))
+    runner.collect_lazily(jobs())
+    assert not created
+
+    runner.execute()
+    assert len(created) == 5
+    assert runner.events[-1].job is created[-1]
+
+
+def test_cancel_lazy_jobs(tmp_path):
+    write_suite(tmp_path, 10, wrong={1})
+    runner = RecordingRunner(1, fail_fast=True)
+    runner.collect_lazily(suite_jobs(discover(tmp_path), DOUBLE))
+    runner.execute()
+
+    statuses = [
+        event.status for event in runner.events
+        if isinstance(event, ProcessStatusEvent)
+    ]
+    assert statuses[0] is ProcessStatus.WRONG_ANSWER
+    assert len(statuses) == 10
+    assert ProcessStatus.KILLED in statuses
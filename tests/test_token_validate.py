@@ -34,3 +34,129 @@ def test_lots_last_differ():
     validator = TokenValidator(expect)
     with pytest.raises(ValidationError):
         validator.validate(stdout=output, stderr='', returncode=0)
+
+
+def feed_chunks(validator, output: str, size: int) -> None:
+    stream = validator.stream()
+    for i in range(0, len(output), size):
+        stream.feed(output[i:i + size])
+    stream.finish()
+
+
+@pytest.mark.parametrize('size', (1, 2, 3, 7, 1000))
+def test_stream_chunk_boundaries(size):
+    output = 'hello   world\n 1.000001 \n\n  abc\tdef'
+    expect = 'HELLO WORLD 1 ABC DEF'
+    feed_chunks(TokenValidator(expect), output, size)
+
+
+def test_stream_long_token():
+    output = '123456789' * 100_000
+    feed_chunks(TokenValidator(output), output, 4096)
+
+
+def test_stream_first_mismatch():
+    validator = TokenValidator(expected='1 2 3')
+    stream = validator.stream()
+    stream.feed('1 ')
+    with pytest.raises(ValidationError):
+        stream.feed('5 ')
+
+
+def test_stream_too_many_tokens():
+    validator = TokenValidator(expected='1 2')
+    stream = validator.stream()
+    with pytest.raises(ValidationError) as err:
+        stream.feed('1 2 3 4 ')
+    assert err.value.message == 'Got at least 4 tokens, expected 2'
+
+    stream = validator.stream()
+    stream.feed('1 ')
+    with pytest.raises(ValidationError) as err:
+        stream.feed('2 3')
+        stream.finish()
+    assert err.value.message == 'Got at least 3 tokens, expected 2'
+
+
+def test_stream_too_few_tokens():
+    validator = TokenValidator(expected='1 2 3')
+    stream = validator.stream()
+    stream.feed('1 2')
+    with pytest.raises(ValidationError) as err:
+        stream.finish()
+    assert err.value.message == 'Got 2 tokens, expected 3'
+
+
+def test_bytes_and_memoryview():
+    validator = TokenValidator(expected=b'1 2.0 abc')
+    validator.validate(stdout=memoryview(b'1.0 2 ABC\n'), stderr=b'', returncode=0)
+    feed_chunks(validator, b'1 2 abc', 2)
+
+
+def test_first_mismatch_index():
+    expect = ' '.join(str(i) for i in range(1000))
+    output = expect.replace(' 500 ', ' 500.5 ').replace(' 700 ', ' abc ')
+    validator = TokenValidator(expect)
+    with pytest.raises(ValidationError) as err:
+        validator.validate(stdout=output, stderr='', returncode=0)
+    assert err.value.message == 'Tokens differ at index 500'
+
+
+def test_first_mismatch_index_streaming():
+    expect = ' '.join(str(i) for i in range(1000))
+    output = expect.replace(' 700 ', ' 700.5 ')
+    with pytest.raises(ValidationError) as err:
+        feed_chunks(TokenValidator(expect), output, 100)
+    assert err.value.message == 'Tokens differ at index 700'
+
+
+@pytest.mark.parametrize('vectorized', (True, False))
+def test_many_numeric_differences(monkeypatch, vectorized):
+    import cptt.validate.token
+    if not vectorized:
+        monkeypatch.setattr(cptt.validate.token, 'numpy', None)
+    elif cptt.validate.token.numpy is None:
+        pytest.skip('numpy is not installed')
+
+    expect = '\n'.join(f'{i / 7:.6f}' for i in range(100_000))
+    output = '\n'.join(f'{i / 7:.9f}' for i in range(100_000))
+    validator = TokenValidator(expect)
+    validator.validate(stdout=output, stderr='', returncode=0)
+    feed_chunks(validator, output, 4096)
+
+    output += ' 1e10'
+    expect += ' 1e-10'
+    with pytest.raises(ValidationError) as err:
+        TokenValidator(expect).validate(stdout=output, stderr='', returncode=0)
+    assert err.value.message == 'Tokens differ at index 100000'
+
+
+@pytest.mark.filterwarnings('error')
+def test_infinite_numbers():
+    expect = ' '.join(('inf', '-inf', 'nan', '1') * 100)
+    output = ' '.join(('infinity', '-infinity', 'nan', '1') * 100)
+    with pytest.raises(ValidationError) as err:
+        TokenValidator(expect).validate(stdout=output, stderr='', returncode=0)
+    assert err.value.message == 'Tokens differ at index 0'
+
+    output = expect.replace('-inf', 'inf')
+    with pytest.raises(ValidationError) as err:
+        TokenValidator(expect).validate(stdout=output, stderr='', returncode=0)
+    assert err.value.message == 'Tokens differ at index 1'
+
+
+@pytest.mark.parametrize('count', (10, 100))
+def test_null_bytes(count):
+    expect = ' '.join('0' for _ in range(count))
+    output = ' '.join('0\0' for _ in range(count))
+    with pytest.raises(ValidationError) as err:
+        TokenValidator(expect).validate(stdout=output, stderr='', returncode=0)
+    assert err.value.message == 'Tokens differ at index 0'
+
+
+def test_numbers_too_long():
+    expect = ' '.join('1' for _ in range(100))
+    output = ' '.join('1' for _ in range(99)) + ' ' + '0' * 30 + '1'
+    with pytest.raises(ValidationError) as err:
+        TokenValidator(expect).validate(stdout=output, stderr='', returncode=0)
+    assert err.value.message == 'Tokens differ at index 99'